@@ -1,7 +1,10 @@
 from django.contrib import admin
+from django.urls import reverse
+from django.utils.html import format_html
 
 # Register your models here.
-from .models import Author, Genre, Book, BookInstance,Language
+from .models import Author, Genre, Book, BookInstance,Language,OverdueNotice,QueuedEmail
+from .pagination import EstimatedCountPaginator
 
 # admin.site.register(Book)
 # admin.site.register(Author)
@@ -9,8 +12,15 @@ from .models import Author, Genre, Book, BookInstance,Language
 # admin.site.register(BookInstance)
 # Define the admin class
 
-admin.site.register(Genre)
-admin.site.register(Language)
+# The search fields back the autocomplete widgets of the book forms.
+@admin.register(Genre)
+class GenreAdmin(admin.ModelAdmin):
+    search_fields = ('name',)
+
+
+@admin.register(Language)
+class LanguageAdmin(admin.ModelAdmin):
+    search_fields = ('name',)
 
 class BooksInLine(admin.TabularInline):
     model = Book
@@ -19,25 +29,59 @@ class AuthorAdmin(admin.ModelAdmin):
     list_display = ('last_name', 'first_name', 'date_of_birth', 'date_of_death')
 
     fields = ['first_name', 'last_name', ('date_of_birth', 'date_of_death')]
+    search_fields = ('last_name', 'first_name')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     #inlines =[BooksInLine]
 # Register the admin class with the associated model
 admin.site.register(Author, AuthorAdmin)
 # Register the Admin classes for Book using the decorator
+class LimitedInlineFormSet(admin.options.BaseInlineFormSet):
+    """Inline formset that edits only the first ``max_shown`` related objects."""
+    max_shown = 20
+
+    def get_queryset(self):
+        if not hasattr(self, '_limited_queryset'):
+            self._limited_queryset = list(super().get_queryset()[:self.max_shown])
+        return self._limited_queryset
+
+
 class BooksInstanceInline(admin.TabularInline):
     model = BookInstance
     extra = 0
+    formset = LimitedInlineFormSet
+    autocomplete_fields = ('borrower',)
+    show_change_link = True
 
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
+    # The author and genre columns are read from Book's display columns.
     list_display = ('title', 'display_authors', 'display_genre')
+    search_fields = ('title', 'isbn')
+    autocomplete_fields = ('author', 'genre', 'language')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = ('all_copies',)
 
     inlines = [BooksInstanceInline]
 
+    def all_copies(self, book):
+        """Link to every copy, as the inline only edits the first few."""
+        if book.pk is None:
+            return '-'
+        url = reverse('admin:catalog_bookinstance_changelist') + '?book__id__exact=%d' % book.pk
+        return format_html('<a href="{}">{} copies</a>', url, book.bookinstance_set.count())
+
+    all_copies.short_description = 'Copies'
+
 # Register the Admin classes for BookInstance using the decorator
 @admin.register(BookInstance)
 class BookInstanceAdmin(admin.ModelAdmin):
     list_display = ('book', 'status', 'borrower', 'due_back', 'id')
     list_filter = ('status', 'due_back')
+    autocomplete_fields = ('book', 'borrower')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         (None, {
@@ -46,4 +90,24 @@ class BookInstanceAdmin(admin.ModelAdmin):
         ('Availability', {
             'fields': ('status', 'due_back','borrower')
         }),
-    ) 
+    )
+
+    def get_queryset(self, request):
+        # For the changelist columns, and __str__ reads the book's title in the change
+        # form and delete confirmation. The changelist skips list_select_related
+        # when the queryset already selects related objects.
+        return super().get_queryset(request).select_related('book', 'borrower')
+
+
+@admin.register(QueuedEmail)
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt', 'sent')
+    list_filter = ('status',)
+    readonly_fields = ('created', 'sent', 'last_error')
+
+
+@admin.register(OverdueNotice)
+class OverdueNoticeAdmin(admin.ModelAdmin):
+    list_display = ('copy', 'borrower', 'due_back', 'created')
+    list_select_related = ('copy__book', 'borrower')
+    raw_id_fields = ('copy', 'borrower')
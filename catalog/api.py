@@ -0,0 +1,251 @@
+"""Read-only JSON API for the catalog, under /catalog/api/.
+
+Every list takes ``?fields=`` to pick the serialized fields, ``?ids=`` for
+a batch of primary keys and ``?limit=`` plus the ``after``/``before``
+cursors of ``catalog.pagination``. Related data is loaded with
+select_related/prefetch_related for the requested fields only, so a
+response costs one query plus one per prefetched relation however many
+rows it holds. ETag and Last-Modified come from the catalog version kept by
+``catalog.pagecache``, so revalidating an unchanged response is answered
+with a 304 before any query runs. The responses are read from the primary,
+as a lagging replica would send old data under the current version's ETag.
+"""
+import datetime
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
+from django.utils.http import urlencode
+from django.views.decorators.http import condition, require_safe
+
+from . import changes, facets, pagecache
+from .models import Author, Book, BookInstance, Genre, Language
+from .pagination import KeysetPaginator
+from .routers import primary_reads
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class Field:
+    """How to read one serialized field, and the relation it needs loaded.
+
+    ``load``, if given, is called once with all the objects of a response
+    before they are serialized, to fetch what ``get`` reads in bulk.
+    Fields that change without the change feed hearing of it are left out
+    of its snapshots (``in_feed=False``).
+    """
+
+    def __init__(self, get, select=None, prefetch=None, load=None, in_feed=True):
+        self.get = get
+        self.select = select
+        self.prefetch = prefetch
+        self.load = load
+        self.in_feed = in_feed
+
+
+def attribute(name):
+    return Field(lambda obj: getattr(obj, name))
+
+
+def related_ids(name):
+    return Field(lambda obj: [related.pk for related in getattr(obj, name).all()], prefetch=name)
+
+
+def facet_count(facet, part):
+    """A count kept by catalog.facets: 'books' or 'available' copies.
+
+    Not in the change feed: linking books and lending copies change it
+    without an entry for the genre, language or author.
+    """
+    def load(objects):
+        counts = facets.counts(facet)
+        for obj in objects:
+            obj.facet_counts = counts.get(obj.pk, {'books': 0, 'available': 0})
+    return Field(lambda obj: obj.facet_counts[part], load=load, in_feed=False)
+
+
+class Resource:
+    def __init__(self, model, ordering, fields):
+        self.model = model
+        self.ordering = ordering
+        self.fields = fields
+
+    def queryset(self, fields):
+        queryset = self.model.objects.order_by(*self.ordering)
+        select = [self.fields[name].select for name in fields if self.fields[name].select]
+        prefetch = [self.fields[name].prefetch for name in fields if self.fields[name].prefetch]
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+    def feed_fields(self):
+        """The fields of the change feed's snapshots."""
+        return [name for name, field in self.fields.items() if field.in_feed]
+
+    def load(self, objects, fields):
+        """Fetch in bulk what the fields read from these objects, before they are serialized."""
+        for load in {self.fields[name].load for name in fields if self.fields[name].load}:
+            load(objects)
+
+    def serialize(self, obj, fields):
+        return {name: self.fields[name].get(obj) for name in fields}
+
+
+RESOURCES = {
+    'books': Resource(Book, ('title',), {
+        'id': attribute('pk'),
+        'title': attribute('title'),
+        'summary': attribute('summary'),
+        'isbn': attribute('isbn'),
+        'language': Field(lambda book: book.language_id),
+        'language_name': Field(lambda book: book.language.name if book.language else None, select='language'),
+        'authors': related_ids('author'),
+        'genres': related_ids('genre'),
+        'updated': attribute('updated'),
+        'url': Field(lambda book: book.get_absolute_url()),
+    }),
+    'authors': Resource(Author, ('last_name', 'first_name'), {
+        'id': attribute('pk'),
+        'first_name': attribute('first_name'),
+        'last_name': attribute('last_name'),
+        'date_of_birth': attribute('date_of_birth'),
+        'date_of_death': attribute('date_of_death'),
+        'books': related_ids('book_set'),
+        'book_count': facet_count('author', 'books'),
+        'available_count': facet_count('author', 'available'),
+        'updated': attribute('updated'),
+        'url': Field(lambda author: author.get_absolute_url()),
+    }),
+    'genres': Resource(Genre, ('name',), {
+        'id': attribute('pk'),
+        'name': attribute('name'),
+        'book_count': facet_count('genre', 'books'),
+        'available_count': facet_count('genre', 'available'),
+    }),
+    'languages': Resource(Language, ('name',), {
+        'id': attribute('pk'),
+        'name': attribute('name'),
+        'book_count': facet_count('language', 'books'),
+        'available_count': facet_count('language', 'available'),
+    }),
+    'instances': Resource(BookInstance, ('due_back',), {
+        'id': attribute('pk'),
+        'book': Field(lambda copy: copy.book_id),
+        'imprint': attribute('imprint'),
+        'status': attribute('status'),
+        'due_back': attribute('due_back'),
+    }),
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _fields(request, resource):
+    if not request.GET.get('fields'):
+        return list(resource.fields)
+    fields = [name.strip() for name in request.GET['fields'].split(',') if name.strip()]
+    unknown = [name for name in fields if name not in resource.fields]
+    if unknown:
+        raise BadRequest('Unknown fields: %s' % ', '.join(unknown))
+    return fields
+
+
+def _ids(request, resource):
+    ids = [value.strip() for value in request.GET['ids'].split(',') if value.strip()]
+    if len(ids) > MAX_LIMIT:
+        raise BadRequest('At most %d ids can be looked up at once.' % MAX_LIMIT)
+    try:
+        return [resource.model._meta.pk.to_python(value) for value in ids]
+    except ValidationError:
+        raise BadRequest('Invalid ids.')
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise BadRequest('limit must be a number.')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise BadRequest('limit must be between 1 and %d.' % MAX_LIMIT)
+    return limit
+
+
+def _link(request, **cursor):
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    query.update(cursor)
+    return '%s?%s' % (request.path, urlencode(query, doseq=True))
+
+
+def _etag(request, *args, **kwargs):
+    path = request.get_full_path().encode('utf-8')
+    return '"%s-%d"' % (hashlib.md5(path).hexdigest()[:16], pagecache.version())
+
+
+def _last_modified(request, *args, **kwargs):
+    return datetime.datetime.fromtimestamp(pagecache.version(), tz=datetime.timezone.utc)
+
+
+@require_safe
+@condition(etag_func=_etag, last_modified_func=_last_modified)
+@primary_reads()
+def object_list(request, resource):
+    """A page of objects, optionally restricted to ``?ids=``."""
+    resource = RESOURCES[resource]
+    try:
+        fields = _fields(request, resource)
+        limit = _limit(request)
+        queryset = resource.queryset(fields)
+        if 'ids' in request.GET:
+            queryset = queryset.filter(pk__in=_ids(request, resource))
+    except BadRequest as error:
+        return _error(str(error))
+    page = KeysetPaginator(queryset, limit).get_page(
+        after=request.GET.get('after'), before=request.GET.get('before'))
+    objects = list(page)
+    resource.load(objects, fields)
+    return JsonResponse({
+        'results': [resource.serialize(obj, fields) for obj in objects],
+        'next': _link(request, after=page.next_cursor()) if page.has_next() else None,
+        'previous': _link(request, before=page.previous_cursor()) if page.has_previous() else None,
+    })
+
+
+@require_safe
+@condition(etag_func=_etag, last_modified_func=_last_modified)
+@primary_reads()
+def object_detail(request, resource, pk):
+    resource = RESOURCES[resource]
+    try:
+        fields = _fields(request, resource)
+    except BadRequest as error:
+        return _error(str(error))
+    obj = resource.queryset(fields).filter(pk=pk).first()
+    if obj is None:
+        return _error('Not found.', status=404)
+    resource.load([obj], fields)
+    return JsonResponse(resource.serialize(obj, fields))
+
+
+@require_safe
+def change_feed(request):
+    """Changes after ``?since=``, one per object; pass ``next`` back as ``since`` to continue."""
+    try:
+        since = int(request.GET.get('since', 0))
+        limit = _limit(request)
+    except ValueError:
+        return _error('since must be a sequence number.')
+    except BadRequest as error:
+        return _error(str(error))
+    entries, next_since, more = changes.changes_since(since, limit=limit)
+    return JsonResponse({'changes': entries, 'next': next_since, 'more': more})
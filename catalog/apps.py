@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CatalogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'catalog'
+
+    def ready(self):
+        # Connect the signal handlers that keep derived data up to date.
+        from . import signals  # noqa: F401
+        from django.core.signals import request_started
+        from .dbconnections import mark_for_health_check
+        # Django closes expired connections on request_started first.
+        request_started.connect(mark_for_health_check)
@@ -0,0 +1,123 @@
+"""Minified stylesheet bundles and vendored third-party files, built by the build_static command."""
+import base64
+import collections
+import gzip
+import hashlib
+import os
+import re
+import urllib.request
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+Vendored = collections.namedtuple('Vendored', 'url integrity')
+
+VENDOR = {
+    'vendor/bootstrap-4.5.3.min.css': Vendored(
+        'https://cdn.jsdelivr.net/npm/bootstrap@4.5.3/dist/css/bootstrap.min.css',
+        'sha384-TX8t27EcRE3e/ihU7zmQxVncDAy5uIKz4rEkgIXeMed4M0jlfIDPvg6uqKI2xXr2'),
+}
+
+# Bundles sit next to their local sources so relative url()s keep working.
+BUNDLES = {
+    'css/catalog.min.css': ['vendor/bootstrap-4.5.3.min.css', 'css/styles.css'],
+}
+
+VENDOR_DIR = os.path.join(os.path.dirname(__file__), 'static')
+
+
+def build_dir():
+    return str(getattr(settings, 'CATALOG_STATIC_BUILD_DIR', settings.BASE_DIR / 'build' / 'static'))
+
+
+def integrity(content):
+    """Subresource integrity value (sha384) of ``content``."""
+    return 'sha384-' + base64.b64encode(hashlib.sha384(content).digest()).decode('ascii')
+
+
+def fetch_vendor(name, vendor=None, directory=VENDOR_DIR):
+    """Download a vendor file into the app's static files, checking its integrity hash."""
+    spec = (vendor or VENDOR)[name]
+    with urllib.request.urlopen(spec.url, timeout=30) as response:
+        content = response.read()
+    if integrity(content) != spec.integrity:
+        raise ValueError('%s does not match its integrity hash %s' % (spec.url, spec.integrity))
+    path = os.path.join(directory, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as vendored:
+        vendored.write(content)
+    forget_sources()
+    return path
+
+
+# Comments other than /*! license */ ones, whitespace runs, and the spaces
+# around punctuation that doesn't need them. Only the space after a
+# property's colon goes, as one before a colon matters in ``a :hover``.
+_COMMENT = re.compile(r'/\*(?!!).*?\*/', re.S)
+_SPACE = re.compile(r'\s+')
+_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+_PROPERTY = re.compile(r'([{;][\w-]+):\s+')
+
+
+def minify_css(css):
+    css = _COMMENT.sub('', css)
+    css = _SPACE.sub(' ', css)
+    css = _PUNCTUATION.sub(r'\1', css)
+    css = _PROPERTY.sub(r'\1:', css)
+    return css.replace(';}', '}').strip()
+
+
+# find_source() results, as the template tag looks on every page render and
+# finders.find() walks every static directory and app. Building or fetching
+# a file in this process forgets them.
+_found = {}
+
+
+def find_source(path):
+    if path not in _found:
+        _found[path] = finders.find(path)
+    return _found[path]
+
+
+@receiver(setting_changed)
+def forget_sources(setting=None, **kwargs):
+    if setting is None or setting.startswith('STATIC'):
+        _found.clear()
+
+
+def build_bundle(name, bundles=None):
+    """Write the minified bundle into the build directory and return its path.
+
+    Raises FileNotFoundError naming the first source that can't be found.
+    """
+    parts = []
+    for source in (bundles or BUNDLES)[name]:
+        found = find_source(source)
+        if found is None:
+            raise FileNotFoundError(source)
+        with open(found, encoding='utf-8') as source_file:
+            parts.append(minify_css(source_file.read()))
+    path = os.path.join(build_dir(), name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as bundle:
+        bundle.write('\n'.join(parts) + '\n')
+    forget_sources()
+    return path
+
+
+def sizes(path):
+    """Bytes of a file raw, gzipped and Brotli compressed (None without the brotli package)."""
+    with open(path, 'rb') as built:
+        content = built.read()
+    return {
+        'raw': len(content),
+        'gzip': len(gzip.compress(content, 9)),
+        'brotli': len(brotli.compress(content)) if brotli else None,
+    }
@@ -0,0 +1,159 @@
+"""Async versions of the catalog's read views, used when served over ASGI.
+
+Django 3.2 has no async ORM, so every database call runs in one of
+CATALOG_ASYNC_DB_THREADS threads, on that thread's connection. Calls that
+don't depend on each other are started together with asyncio.gather, so a
+page waits for its slowest query rather than for all of them in turn.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import Http404
+from django.shortcuts import render
+
+from . import stats, views, visits
+from .dbconnections import mark_for_health_check, statement_timeout
+from .models import Author, Book, BookInstance
+from .pagecache import cache_anonymous_page
+from .pagination import KeysetPaginator, paginate
+
+
+_executor = ThreadPoolExecutor(getattr(settings, 'CATALOG_ASYNC_DB_THREADS', 8), thread_name_prefix='catalog-db')
+
+
+def in_thread(func):
+    """Run ``func`` in the query threads, using that thread's own database connections."""
+    def run(*args, **kwargs):
+        # No request starts or finishes in these threads, so their connections
+        # are checked and expired here, as around a request.
+        close_old_connections()
+        mark_for_health_check()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False, executor=_executor)
+
+
+def _evaluate(queryset):
+    return list(queryset)
+
+
+def _first(queryset):
+    return queryset.first()
+
+
+def prefetched(instance, name, objects):
+    """Make ``instance.<name>.all()`` return ``objects``, as prefetch_related() would."""
+    manager = getattr(instance, name)
+    cache_name = getattr(manager, 'prefetch_cache_name', None) or manager.field.remote_field.get_cache_name()
+    queryset = manager.all()
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    instance.__dict__.setdefault('_prefetched_objects_cache', {})[cache_name] = queryset
+
+
+async def paginate_concurrently(request, queryset, per_page, estimate_count=False, count=False):
+    """Like pagination.paginate(); with ``count`` the rows are counted while the page is read."""
+    if 'page' in request.GET:
+        return await in_thread(paginate)(request, queryset, per_page, estimate_count=estimate_count)
+    paginator = KeysetPaginator(queryset, per_page, estimate_count=estimate_count)
+    get_page = in_thread(paginator.get_page)(after=request.GET.get('after'), before=request.GET.get('before'))
+    if not count:
+        return paginator, await get_page
+    page, _ = await asyncio.gather(get_page, in_thread(lambda: paginator.count)())
+    return paginator, page
+
+
+def _list_context(name, paginator, page):
+    """The context a ListView gives its template."""
+    return {
+        'paginator': paginator,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+        'object_list': page.object_list,
+        name: page.object_list,
+    }
+
+
+async def index(request):
+    """Home page; the counters and the visitor's session are read at the same time."""
+    context, num_visits = await asyncio.gather(in_thread(stats.get_stats)(), in_thread(visits.visits)(request))
+    context['num_visits'] = num_visits
+    response = await sync_to_async(render)(request, 'index.html', context=context)
+    visits.count_visit(request, response, num_visits)
+    return response
+
+
+@cache_anonymous_page
+async def book_list(request):
+    view = views.BookListView
+    paginator, page = await paginate_concurrently(request, view.queryset.all(), view.paginate_by,
+                                                  estimate_count=view.estimate_count, count=view.estimate_count)
+    return await sync_to_async(render)(request, 'catalog/book_list.html', _list_context('book_list', paginator, page))
+
+
+@cache_anonymous_page
+async def author_list(request):
+    view = views.AuthorListView
+    paginator, page = await paginate_concurrently(request, Author.objects.all(), view.paginate_by,
+                                                  estimate_count=view.estimate_count, count=view.estimate_count)
+    return await sync_to_async(render)(request, 'catalog/author_list.html',
+                                       _list_context('author_list', paginator, page))
+
+
+@cache_anonymous_page
+async def book_detail(request, pk):
+    """A book with its language, authors and copies, read by three concurrent queries."""
+    book, authors, copies = await asyncio.gather(
+        in_thread(_first)(Book.objects.select_related('language').filter(pk=pk)),
+        in_thread(_evaluate)(Author.objects.filter(book__pk=pk)),
+        in_thread(_evaluate)(BookInstance.objects.filter(book_id=pk)))
+    if book is None:
+        raise Http404('No book found matching the query')
+    prefetched(book, 'author', authors)
+    prefetched(book, 'bookinstance_set', copies)
+    return await sync_to_async(render)(request, 'catalog/book_detail.html', {'book': book, 'object': book})
+
+
+@cache_anonymous_page
+async def author_detail(request, pk):
+    author = await in_thread(_first)(Author.objects.filter(pk=pk))
+    if author is None:
+        raise Http404('No author found matching the query')
+    return await sync_to_async(render)(request, 'catalog/author_detail.html', {'author': author, 'object': author})
+
+
+async def show_books_by_genre(request, genre):
+    book_list = Book.objects.filter(genre__name=genre).with_listing_data()
+    paginator, page_obj = await paginate_concurrently(request, book_list, 4)
+    return await sync_to_async(render)(request, 'catalog/list_books_by_genre.html',
+                                       {'page_obj': page_obj, 'genre': genre})
+
+
+@cache_anonymous_page(params=views.SEARCH_PARAMS)
+async def book_search(request):
+    with statement_timeout(getattr(settings, 'CATALOG_SEARCH_STATEMENT_TIMEOUT_MS', 0)):
+        context = await in_thread(views.book_search_context)(request)
+    return await sync_to_async(render)(request, 'catalog/book_search.html', context)
+
+
+async def search_results(request, choice, title_search, thegenre, author):
+    with statement_timeout(getattr(settings, 'CATALOG_SEARCH_STATEMENT_TIMEOUT_MS', 0)):
+        book_list, theauthor = await in_thread(views.find_books)(choice, title_search, thegenre, author)
+        paginator, page_obj = await paginate_concurrently(request, book_list, 4, count=True)
+    if choice.find('Title') >= 0:
+        title_search = title_search.strip()
+    context = {
+        'book_list': book_list,
+        'choice': choice,
+        'title_search': title_search,
+        'thegenre': thegenre,
+        'theauthor': theauthor,
+        'size': paginator.count,
+        'page_obj': page_obj,
+    }
+    return await sync_to_async(render)(request, 'catalog/found_books.html', context)
@@ -0,0 +1 @@
+"""Django's sqlite3 and postgresql backends with the connection management of catalog.dbconnections."""
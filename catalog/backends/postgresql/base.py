@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.db.backends.postgresql import base
+
+from catalog.dbconnections import ManagedConnectionMixin
+
+
+class DatabaseWrapper(ManagedConnectionMixin, base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        timeout = getattr(settings, 'CATALOG_STATEMENT_TIMEOUT_MS', 0)
+        # pgbouncer rejects startup options, and its server sessions are shared.
+        if timeout and not getattr(settings, 'CATALOG_PGBOUNCER', False):
+            params['options'] = ('%s -c statement_timeout=%d' % (params.get('options', ''), timeout)).strip()
+        return params
+
+    def execute_with_timeout(self, ms, execute, sql, params, many, context):
+        # SET LOCAL lasts until the end of the transaction, so it can't leak
+        # into another client's use of a pooled server session. In autocommit
+        # mode the two statements of one query string run as one transaction.
+        if ms is None:
+            setting = 'SET LOCAL statement_timeout TO DEFAULT'
+        else:
+            setting = 'SET LOCAL statement_timeout = %d' % ms
+        if context['cursor'].cursor.name is None:
+            return execute('%s; %s' % (setting, sql), params, many, context)
+        # A server-side cursor declares a cursor for a single query.
+        if not self.get_autocommit():
+            with self.connection.cursor() as cursor:
+                cursor.execute(setting)
+        return execute(sql, params, many, context)
@@ -0,0 +1,19 @@
+import time
+
+from django.db.backends.sqlite3 import base
+
+from catalog.dbconnections import ManagedConnectionMixin
+
+
+class DatabaseWrapper(ManagedConnectionMixin, base.DatabaseWrapper):
+    def execute_with_timeout(self, ms, execute, sql, params, many, context):
+        # SQLite calls the handler every 1000 virtual machine instructions and
+        # interrupts the statement once it returns true. The handler stays until
+        # the next statement, as the rows of a query are stepped through as
+        # they are fetched.
+        if ms is None:
+            self.connection.set_progress_handler(None, 0)
+        else:
+            deadline = time.monotonic() + ms / 1000
+            self.connection.set_progress_handler(lambda: time.monotonic() > deadline, 1000)
+        return execute(sql, params, many, context)
@@ -0,0 +1,41 @@
+"""Resolving titles to books and copies for the borrow and renew views.
+
+Everything is looked up with filtered, ordered queries so the result does
+not depend on table order and the cost does not grow with the catalog.
+"""
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import Book, BookInstance
+
+
+def find_book(title):
+    """Return the book with this title (the oldest one if titles repeat), or None."""
+    return Book.objects.filter(title=title).order_by('pk').first()
+
+
+def copy_to_renew(title):
+    """Return the copy of a title a librarian renews: copies on loan first, earliest due first."""
+    return (BookInstance.objects.filter(book__title=title)
+            .annotate(on_loan=Case(When(status__exact='o', then=Value(0)), default=Value(1),
+                                   output_field=IntegerField()))
+            .order_by('on_loan', F('due_back').asc(nulls_last=True), 'pk')
+            .first())
+
+
+def reserve_copy(book, user):
+    """Reserve an available copy of ``book`` for ``user``.
+
+    The copy row is locked while it is claimed, so two borrowers never get
+    the same copy. Returns the reserved copy, or None if none is available.
+    """
+    with transaction.atomic():
+        copy = (BookInstance.objects.select_for_update()
+                .filter(book=book, status__exact='a')
+                .order_by(F('due_back').asc(nulls_first=True), 'pk')
+                .first())
+        if copy is not None:
+            copy.status = 'r'
+            copy.borrower = user
+            copy.save()
+        return copy
@@ -0,0 +1,72 @@
+"""Change feed of the catalog for incremental sync.
+
+The signal handlers in ``catalog.signals`` append a ChangeLogEntry for every
+save and delete of a book, author, genre, language or copy; its id is a
+monotonically increasing sequence number that clients use as their cursor.
+changes_since() compacts the entries after a cursor to the latest change
+of each object and attaches the object's current data in the JSON API's
+format, so a sync costs in proportion to what changed, not to the catalog.
+
+Sequence numbers are handed out on insert, so on a database with
+concurrent writers a transaction can commit an entry below a cursor a
+client has already passed. Clients needing every change should resume a
+few entries back; applying a change twice is harmless.
+"""
+from django.db.models import Max
+
+from . import api
+from .models import Author, Book, BookInstance, ChangeLogEntry, Genre, Language
+
+TRACKED = {
+    Book: 'books',
+    Author: 'authors',
+    Genre: 'genres',
+    Language: 'languages',
+    BookInstance: 'instances',
+}
+LIMIT = 500
+
+
+def record(model, object_ids, action, using='default'):
+    """Append a change of ``action`` for each of the objects."""
+    ChangeLogEntry.objects.using(using).bulk_create([
+        ChangeLogEntry(model=TRACKED[model], object_id=str(object_id), action=action)
+        for object_id in object_ids])
+
+
+def latest_sequence(using='default'):
+    return ChangeLogEntry.objects.using(using).aggregate(latest=Max('id'))['latest'] or 0
+
+
+def changes_since(since=0, limit=LIMIT, using='default'):
+    """Return (changes, next cursor, whether more remain) for the entries after ``since``.
+
+    Each object appears once, with its latest action and sequence number.
+    """
+    latest = list(ChangeLogEntry.objects.using(using).filter(id__gt=since)
+                  .values('model', 'object_id').annotate(seq=Max('id'))
+                  .order_by('seq').values_list('seq', flat=True)[:limit + 1])
+    more = len(latest) > limit
+    latest = latest[:limit]
+    entries = list(ChangeLogEntry.objects.using(using).filter(id__in=latest).order_by('id'))
+    objects = {}
+    for resource_name in {entry.model for entry in entries}:
+        resource = api.RESOURCES[resource_name]
+        ids = [resource.model._meta.pk.to_python(entry.object_id)
+               for entry in entries if entry.model == resource_name and entry.action != 'd']
+        fields = resource.feed_fields()
+        found = resource.queryset(fields).using(using).in_bulk(ids)
+        resource.load(list(found.values()), fields)
+        objects[resource_name] = {str(pk): resource.serialize(obj, fields) for pk, obj in found.items()}
+    changes = []
+    for entry in entries:
+        data = objects.get(entry.model, {}).get(entry.object_id)
+        changes.append({
+            'seq': entry.id,
+            'model': entry.model,
+            'id': entry.object_id,
+            # Deleted while the feed was being read.
+            'action': 'deleted' if data is None else entry.get_action_display().lower(),
+            'object': data,
+        })
+    return changes, (latest[-1] if latest else since), more
@@ -0,0 +1,61 @@
+"""Choice lists for the catalog forms.
+
+The lists are loaded the first time a form needs them, not when
+``catalog.forms`` is imported, and are kept in the cache until the signal
+handlers in ``catalog.signals`` invalidate them.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Author, Book, BookInstance, Genre, Language
+from .routers import read_for_shared_cache
+
+KEY_PREFIX = 'catalog:choices:'
+
+
+def _cached(name, load):
+    key = KEY_PREFIX + name
+    choices = cache.get(key)
+    if choices is None:
+        choices = read_for_shared_cache(load)
+        cache.set(key, choices, getattr(settings, 'CATALOG_CHOICES_TIMEOUT', 300))
+    return choices
+
+
+def _unique(values):
+    """Pair each distinct value with itself, keeping the first-seen order."""
+    return [(value, value) for value in dict.fromkeys(values)]
+
+
+def genre_choices():
+    return _cached('genres', lambda: _unique(Genre.objects.values_list('name', flat=True)))
+
+
+def author_choices():
+    """Authors as "last, first", the same as str(author)."""
+    return _cached('authors', lambda: _unique(
+        f'{last_name}, {first_name}'
+        for last_name, first_name in Author.objects.values_list('last_name', 'first_name')))
+
+
+def language_choices():
+    return _cached('languages', lambda: _unique(Language.objects.order_by('name').values_list('name', flat=True)))
+
+
+def book_choices():
+    return _cached('books', lambda: _unique(Book.objects.values_list('title', flat=True)))
+
+
+def copy_choices():
+    """Titles of the books that have at least one copy."""
+    return _cached('copies', lambda: _unique(
+        BookInstance.objects.filter(book__isnull=False).select_related('book')
+        .order_by('book__title').values_list('book__title', flat=True)))
+
+
+CHOICES = ('genres', 'authors', 'languages', 'books', 'copies')
+
+
+def invalidate(*names):
+    """Forget cached choice lists (all of them by default)."""
+    cache.delete_many([KEY_PREFIX + name for name in names or CHOICES])
@@ -0,0 +1,133 @@
+"""Database connection health checks, acquire-time metrics and statement timeouts (see catalog.backends)."""
+import collections
+import contextlib
+import contextvars
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from .instrumentation import WINDOW, _percentile
+
+
+class ConnectionMetrics:
+    """Times taken to acquire a connection, per database, in this process.
+
+    Events are 'connect' (a new connection was opened), 'check' (an open one
+    was found usable) and 'unusable' (an open one was dropped).
+    """
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.events = {}
+
+    def add(self, alias, event, ms):
+        with self.lock:
+            if alias not in self.samples:
+                self.samples[alias] = collections.deque(maxlen=self.window)
+                self.events[alias] = collections.Counter()
+            self.samples[alias].append(ms)
+            self.events[alias][event] += 1
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+            self.events.clear()
+
+    def summary(self):
+        with self.lock:
+            samples = {alias: sorted(times) for alias, times in self.samples.items()}
+            events = {alias: dict(counts) for alias, counts in self.events.items()}
+        return [{
+            'alias': alias,
+            'connects': events[alias].get('connect', 0),
+            'checks': events[alias].get('check', 0),
+            'unusable': events[alias].get('unusable', 0),
+            'p50_ms': _percentile(times, 0.5),
+            'p95_ms': _percentile(times, 0.95),
+            'max_ms': times[-1],
+        } for alias, times in sorted(samples.items())]
+
+
+metrics = ConnectionMetrics()
+
+
+# Milliseconds allowed to each statement, set by statement_timeout(). sync_to_async
+# carries it into the threads an async view queries from.
+_timeout = contextvars.ContextVar('catalog_statement_timeout', default=None)
+
+
+class ManagedConnectionMixin:
+    """Health checks, acquire-time metrics and statement timeouts for a backend's DatabaseWrapper.
+
+    The backend applies a timeout with ``execute_with_timeout(ms, execute,
+    sql, params, many, context)``; ``ms`` is None to lift the one it applied
+    to the connection's previous statement.
+    """
+
+    health_check_pending = False
+    timeout_applied = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.execute_wrappers.append(self._statement_timeout)
+
+    def _statement_timeout(self, execute, sql, params, many, context):
+        ms = _timeout.get()
+        if ms is None and not self.timeout_applied:
+            return execute(sql, params, many, context)
+        self.timeout_applied = ms is not None
+        return self.execute_with_timeout(ms, execute, sql, params, many, context)
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        metrics.add(self.alias, 'connect', (time.perf_counter() - started) * 1000)
+
+    def _cursor(self, name=None):
+        # Not in ensure_connection(), which Django's own request_started
+        # receiver calls while deciding whether to close the connection.
+        if self.health_check_pending:
+            self.health_check_pending = False
+            # Inside a transaction the connection can't be swapped for another.
+            if self.connection is not None and not self.in_atomic_block:
+                started = time.perf_counter()
+                usable = self.is_usable()
+                if not usable:
+                    self.close()
+                metrics.add(self.alias, 'check' if usable else 'unusable', (time.perf_counter() - started) * 1000)
+        return super()._cursor(name)
+
+
+def mark_for_health_check(**kwargs):
+    """request_started receiver: check the connections left open before they are used again.
+
+    Django 3.2 keeps using a persistent connection that died, e.g. in a
+    Postgres failover, until a query fails on it (CONN_HEALTH_CHECKS from 4.1).
+    """
+    if not getattr(settings, 'CATALOG_CONN_HEALTH_CHECKS', True):
+        return
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.health_check_pending = True
+
+
+@contextlib.contextmanager
+def statement_timeout(ms):
+    """Cancel each statement run in the block for longer than ``ms`` milliseconds.
+
+    The statement that runs out of time raises django.db.OperationalError.
+    Also works as a view decorator. Does nothing on backends that aren't
+    from catalog.backends.
+    """
+    if not ms:
+        yield
+        return
+    token = _timeout.set(ms)
+    try:
+        yield
+    finally:
+        _timeout.reset(token)
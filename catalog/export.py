@@ -0,0 +1,122 @@
+"""Streaming CSV export of the catalog.
+
+Rows are produced by merging two ordered cursors (books with their
+language and book/author links), so an export costs the same two queries
+and roughly the same memory whatever the catalog size. Genres come from
+the book's ``genres_display`` column.
+"""
+import csv
+import tempfile
+import zlib
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from .models import Book
+
+EXPORT_FILENAME = 'exported_books.csv'
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() just hands back what csv.writer wrote."""
+
+    def write(self, value):
+        return value
+
+
+def _grouped(rows):
+    """Turn (book_id, value) rows ordered by book_id into a book_id -> [values] stream."""
+    current, values = None, []
+    for book_id, value in rows:
+        if book_id != current:
+            if current is not None:
+                yield current, values
+            current, values = book_id, []
+        values.append(value)
+    if current is not None:
+        yield current, values
+
+
+def _related(grouped):
+    """Return a lookup that walks a grouped stream in step with the books."""
+    pending = next(grouped, None)
+
+    def lookup(book_id):
+        nonlocal pending
+        while pending is not None and pending[0] < book_id:
+            pending = next(grouped, None)
+        if pending is not None and pending[0] == book_id:
+            return pending[1]
+        return []
+    return lookup
+
+
+def export_rows(chunk_size=CHUNK_SIZE, queryset=None):
+    """Yield one [title, authors, summary, genres, isbn, language] row per book.
+
+    Authors are written as "first,last;first,last" and genres as
+    "name, name", the format ``catalog.importer`` reads back.
+    """
+    if queryset is None:
+        queryset = Book.objects.all()
+    books = queryset.select_related('language').order_by('pk').iterator(chunk_size=chunk_size)
+    authors = (Book.author.through.objects.using(queryset.db)
+               .filter(book__in=queryset.values('pk'))
+               .order_by('book_id', 'author__last_name', 'author__first_name')
+               .values_list('book_id', 'author__first_name', 'author__last_name')
+               .iterator(chunk_size=chunk_size))
+    authors_of = _related(_grouped((book_id, first + ',' + last) for book_id, first, last in authors))
+    for book in books:
+        yield [
+            book.title,
+            ';'.join(authors_of(book.pk)),
+            book.summary,
+            book.genres_display,
+            book.isbn,
+            book.language.name if book.language else '',
+        ]
+
+
+def csv_lines(rows):
+    """Encode rows as quoted CSV lines, one string per row."""
+    writer = csv.writer(Echo(), quoting=csv.QUOTE_ALL, lineterminator='\n')
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def gzipped(lines, encoding='utf-8'):
+    """Gzip a stream of text lines, yielding compressed chunks as they fill up."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for line in lines:
+        chunk = compressor.compress(line.encode(encoding))
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+def store_export(name=EXPORT_FILENAME, compress=False, storage=default_storage, **kwargs):
+    """Write the export to ``storage`` and return (stored name, number of books).
+
+    The file is spooled through a temporary file on disk, so memory stays flat.
+    """
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    lines = csv_lines(counted(export_rows(**kwargs)))
+    chunks = gzipped(lines) if compress else (line.encode('utf-8') for line in lines)
+    if compress and not name.endswith('.gz'):
+        name += '.gz'
+    with tempfile.TemporaryFile() as spool:
+        for chunk in chunks:
+            spool.write(chunk)
+        spool.seek(0)
+        if storage.exists(name):
+            storage.delete(name)
+        name = storage.save(name, File(spool))
+    return name, count
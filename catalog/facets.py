@@ -0,0 +1,84 @@
+"""Book and available-copy counts per genre, language and author, kept in the cache.
+
+Each facet is counted by one aggregate query over all of its values. Every
+count has its own cache key so the signal handlers in ``catalog.signals``
+can adjust it in place with incr when books are linked to a genre or an
+author; changes they can't follow exactly (unlinking, deletions, a copy
+changing status) drop the facet, which is then counted again when it is
+next read.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.db.models import Count, Q
+
+from .models import Author, Genre, Language
+from .routers import read_for_shared_cache
+
+FACETS = {
+    'genre': Genre,
+    'language': Language,
+    'author': Author,
+}
+PARTS = ('books', 'available')
+KEY_PREFIX = 'catalog:facets:'
+
+
+def _timeout():
+    return getattr(settings, 'CATALOG_FACETS_TIMEOUT', 300)
+
+
+def _key(facet, pk, part):
+    return '%s%s:%s:%s' % (KEY_PREFIX, facet, pk, part)
+
+
+def _ids_key(facet):
+    return '%s%s:ids' % (KEY_PREFIX, facet)
+
+
+def compute(facet, using=None):
+    """``{pk: {'books': n, 'available': n}}`` for every value of a facet, in one query."""
+    model = FACETS[facet]
+    using = using or router.db_for_read(model)
+    rows = (model.objects.using(using).order_by()
+            .annotate(books=Count('book', distinct=True),
+                      available=Count('book__bookinstance', distinct=True,
+                                      filter=Q(book__bookinstance__status__exact='a')))
+            .values_list('pk', 'books', 'available'))
+    return {pk: {'books': books, 'available': available} for pk, books, available in rows}
+
+
+def counts(facet):
+    """The counts of every value of a facet, from the cache when they are all there."""
+    ids = cache.get(_ids_key(facet))
+    if ids is not None:
+        keys = [_key(facet, pk, part) for pk in ids for part in PARTS]
+        cached = cache.get_many(keys)
+        if len(cached) == len(keys):
+            return {pk: {part: cached[_key(facet, pk, part)] for part in PARTS} for pk in ids}
+    found = read_for_shared_cache(compute, facet)
+    values = {_key(facet, pk, part): count[part] for pk, count in found.items() for part in PARTS}
+    values[_ids_key(facet)] = list(found)
+    cache.set_many(values, _timeout())
+    return found
+
+
+def adjust(facet, pk, part, delta):
+    """Add ``delta`` to a cached count; a missing count is left to be recomputed."""
+    try:
+        cache.incr(_key(facet, pk, part), delta)
+    except ValueError:
+        pass
+
+
+def invalidate(*facets):
+    """Forget the counts of some facets (all of them by default)."""
+    cache.delete_many([_ids_key(facet) for facet in facets or FACETS])
+
+
+def ranked(facet, limit=None):
+    """(object, counts) for the values of a facet with the most books, most first."""
+    found = counts(facet)
+    ids = sorted(found, key=lambda pk: (-found[pk]['books'], pk))[:limit]
+    objects = FACETS[facet].objects.in_bulk(ids)
+    return [(objects[pk], found[pk]) for pk in ids if pk in objects]
@@ -4,7 +4,7 @@ from django import forms
 
 from django.core.exceptions import ValidationError
 from django.utils.translation import ugettext_lazy as _
-from .models import Genre,Book,BookInstance,Author
+from . import choices
 
 class RenewBookForm(forms.Form):
     renewal_date = forms.DateField(help_text="Enter a date between now and 4 weeks (default 3).")
@@ -23,39 +23,18 @@ class RenewBookForm(forms.Form):
         # Remember to always return the cleaned data.
         return data
 class GenreForm(forms.Form):
-    
-    genres = Genre.objects.all()
-    CHOICES =[]
-    for a_genre in genres:
-        CHOICES.append((a_genre,a_genre))
-    choice = forms.ChoiceField(choices=CHOICES)
+    choice = forms.ChoiceField(choices=choices.genre_choices)
+def _any(load):
+    """Choices loaded by ``load`` after a blank one that leaves the criterion out."""
+    return lambda: [('', 'Any')] + load()
 class BookSearchForm(forms.Form):
-    
-    CHOICES =[('Genre','Genre'),('Title','Title'),('Author','Author')]
-    choice = forms.ChoiceField(choices=CHOICES)
-    title_search = forms.CharField(required=False,initial=" ")
-    
-    genres = Genre.objects.all()
-    CHOICES1 =[]
-    for a_genre in genres:
-        CHOICES1.append((a_genre.name,a_genre.name))
-    genre = forms.ChoiceField(choices=CHOICES1)
-    authors = Author.objects.all()
-    CHOICES2 =[]
-    for a_author in authors:
-        CHOICES2.append((a_author,a_author))
-    author = forms.ChoiceField(choices=CHOICES2)
+    """Search criteria, all optional, combined by catalog.search.BookSearch.where()."""
+    title = forms.CharField(required=False)
+    genre = forms.ChoiceField(choices=_any(choices.genre_choices),required=False)
+    author = forms.ChoiceField(choices=_any(choices.author_choices),required=False)
+    language = forms.ChoiceField(choices=_any(choices.language_choices),required=False)
+    available = forms.BooleanField(required=False,label='Available now')
 class BookForm(forms.Form):
-    
-    books = Book.objects.all()
-    CHOICES =[]
-    for a_book in books:
-        CHOICES.append((a_book.title,a_book.title))
-    choice = forms.ChoiceField(choices=CHOICES)
+    choice = forms.ChoiceField(choices=choices.book_choices)
 class BookInstanceForm(forms.Form):
-    bookinstances = BookInstance.objects.all()
-    CHOICES =[]
-    for a_bookinstance in bookinstances:
-        CHOICES.append((a_bookinstance.book.title,a_bookinstance.book.title))
-    choice = forms.ChoiceField(choices=CHOICES)
-    
+    choice = forms.ChoiceField(choices=choices.copy_choices)
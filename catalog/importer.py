@@ -0,0 +1,167 @@
+"""Bulk CSV import of books.
+
+Reads the format written by ``catalog.export``: title, authors
+("first,last;first,last"), summary, genres ("name, name"), ISBN and
+language. Lookups are loaded once up front, missing authors, genres and
+languages are created in batches, and every chunk of rows is committed in
+its own transaction with a handful of bulk queries.
+"""
+import csv
+import time
+
+from django.db import transaction
+
+from . import changes, choices, facets, pagecache, stats
+from .models import Author, Book, Genre, Language
+
+CHUNK_SIZE = 500
+
+
+class ImportResult:
+    """Summary of an import run."""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.skipped = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return '%d rows (%d created, %d skipped) in %.2fs, %.0f rows/sec' % (
+            self.rows, self.created, self.skipped, self.seconds, self.rows_per_second)
+
+
+def parse_authors(value):
+    """Split "first,last;first,last" into (first, last) pairs."""
+    authors = []
+    for name in value.split(';'):
+        if not name.strip():
+            continue
+        first, _, last = name.partition(',')
+        authors.append((first.strip(), last.strip()))
+    return authors
+
+
+def parse_genres(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BookImporter:
+    """Import rows of book data in bulk, keeping lookups between chunks."""
+
+    def __init__(self, chunk_size=CHUNK_SIZE, using='default'):
+        self.chunk_size = chunk_size
+        self.using = using
+        self.isbns, self.titles = set(), set()
+        for isbn, title in Book.objects.using(using).order_by().values_list('isbn', 'title'):
+            self.isbns.add(isbn)
+            self.titles.add(title)
+        self.authors = {(first, last): pk for pk, first, last in
+                        Author.objects.using(using).values_list('pk', 'first_name', 'last_name')}
+        self.genres = {name: pk for pk, name in Genre.objects.using(using).values_list('pk', 'name')}
+        self.languages = {name: pk for pk, name in Language.objects.using(using).values_list('pk', 'name')}
+
+    def run(self, rows):
+        result = ImportResult()
+        started = time.monotonic()
+        for chunk in _chunks(rows, self.chunk_size):
+            with transaction.atomic(using=self.using):
+                result.created += self._import_chunk(chunk, result)
+            result.rows += len(chunk)
+        result.seconds = time.monotonic() - started
+        return result
+
+    def _import_chunk(self, chunk, result):
+        books = []
+        for row in chunk:
+            if len(row) < 6:
+                result.skipped += 1
+                continue
+            title, authors, summary, genres, isbn, language = (value.strip() for value in row[:6])
+            if title in self.titles or isbn in self.isbns:
+                result.skipped += 1
+                continue
+            self.titles.add(title)
+            self.isbns.add(isbn)
+            authors, genres = parse_authors(authors), parse_genres(genres)
+            # The display columns are written here since bulk_create() sends no m2m_changed.
+            books.append((Book(title=title, summary=summary, isbn=isbn,
+                               authors_display=', '.join(first + ' ' + last for first, last in
+                                                         sorted(set(authors), key=lambda name: (name[1], name[0]))),
+                               genres_display=', '.join(sorted(set(genres)))),
+                          authors, genres, language))
+        if not books:
+            return 0
+
+        author_names = {name for _, names, _, _ in books for name in names}
+        self._resolve(Author, self.authors, author_names,
+                      lambda name: Author(first_name=name[0], last_name=name[1]),
+                      ('first_name', 'last_name'), last_name__in={last for _, last in author_names})
+        genre_names = {name for _, _, names, _ in books for name in names}
+        self._resolve(Genre, self.genres, genre_names, lambda name: Genre(name=name),
+                      ('name',), name__in=genre_names)
+        language_names = {language for _, _, _, language in books if language}
+        self._resolve(Language, self.languages, language_names, lambda name: Language(name=name),
+                      ('name',), name__in=language_names)
+
+        for book, _, _, language in books:
+            book.language_id = self.languages.get(language)
+        Book.objects.using(self.using).bulk_create([book for book, _, _, _ in books])
+        # Not every backend hands back primary keys from bulk_create.
+        book_ids = dict(Book.objects.using(self.using)
+                        .filter(isbn__in=[book.isbn for book, _, _, _ in books])
+                        .values_list('isbn', 'pk'))
+
+        BookAuthor = Book.author.through
+        BookGenre = Book.genre.through
+        BookAuthor.objects.using(self.using).bulk_create([
+            BookAuthor(book_id=book_ids[book.isbn], author_id=self.authors[name])
+            for book, names, _, _ in books for name in names], ignore_conflicts=True)
+        BookGenre.objects.using(self.using).bulk_create([
+            BookGenre(book_id=book_ids[book.isbn], genre_id=self.genres[name])
+            for book, _, names, _ in books for name in names], ignore_conflicts=True)
+
+        # No signal handler saw these rows: log them and drop the caches they change.
+        changes.record(Book, book_ids.values(), 'c', using=self.using)
+        transaction.on_commit(stats.invalidate, using=self.using)
+        transaction.on_commit(choices.invalidate, using=self.using)
+        transaction.on_commit(facets.invalidate, using=self.using)
+        transaction.on_commit(pagecache.invalidate, using=self.using)
+        return len(books)
+
+    def _resolve(self, model, lookup, names, build, fields, **filters):
+        """Make sure every name has a primary key in ``lookup``, creating rows as needed.
+
+        ``fields`` make up a name, ``filters`` narrow the re-read of the created rows.
+        """
+        missing = names - lookup.keys()
+        if not missing:
+            return
+        queryset = model.objects.using(self.using)
+        queryset.bulk_create([build(name) for name in missing], ignore_conflicts=True)
+        for row in queryset.filter(**filters).values_list('pk', *fields):
+            name = row[1] if len(fields) == 1 else row[1:]
+            if name in missing:
+                lookup.setdefault(name, row[0])
+        changes.record(model, [lookup[name] for name in missing if name in lookup], 'c', using=self.using)
+
+
+def import_books(csvfile, chunk_size=CHUNK_SIZE, using='default'):
+    """Import books from an open CSV file and return an ImportResult."""
+    reader = csv.reader(csvfile, delimiter=',', quotechar='"')
+    return BookImporter(chunk_size=chunk_size, using=using).run(reader)
@@ -0,0 +1,175 @@
+"""Per-request timing and SQL instrumentation for a sample of requests."""
+import asyncio
+import collections
+import json
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+
+logger = logging.getLogger('catalog.instrumentation')
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended.
+BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500)
+WINDOW = 500
+
+_NUMBER = re.compile(r'\b\d+(\.\d+)?\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_LIST = re.compile(r'\(\s*(%s|\?)(\s*,\s*(%s|\?))*\s*\)')
+
+
+def fingerprint(sql):
+    """Reduce a statement to its shape: literals and IN lists become ``?``."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _LIST.sub('(?)', ' '.join(sql.split()))
+
+
+class QueryRecorder:
+    """execute_wrapper that counts statements and the time spent running them."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = collections.Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.shapes[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        """(shape, times run) for every statement shape run more than once."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > 1]
+
+
+class RollingHistogram:
+    """The last WINDOW samples of every view, kept in memory of this process."""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def add(self, view, wall_ms, db_ms, queries):
+        with self.lock:
+            if view not in self.samples:
+                self.samples[view] = collections.deque(maxlen=self.window)
+            self.samples[view].append((wall_ms, db_ms, queries))
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+
+    def summary(self):
+        """One dict per view, slowest p95 first."""
+        with self.lock:
+            samples = {view: list(rows) for view, rows in self.samples.items()}
+        views = []
+        for view, rows in samples.items():
+            walls = sorted(wall for wall, _, _ in rows)
+            buckets = [0] * (len(BUCKETS) + 1)
+            for wall in walls:
+                buckets[next((n for n, bound in enumerate(BUCKETS) if wall <= bound), len(BUCKETS))] += 1
+            views.append({
+                'view': view,
+                'requests': len(rows),
+                'p50_ms': _percentile(walls, 0.5),
+                'p95_ms': _percentile(walls, 0.95),
+                'max_ms': walls[-1],
+                'db_ms': sum(db for _, db, _ in rows) / len(rows),
+                'queries': sum(queries for _, _, queries in rows) / len(rows),
+                'buckets': buckets,
+            })
+        return sorted(views, key=lambda row: row['p95_ms'], reverse=True)
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def bucket_labels():
+    return ['<= %d ms' % bound for bound in BUCKETS] + ['> %d ms' % BUCKETS[-1]]
+
+
+histogram = RollingHistogram()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+@contextmanager
+def _recording(recorder):
+    """Have every database connection of this thread report to ``recorder`` in the block."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield
+
+
+class RequestMetricsMiddleware(MiddlewareMixin):
+    """Time a sample of requests and the SQL they run.
+
+    A sampled response gets a Server-Timing header, a JSON log line (WARNING
+    when slow) and a place in the request-metrics page's histogram. Its own
+    __call__ and __acall__ keep async views off sync threads, unlike the
+    mixin's hooks; the queries such a view runs in worker threads aren't
+    seen, only its wall time.
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if random.random() >= settings.CATALOG_METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with _recording(recorder):
+            response = self.get_response(request)
+        return self.record(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        if random.random() >= settings.CATALOG_METRICS_SAMPLE_RATE:
+            return await self.get_response(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with _recording(recorder):
+            response = await self.get_response(request)
+        return self.record(request, response, recorder, started)
+
+    def record(self, request, response, recorder, started):
+        wall_ms = (time.perf_counter() - started) * 1000
+        db_ms = recorder.seconds * 1000
+        view = view_name(request)
+        histogram.add(view, wall_ms, db_ms, recorder.count)
+        response['Server-Timing'] = 'app;dur=%.1f, db;dur=%.1f;desc="%d queries"' % (
+            wall_ms - db_ms, db_ms, recorder.count)
+        slow = wall_ms >= settings.CATALOG_SLOW_REQUEST_MS
+        level = logging.WARNING if slow else logging.INFO
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({
+                'event': 'slow_request' if slow else 'request',
+                'method': request.method,
+                'path': request.path,
+                'view': view,
+                'status': response.status_code,
+                'wall_ms': round(wall_ms, 1),
+                'db_ms': round(db_ms, 1),
+                'queries': recorder.count,
+                'duplicates': [{'sql': shape, 'count': count} for shape, count in recorder.duplicates()],
+            }))
+        return response
@@ -0,0 +1,171 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import importlib
+import io
+import time
+
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+from django.urls import clear_url_caches, reverse
+
+import catalog.urls
+import locallibrary.urls
+from catalog.management.commands.benchmark_catalog import percentile
+from catalog.models import Author, Book, Genre
+from locallibrary.asgi import thread_per_request
+
+HOST = 'localhost'
+
+
+class Command(BaseCommand):
+    help = ('Compare the throughput of the WSGI and ASGI applications, with the configured middleware, '
+            'on the catalog read pages under concurrent load. Run it against a seeded database '
+            '(see seed_catalog).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per page and mode.')
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help='Requests in flight at once (WSGI threads, or ASGI tasks).')
+        parser.add_argument('--query-delay-ms', type=float, default=0,
+                            help='Extra latency added to every query, to stand in for a remote database.')
+        parser.add_argument('--username', default=None,
+                            help='Send the requests as this user, which bypasses the anonymous page cache '
+                                 '(defaults to the first superuser, if any).')
+
+    def handle(self, *args, **options):
+        if options['username']:
+            user = User.objects.get(username=options['username'])
+        else:
+            user = User.objects.filter(is_superuser=True).order_by('pk').first()
+        self.cookie = ''
+        if user is not None:
+            client = Client()
+            client.force_login(user)
+            self.cookie = client.cookies.output(attrs=[], header='', sep=';').strip()
+        delay = options['query_delay_ms'] / 1000
+
+        def slow(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def add_delay(sender, connection, **kwargs):
+            connection.execute_wrappers.append(slow)
+
+        if delay:
+            connection_created.connect(add_delay)
+            connection.close()
+        try:
+            pages = [(name, reverse(name, kwargs=kwargs)) for name, kwargs in self.pages()]
+            results = {}
+            for mode in ('wsgi', 'asgi'):
+                with self.urls(async_views=mode == 'asgi'):
+                    for name, url in pages:
+                        if mode == 'wsgi':
+                            results[name, mode] = self.run_wsgi(WSGIHandler(), url, options)
+                        else:
+                            app = thread_per_request(ASGIHandler())
+                            results[name, mode] = asyncio.run(self.run_asgi(app, url, options))
+            for name, _ in pages:
+                for mode in ('wsgi', 'asgi'):
+                    result = results[name, mode]
+                    self.stdout.write('%-22s %s  %7.1f req/s  p50 %7.2f ms  p95 %7.2f ms  %d errors' % (
+                        name, mode, result['throughput'], result['p50_ms'], result['p95_ms'], result['errors']))
+        finally:
+            connection_created.disconnect(add_delay)
+
+    @contextlib.contextmanager
+    def urls(self, async_views):
+        """The URLconf with the sync or the async read views, as the site has under each server."""
+        with override_settings(CATALOG_ASYNC_VIEWS=async_views):
+            self.reload_urls()
+            try:
+                yield
+            finally:
+                self.reload_urls()
+
+    def reload_urls(self):
+        importlib.reload(catalog.urls)
+        importlib.reload(locallibrary.urls)
+        clear_url_caches()
+
+    def pages(self):
+        book = Book.objects.order_by('pk').values_list('pk', flat=True).first()
+        author = Author.objects.order_by('pk').values_list('pk', flat=True).first()
+        genre = Genre.objects.order_by('pk').values_list('name', flat=True).first()
+        yield 'index', {}
+        yield 'books', {}
+        yield 'authors', {}
+        if book is not None:
+            yield 'book-detail', {'pk': book}
+        if author is not None:
+            yield 'author-detail', {'pk': author}
+        if genre is not None:
+            yield 'list-books-by-genre', {'genre': genre}
+
+    def result(self, fetched, elapsed):
+        timings = [ms for ms, _ in fetched]
+        return {
+            'throughput': len(timings) / elapsed,
+            'p50_ms': percentile(timings, 0.5),
+            'p95_ms': percentile(timings, 0.95),
+            'errors': sum(status >= 400 for _, status in fetched),
+        }
+
+    def run_wsgi(self, app, url, options):
+        def fetch(_):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': url, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': HOST,
+                'HTTP_COOKIE': self.cookie, 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+                'wsgi.errors': io.StringIO(), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+                'wsgi.run_once': False, 'wsgi.version': (1, 0),
+            }
+            started = time.perf_counter()
+            statuses = []
+            response = app(environ, lambda status, headers, exc_info=None: statuses.append(int(status[:3])))
+            try:
+                b''.join(response)
+            finally:
+                response.close()
+            return (time.perf_counter() - started) * 1000, statuses[0]
+
+        fetch(None)  # warm up caches and lazily imported code
+        started = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(options['concurrency']) as pool:
+            timings = list(pool.map(fetch, range(options['requests'])))
+        return self.result(timings, time.perf_counter() - started)
+
+    async def run_asgi(self, app, url, options):
+        slots = asyncio.Semaphore(options['concurrency'])
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': url, 'raw_path': url.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', HOST.encode()), (b'cookie', self.cookie.encode())],
+            'server': (HOST, 80), 'client': ('127.0.0.1', 0),
+        }
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def fetch():
+            statuses = []
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            async with slots:
+                started = time.perf_counter()
+                await app(dict(scope), receive, send)
+                return (time.perf_counter() - started) * 1000, statuses[0]
+
+        await fetch()
+        started = time.perf_counter()
+        timings = await asyncio.gather(*(fetch() for _ in range(options['requests'])))
+        return self.result(timings, time.perf_counter() - started)
@@ -0,0 +1,164 @@
+import datetime
+import json
+import time
+import tracemalloc
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import URLPattern, URLResolver, reverse
+
+from catalog import urls
+from catalog.models import Author, Book, BookInstance, Genre
+
+# Endpoints that change data when fetched.
+SKIP = {'import-books'}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def url_patterns(patterns, prefix=''):
+    """Yield (namespaced name, pattern) for every named URL pattern."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            namespace = prefix + pattern.namespace + ':' if pattern.namespace else prefix
+            yield from url_patterns(pattern.url_patterns, namespace)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield prefix + pattern.name, pattern
+
+
+class Command(BaseCommand):
+    help = ('Request every catalog URL through the test client and report latency percentiles, '
+            'query counts and peak memory per endpoint as JSON. Run it against a seeded database '
+            '(see seed_catalog).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per endpoint.')
+        parser.add_argument('--output', default='benchmark_report.json', help='Where to write the JSON report.')
+        parser.add_argument('--username', default=None,
+                            help='Log in as this user (defaults to the first superuser, if any).')
+
+    def handle(self, *args, **options):
+        try:
+            setup_test_environment()
+        except RuntimeError:
+            # Already set up, e.g. when called from the test runner.
+            report = self.run(options)
+        else:
+            try:
+                report = self.run(options)
+            finally:
+                teardown_test_environment()
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2)
+        for name, result in report['endpoints'].items():
+            if 'skipped' in result:
+                self.stdout.write('%-28s skipped: %s' % (name, result['skipped']))
+            else:
+                self.stdout.write('%-28s %3d  p50 %7.2f ms  p95 %7.2f ms  %3d queries  %7.1f KiB' % (
+                    name, result['status'], result['p50_ms'], result['p95_ms'], result['queries'],
+                    result['peak_memory_kib']))
+        self.stdout.write(self.style.SUCCESS('Wrote %s' % options['output']))
+
+    def run(self, options):
+        client = Client()
+        if options['username']:
+            user = User.objects.get(username=options['username'])
+        else:
+            user = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if user is not None:
+            client.force_login(user)
+        samples = self.samples()
+        endpoints = {}
+        for name, pattern in url_patterns(urls.urlpatterns):
+            if name in SKIP:
+                endpoints[name] = {'skipped': 'changes data'}
+                continue
+            kwargs = self.kwargs_for(pattern, samples)
+            if kwargs is None:
+                endpoints[name] = {'skipped': 'no sample data for its arguments'}
+                continue
+            endpoints[name] = self.measure(client, reverse(name, kwargs=kwargs), options['repeat'])
+        return {
+            'created': datetime.datetime.now().isoformat(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'user': user.get_username() if user else None,
+            'rows': {model.__name__: model.objects.count() for model in (Book, Author, Genre, BookInstance)},
+            'endpoints': endpoints,
+        }
+
+    def samples(self):
+        author = Author.objects.order_by('pk').first()
+        return {
+            'book': Book.objects.order_by('pk').values_list('pk', flat=True).first(),
+            'author': author.pk if author else None,
+            'author_name': str(author) if author else None,
+            'copy': BookInstance.objects.order_by('pk').values_list('pk', flat=True).first(),
+            'genre': Genre.objects.order_by('pk').values_list('name', flat=True).first(),
+            'word': (Book.objects.order_by('pk').values_list('title', flat=True).first() or 'the').split()[-1],
+        }
+
+    def kwargs_for(self, pattern, samples):
+        """Pick sample values for a pattern's arguments, or None if there are none."""
+        kwargs = {}
+        for argument, converter in pattern.pattern.converters.items():
+            kind = type(converter).__name__
+            if kind == 'UUIDConverter':
+                value = samples['copy']
+            elif kind == 'IntConverter':
+                value = samples['author'] if pattern.name.startswith('author') else samples['book']
+            elif argument in ('genre', 'thegenre'):
+                value = samples['genre']
+            elif argument == 'author':
+                value = samples['author_name']
+            elif argument == 'choice':
+                value = 'Title'
+            else:
+                value = samples['word']
+            if value is None:
+                return None
+            kwargs[argument] = value
+        return kwargs
+
+    def measure(self, client, url, repeat):
+        def fetch():
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return response
+
+        fetch()  # warm up caches and lazily imported code
+        timings = []
+        queries = []
+        # connection.queries is reset at the start of every request, so count with a wrapper.
+        with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+            response = fetch()
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fetch()
+            timings.append((time.perf_counter() - started) * 1000)
+        tracemalloc.start()
+        try:
+            fetch()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            'url': url,
+            'status': response.status_code,
+            'queries': len(queries),
+            'mean_ms': sum(timings) / len(timings),
+            'p50_ms': percentile(timings, 0.5),
+            'p90_ms': percentile(timings, 0.9),
+            'p95_ms': percentile(timings, 0.95),
+            'p99_ms': percentile(timings, 0.99),
+            'max_ms': max(timings),
+            'peak_memory_kib': peak / 1024,
+        }
@@ -0,0 +1,37 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog import assets
+
+
+class Command(BaseCommand):
+    help = ('Vendor third-party static files, build the minified bundles, collect the static files '
+            'and report the bundle sizes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fetch', action='store_true',
+                            help='Download vendor files that are missing from catalog/static/vendor.')
+        parser.add_argument('--no-collect', action='store_true', help="Don't run collectstatic afterwards.")
+
+    def handle(self, *args, **options):
+        for name in assets.VENDOR:
+            if assets.find_source(name) is None:
+                if not options['fetch']:
+                    raise CommandError('%s has not been vendored; run with --fetch to download it.' % name)
+                try:
+                    path = assets.fetch_vendor(name)
+                except (OSError, ValueError) as error:
+                    raise CommandError('Could not vendor %s: %s' % (name, error))
+                self.stdout.write('Vendored %s' % path)
+        built = {}
+        for name in assets.BUNDLES:
+            try:
+                built[name] = assets.build_bundle(name)
+            except FileNotFoundError as error:
+                raise CommandError('Source %s of %s not found.' % (error, name))
+        if not options['no_collect']:
+            call_command('collectstatic', interactive=False, verbosity=0)
+        for name, path in built.items():
+            size = assets.sizes(path)
+            self.stdout.write('%s: %d bytes, %d gzip, %s brotli' % (
+                name, size['raw'], size['gzip'], 'n/a' if size['brotli'] is None else '%d' % size['brotli']))
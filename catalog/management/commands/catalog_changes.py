@@ -0,0 +1,26 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from catalog import changes
+
+
+class Command(BaseCommand):
+    help = ('Print the catalog changes after a sequence number as JSON lines, one per changed object, '
+            'followed by a line with the cursor to resume from.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=int, default=0, help='Sequence number of the last change already seen.')
+        parser.add_argument('--limit', type=int, default=changes.LIMIT, help='Changes per batch.')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        since = options['since']
+        while True:
+            entries, since, more = changes.changes_since(since, limit=options['limit'], using=options['database'])
+            for entry in entries:
+                self.stdout.write(json.dumps(entry, cls=DjangoJSONEncoder))
+            if not more:
+                break
+        self.stdout.write(json.dumps({'next': since}))
@@ -0,0 +1,80 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from catalog import seeding
+from catalog.models import Author, Book, BookInstance, Genre
+
+# Indexes added for the hot queries below (see migrations 0015_query_indexes).
+QUERY_INDEXES = (
+    'catalog_author_name_idx',
+    'catalog_book_title_idx',
+    'catalog_book_title_trgm_idx',
+    'catalog_copy_status_due_idx',
+    'catalog_copy_borrower_due_idx',
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Show the query plans and timings of the catalog\'s hot queries with and without '
+            'their supporting indexes. Everything runs in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Add this many synthetic books (with copies, authors, genres) first.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query.')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['seed']:
+                    created = seeding.seed_catalog(books=options['seed'], copies_per_book=2)
+                    self.stdout.write('Seeded %(books)d books and %(copies)d copies' % created)
+                queries = self.queries()
+                self.report('With indexes', queries, options['repeat'])
+                with connection.cursor() as cursor:
+                    for name in QUERY_INDEXES:
+                        cursor.execute('DROP INDEX IF EXISTS %s' % connection.ops.quote_name(name))
+                self.report('Without indexes', queries, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def queries(self):
+        borrower = User.objects.order_by('pk').first()
+        title = Book.objects.order_by('pk').values_list('title', flat=True).last() or ''
+        word = (title.split() or [''])[-1]
+        genre = Genre.objects.order_by('pk').values_list('name', flat=True).first() or ''
+        return [
+            ('Loans of one borrower', BookInstance.objects.filter(borrower=borrower, status__exact='o').order_by('due_back')[:10]),
+            ('All loans by due date', BookInstance.objects.filter(status__exact='o').order_by('due_back')[:4]),
+            ('Book by title', Book.objects.filter(title=title)),
+            ('Books with a word in the title', Book.objects.filter(title__icontains=word)),
+            ('Books of a genre', Book.objects.filter(genre__name=genre)[:4]),
+            ('Authors page', Author.objects.all()[:4]),
+        ]
+
+    def report(self, heading, queries, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(heading))
+        for label, queryset in queries:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write('  %s: best %.2f ms' % (label, min(timings)))
+            for line in self.explain(queryset, heading):
+                self.stdout.write('      ' + line)
+
+    def explain(self, queryset, tag):
+        # The tag keeps a cached plan from the other run from being reused.
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('%s %s /* %s */' % (connection.ops.explain_query_prefix(), sql, tag), params)
+            return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
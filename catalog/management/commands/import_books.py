@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from catalog import importer
+
+
+class Command(BaseCommand):
+    help = 'Import books from a CSV file in the format written by the book export.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='exported_books.csv')
+        parser.add_argument('--chunk-size', type=int, default=importer.CHUNK_SIZE,
+                            help='Number of rows committed per transaction.')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        with open(options['path'], newline='') as csvfile:
+            result = importer.import_books(csvfile, chunk_size=options['chunk_size'],
+                                           using=options['database'])
+        self.stdout.write(self.style.SUCCESS('Imported %s' % result))
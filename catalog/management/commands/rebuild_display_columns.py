@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from catalog.models import Book
+
+
+class Command(BaseCommand):
+    help = "Recompute every book's denormalized authors_display and genres_display columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to rebuild.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = Book.objects.using(options['database']).refresh_display_columns(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Refreshed %d books' % count))
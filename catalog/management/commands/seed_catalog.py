@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from catalog import seeding
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with a deterministic synthetic catalog for benchmarking.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=1000)
+        parser.add_argument('--authors', type=int, default=None,
+                            help='Defaults to one author for every five books.')
+        parser.add_argument('--genres', type=int, default=30)
+        parser.add_argument('--languages', type=int, default=8)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--copies-per-book', type=int, default=3,
+                            help='Average number of copies of each book.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created = seeding.seed_catalog(
+                books=options['books'], authors=options['authors'], genres=options['genres'],
+                languages=options['languages'], users=options['users'],
+                copies_per_book=options['copies_per_book'], seed=options['seed'],
+                batch_size=options['batch_size'], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            'Seeded ' + ', '.join('%d %s' % (count, kind) for kind, count in created.items())))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from catalog import outbox, overdue
+
+
+class Command(BaseCommand):
+    help = 'Email every borrower one digest of their overdue loans that have not been reminded about yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=overdue.BATCH_SIZE,
+                            help='Borrowers whose digests are queued per transaction.')
+        parser.add_argument('--queue-only', action='store_true',
+                            help='Leave the digests in the outbox for send_queued_mail.')
+
+    def handle(self, *args, **options):
+        digests, loans = overdue.queue_overdue_notices(batch_size=options['batch_size'])
+        self.stdout.write('Queued %d digests for %d overdue loans' % (digests, loans))
+        if options['queue_only']:
+            return
+        while True:
+            sent, failed = outbox.send_queued()
+            if not (sent or failed):
+                break
+            self.stdout.write('Sent %d, failed %d, %d queued' % (sent, failed, outbox.queue_depth()))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from catalog import outbox
+
+
+class Command(BaseCommand):
+    help = 'Send the email waiting in the catalog outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=outbox.BATCH_SIZE,
+                            help='Messages sent per mail server connection.')
+        parser.add_argument('--max-attempts', type=int, default=outbox.MAX_ATTEMPTS,
+                            help='Give up on a message after this many failures.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the outbox instead of exiting once it is drained.')
+        parser.add_argument('--interval', type=float, default=10,
+                            help='Seconds to wait between polls with --loop.')
+        parser.add_argument('--status', action='store_true', help='Only print the queue depth.')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self.stdout.write('%d queued' % outbox.queue_depth())
+            return
+        while True:
+            try:
+                sent, failed = outbox.send_queued(options['batch_size'], options['max_attempts'])
+            except Exception as error:
+                # The database went away: a worker keeps polling until it's back.
+                if not options['loop']:
+                    raise
+                self.stderr.write('Could not send queued mail: %s: %s' % (type(error).__name__, error))
+                time.sleep(options['interval'])
+                continue
+            if sent or failed:
+                self.stdout.write('Sent %d, failed %d, %d queued' % (sent, failed, outbox.queue_depth()))
+            elif not options['loop']:
+                return
+            else:
+                time.sleep(options['interval'])
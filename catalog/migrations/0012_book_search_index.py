@@ -0,0 +1,12 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # This created a full-text index of the books, which 0020_drop_book_search_index
+    # removes again; the catalog search matches titles with icontains instead.
+
+    dependencies = [
+        ('catalog', '0011_auto_20211105_1555'),
+    ]
+
+    operations = []
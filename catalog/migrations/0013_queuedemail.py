@@ -0,0 +1,38 @@
+# Generated by Django 3.2.7 on 2026-10-18 17:16
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0012_book_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255)),
+                ('body', models.TextField()),
+                ('from_email', models.CharField(blank=True, max_length=254)),
+                ('to', models.TextField(help_text='Comma separated recipient addresses')),
+                ('attachment', models.CharField(blank=True, help_text='Name of a file in the default storage to attach', max_length=255)),
+                ('status', models.CharField(choices=[('q', 'Queued'), ('s', 'Sent'), ('f', 'Failed')], default='q', max_length=1)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('sent', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['next_attempt'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='queuedemail',
+            index=models.Index(fields=['status', 'next_attempt'], name='catalog_que_status_e8ef66_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_genres(apps, schema_editor):
+    Genre = apps.get_model('catalog', 'Genre')
+    BookGenre = apps.get_model('catalog', 'Book').genre.through
+    duplicates = Genre.objects.values('name').annotate(keep=Min('pk'), copies=Count('pk')).filter(copies__gt=1)
+    for duplicate in duplicates:
+        keep = duplicate['keep']
+        others = Genre.objects.filter(name=duplicate['name']).exclude(pk=keep)
+        tagged = BookGenre.objects.filter(genre_id=keep).values('book_id')
+        BookGenre.objects.filter(genre__in=others, book_id__in=tagged).delete()
+        BookGenre.objects.filter(genre__in=others).update(genre_id=keep)
+        others.delete()
+
+
+def merge_duplicate_languages(apps, schema_editor):
+    Language = apps.get_model('catalog', 'Language')
+    Book = apps.get_model('catalog', 'Book')
+    duplicates = Language.objects.values('name').annotate(keep=Min('pk'), copies=Count('pk')).filter(copies__gt=1)
+    for duplicate in duplicates:
+        others = Language.objects.filter(name=duplicate['name']).exclude(pk=duplicate['keep'])
+        Book.objects.filter(language__in=others).update(language_id=duplicate['keep'])
+        others.delete()
+
+
+class Migration(migrations.Migration):
+    """Fold genres and languages that share a name, before the names become unique."""
+
+    dependencies = [
+        ('catalog', '0013_queuedemail'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_genres, migrations.RunPython.noop),
+        migrations.RunPython(merge_duplicate_languages, migrations.RunPython.noop),
+    ]
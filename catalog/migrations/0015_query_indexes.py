@@ -0,0 +1,54 @@
+# Generated by Django 3.2.7 on 2026-10-18 17:17
+
+from django.db import migrations, models
+
+
+def create_trigram_index(apps, schema_editor):
+    # Lets Postgres answer title__icontains (UPPER(title) LIKE ...) from an index.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute('CREATE INDEX IF NOT EXISTS catalog_book_title_trgm_idx '
+                          'ON catalog_book USING gin (UPPER(title) gin_trgm_ops)')
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS catalog_book_title_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0014_merge_duplicate_names'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='genre',
+            name='name',
+            field=models.CharField(help_text='Enter a book genre (e.g. Science Fiction)', max_length=200, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='language',
+            name='name',
+            field=models.CharField(help_text="Enter the book's natural language (e.g. English, French, Japanese etc.)", max_length=200, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['last_name', 'first_name'], name='catalog_author_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['title'], name='catalog_book_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookinstance',
+            index=models.Index(fields=['status', 'due_back'], name='catalog_copy_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookinstance',
+            index=models.Index(fields=['borrower', 'status', 'due_back'], name='catalog_copy_borrower_due_idx'),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
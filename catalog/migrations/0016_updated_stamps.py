@@ -0,0 +1,23 @@
+# Generated by Django 3.2.7 on 2026-10-18 17:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0015_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, help_text='Versions the cached fragments of this author'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, help_text='Versions the cached fragments of this book'),
+        ),
+    ]
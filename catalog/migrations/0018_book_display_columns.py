@@ -0,0 +1,40 @@
+# Generated by Django 3.2.7 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+def fill_display_columns(apps, schema_editor):
+    Book = apps.get_model('catalog', 'Book')
+    books = Book.objects.using(schema_editor.connection.alias)
+    book_ids = list(books.values_list('pk', flat=True))
+    for start in range(0, len(book_ids), 1000):
+        for book in books.filter(pk__in=book_ids[start:start + 1000]).prefetch_related('author', 'genre'):
+            _fill(book)
+
+
+def _fill(book):
+    authors = sorted(book.author.all(), key=lambda author: (author.last_name, author.first_name))
+    book.authors_display = ', '.join(author.first_name + ' ' + author.last_name for author in authors)
+    book.genres_display = ', '.join(sorted(genre.name for genre in book.genre.all()))
+    book.save(update_fields=['authors_display', 'genres_display'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0017_changelogentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='authors_display',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='genres_display',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(fill_display_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.7 on 2026-10-18 17:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('catalog', '0018_book_display_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OverdueNotice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_back', models.DateField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('borrower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('copy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='catalog.bookinstance')),
+            ],
+            options={
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='overduenotice',
+            constraint=models.UniqueConstraint(fields=('copy', 'due_back'), name='catalog_notice_copy_due_uniq'),
+        ),
+    ]
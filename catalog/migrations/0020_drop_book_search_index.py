@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute('DROP TABLE IF EXISTS catalog_book_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0019_overduenotice'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,14 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # 0015 used to add this index, which no query uses: title__icontains is
+    # served by catalog_book_title_trgm_idx on Postgres.
+
+    dependencies = [
+        ('catalog', '0020_drop_book_search_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL('DROP INDEX IF EXISTS catalog_book_title_upper_idx', migrations.RunSQL.noop),
+    ]
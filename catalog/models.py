@@ -4,7 +4,7 @@ from django.contrib.auth.models import User
 # Create your models here.
 class Genre(models.Model):
     """Model representing a book genre."""
-    name = models.CharField(max_length=200, help_text='Enter a book genre (e.g. Science Fiction)')
+    name = models.CharField(max_length=200, unique=True, help_text='Enter a book genre (e.g. Science Fiction)')
 
     def __str__(self):
         """String for representing the Model object."""
@@ -15,7 +15,7 @@ class Genre(models.Model):
 from django.urls import reverse # Used to generate URLs by reversing the URL patterns
 class Language(models.Model):
     """Model representing a Language (e.g. English, French, Japanese, etc.)"""
-    name = models.CharField(max_length=200,
+    name = models.CharField(max_length=200, unique=True,
                             help_text="Enter the book's natural language (e.g. English, French, Japanese etc.)")
 
     def __str__(self):
@@ -28,9 +28,11 @@ class Author(models.Model):
     last_name = models.CharField(max_length=50)
     date_of_birth = models.DateField(null=True, blank=True)
     date_of_death = models.DateField('died', null=True, blank=True)
+    updated = models.DateTimeField(auto_now=True, help_text='Versions the cached fragments of this author')
 
     class Meta:
         ordering = ['last_name', 'first_name']
+        indexes = [models.Index(fields=['last_name', 'first_name'], name='catalog_author_name_idx')]
 
     def get_absolute_url(self):
         """Returns the url to access a particular author instance."""
@@ -39,6 +41,41 @@ class Author(models.Model):
     def __str__(self):
         """String for representing the Model object."""
         return f'{self.last_name}, {self.first_name}'
+class BookQuerySet(models.QuerySet):
+    """QuerySet that loads the related data the book pages display in bulk."""
+
+    def with_listing_data(self):
+        """Load only the columns lists show; the authors come from ``authors_display``."""
+        return self.only('id', 'title', 'authors_display', 'updated')
+
+    def with_detail_data(self):
+        """Load the language, authors and copies shown on a book's page."""
+        return self.select_related('language').prefetch_related('author', 'bookinstance_set')
+
+    def refresh_display_columns(self, batch_size=1000):
+        """Recompute ``authors_display`` and ``genres_display`` of these books in bulk.
+
+        Returns the number of books updated.
+        """
+        book_ids = list(self.order_by().values_list('pk', flat=True))
+        BookAuthor, BookGenre = Book.author.through, Book.genre.through
+        for start in range(0, len(book_ids), batch_size):
+            chunk = book_ids[start:start + batch_size]
+            authors, genres = {}, {}
+            for book_id, first_name, last_name in (
+                    BookAuthor.objects.using(self.db).filter(book_id__in=chunk)
+                    .order_by('author__last_name', 'author__first_name')
+                    .values_list('book_id', 'author__first_name', 'author__last_name')):
+                authors.setdefault(book_id, []).append(first_name + ' ' + last_name)
+            for book_id, name in (BookGenre.objects.using(self.db).filter(book_id__in=chunk)
+                                  .order_by('genre__name').values_list('book_id', 'genre__name')):
+                genres.setdefault(book_id, []).append(name)
+            Book.objects.using(self.db).bulk_update([
+                Book(pk=book_id, authors_display=', '.join(authors.get(book_id, [])),
+                     genres_display=', '.join(genres.get(book_id, [])))
+                for book_id in chunk], ['authors_display', 'genres_display'])
+        return len(book_ids)
+
 class Book(models.Model):
     """Model representing a book (but not a specific copy of a book)."""
     title = models.CharField(max_length=200)
@@ -55,6 +92,13 @@ class Book(models.Model):
     genre = models.ManyToManyField(Genre, help_text='Select a genre for this book')
     author = models.ManyToManyField(Author, help_text='Select a author for this book')
     language = models.ForeignKey('Language', on_delete=models.SET_NULL, null=True)
+    # Copies of the author and genre names, kept in step by catalog.signals.
+    authors_display = models.TextField(blank=True, editable=False)
+    genres_display = models.TextField(blank=True, editable=False)
+    # Also bumped when its authors, genres or copies change (see catalog.signals).
+    updated = models.DateTimeField(auto_now=True, help_text='Versions the cached fragments of this book')
+
+    objects = BookQuerySet.as_manager()
 
     def __str__(self):
         """String for representing the Model object."""
@@ -65,24 +109,36 @@ class Book(models.Model):
         return reverse('book-detail', args=[str(self.id)])
     def display_genre(self):
         """Create a string for the Genre. This is required to display genre in Admin."""
-        return ', '.join(genre.name for genre in self.genre.all()[:3])
+        return self.genres_display
 
     display_genre.short_description = 'Genre'
     def display_authors(self):
         """Create a string for the Author. This is required to display author in Admin."""
-        return ', '.join(author.first_name+' '+author.last_name for author in self.author.all()[:3])
-    def list_authors(self):
-        """Create a string for the Author. This is required to display author in Admin."""
-        return ';'.join(author.first_name+','+author.last_name for author in self.author.all()[:3])
+        return self.authors_display
 
 
     display_authors.short_description = 'Authors'
     class Meta:
         ordering = ['title']
+        indexes = [
+            models.Index(fields=['title'], name='catalog_book_title_idx'),
+        ]
 import uuid # Required for unique book instances
 from django.contrib.auth.decorators import permission_required
 
 
+class BookInstanceQuerySet(models.QuerySet):
+    def overdue(self, today=None):
+        """Copies on loan past their due date, annotated with ``overdue_by`` (a timedelta).
+
+        Filtered and computed by the database, using the status and due date index.
+        """
+        today = today or date.today()
+        return self.filter(status__exact='o', due_back__lt=today).annotate(
+            overdue_by=models.ExpressionWrapper(models.Value(today, output_field=models.DateField()) - models.F('due_back'),
+                                                output_field=models.DurationField()))
+
+
 class BookInstance(models.Model):
     """Model representing a specific copy of a book (i.e. that can be borrowed from the library)."""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, help_text='Unique ID for this particular book across whole library')
@@ -91,6 +147,8 @@ class BookInstance(models.Model):
     due_back = models.DateField(null=True, blank=True)
     borrower = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
 
+    objects = BookInstanceQuerySet.as_manager()
+
     LOAN_STATUS = (
         ('m', 'Maintenance'),
         ('o', 'On loan'),
@@ -109,6 +167,10 @@ class BookInstance(models.Model):
     class Meta:
         ordering = ['due_back']
         permissions = (("can_mark_returned", "Set book as returned"),)
+        indexes = [
+            models.Index(fields=['status', 'due_back'], name='catalog_copy_status_due_idx'),
+            models.Index(fields=['borrower', 'status', 'due_back'], name='catalog_copy_borrower_due_idx'),
+        ]
     def __str__(self):
         """String for representing the Model object."""
         mystatus = ""
@@ -127,3 +189,74 @@ class BookInstance(models.Model):
             return True
         return False
     
+from django.utils import timezone
+
+
+class QueuedEmail(models.Model):
+    """An outgoing email waiting to be sent by the send_queued_mail command."""
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    to = models.TextField(help_text='Comma separated recipient addresses')
+    attachment = models.CharField(max_length=255, blank=True,
+                                  help_text='Name of a file in the default storage to attach')
+
+    STATUS = (
+        ('q', 'Queued'),
+        ('s', 'Sent'),
+        ('f', 'Failed'),
+    )
+
+    status = models.CharField(max_length=1, choices=STATUS, default='q')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    sent = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_attempt']
+        indexes = [models.Index(fields=['status', 'next_attempt'])]
+
+    def __str__(self):
+        """String for representing the Model object."""
+        return f'{self.subject} ({self.get_status_display()})'
+
+
+class OverdueNotice(models.Model):
+    """A reminder sent for a loan; one per copy and due date, so reruns skip it."""
+    copy = models.ForeignKey(BookInstance, on_delete=models.CASCADE)
+    borrower = models.ForeignKey(User, on_delete=models.CASCADE)
+    due_back = models.DateField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created']
+        constraints = [models.UniqueConstraint(fields=['copy', 'due_back'], name='catalog_notice_copy_due_uniq')]
+
+    def __str__(self):
+        """String for representing the Model object."""
+        return f'{self.copy_id} due {self.due_back}'
+
+
+class ChangeLogEntry(models.Model):
+    """One change to a catalog object; the id is the change feed's sequence number."""
+    model = models.CharField(max_length=30)
+    object_id = models.CharField(max_length=64)
+
+    ACTIONS = (
+        ('c', 'Created'),
+        ('u', 'Updated'),
+        ('d', 'Deleted'),
+    )
+
+    action = models.CharField(max_length=1, choices=ACTIONS)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name_plural = 'change log entries'
+
+    def __str__(self):
+        """String for representing the Model object."""
+        return f'{self.id}: {self.get_action_display()} {self.model} {self.object_id}'
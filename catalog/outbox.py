@@ -0,0 +1,115 @@
+"""Persistent outbox for the catalog's outgoing email.
+
+Views only queue messages; the send_queued_mail command sends them in
+batches over one mail server connection and retries failures with
+exponential backoff. Several workers can drain the outbox at once: each
+claims its own batch before sending it.
+"""
+import datetime
+
+from django.core.files.storage import default_storage
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import QueuedEmail
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 60
+MAX_BACKOFF_SECONDS = 6 * 60 * 60
+# How long a worker has to send the batch it claimed before others may retry it.
+LEASE_SECONDS = 10 * 60
+
+
+def enqueue(subject, body, from_email, recipient_list, attachment=''):
+    """Queue a message for the worker and return the QueuedEmail."""
+    return QueuedEmail.objects.create(subject=subject, body=body, from_email=from_email or '',
+                                      to=','.join(recipient_list), attachment=attachment)
+
+
+def queue_depth():
+    """Number of messages still waiting to be sent."""
+    return QueuedEmail.objects.filter(status__exact='q').count()
+
+
+def backoff(attempts):
+    """Delay before retrying a message that has failed ``attempts`` times."""
+    return datetime.timedelta(seconds=min(BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS))
+
+
+def build_message(queued, connection=None):
+    message = EmailMessage(queued.subject, queued.body, queued.from_email or None,
+                           [address for address in queued.to.split(',') if address],
+                           connection=connection)
+    if queued.attachment:
+        with default_storage.open(queued.attachment, 'rb') as attachment:
+            message.attach(queued.attachment.split('/')[-1], attachment.read())
+    return message
+
+
+def claim(batch_size=BATCH_SIZE):
+    """Lease a batch of due messages to this worker and return them.
+
+    The rows are locked only while they are claimed: their next_attempt is
+    pushed LEASE_SECONDS ahead so that other workers skip them while they
+    are sent, and a worker that dies mid-batch leaves them to be retried
+    once the lease runs out.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(QueuedEmail.objects.select_for_update(skip_locked=True)
+                     .filter(status__exact='q', next_attempt__lte=now)
+                     .order_by('next_attempt', 'pk')[:batch_size])
+        if batch:
+            QueuedEmail.objects.filter(pk__in=[queued.pk for queued in batch]).update(
+                next_attempt=now + datetime.timedelta(seconds=LEASE_SECONDS))
+    return batch
+
+
+def _failed(queued, error, max_attempts):
+    queued.last_error = '%s: %s' % (type(error).__name__, error)
+    if queued.attempts >= max_attempts:
+        queued.status = 'f'
+    else:
+        queued.next_attempt = timezone.now() + backoff(queued.attempts)
+
+
+def send_queued(batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS):
+    """Send one batch of due messages over a single connection.
+
+    Returns (sent, failed) counts for the batch. The batch is claimed in a
+    short transaction and sent outside it, so no row locks are held during
+    the SMTP conversation. If the mail server can't be reached every
+    message of the batch counts as failed and backs off.
+    """
+    sent = failed = 0
+    batch = claim(batch_size)
+    if not batch:
+        return sent, failed
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        for queued in batch:
+            queued.attempts += 1
+            _failed(queued, error, max_attempts)
+        QueuedEmail.objects.bulk_update(batch, ['attempts', 'status', 'next_attempt', 'last_error'])
+        return sent, len(batch)
+    try:
+        for queued in batch:
+            queued.attempts += 1
+            try:
+                build_message(queued, connection).send()
+            except Exception as error:
+                failed += 1
+                _failed(queued, error, max_attempts)
+            else:
+                sent += 1
+                queued.status = 's'
+                queued.sent = timezone.now()
+                queued.last_error = ''
+            queued.save(update_fields=['attempts', 'status', 'next_attempt', 'last_error', 'sent'])
+    finally:
+        connection.close()
+    return sent, failed
@@ -0,0 +1,83 @@
+"""Reminders for overdue loans, sent by the send_overdue_notices command.
+
+The overdue loans nobody has been reminded about are read in one query
+ordered by borrower, and one digest per borrower is queued in the outbox
+together with an OverdueNotice for each loan it lists, in the same
+transaction. A rerun therefore only picks up loans that have fallen
+overdue since, including renewed loans that are overdue again. The outbox
+sends the digests in batches over one mail server connection.
+"""
+import datetime
+import itertools
+
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from django.template.loader import render_to_string
+
+from .models import BookInstance, OverdueNotice, QueuedEmail
+
+# Borrowers whose digests are queued per transaction.
+BATCH_SIZE = 200
+# Loans fetched from the database at a time.
+CHUNK_SIZE = 2000
+
+
+def pending_loans(today=None):
+    """Overdue loans of borrowers with an email address that have no notice yet, by borrower."""
+    notified = OverdueNotice.objects.filter(copy=OuterRef('pk'), due_back=OuterRef('due_back'))
+    return (BookInstance.objects.overdue(today)
+            .filter(borrower__isnull=False).exclude(borrower__email='')
+            .filter(~Exists(notified))
+            .select_related('borrower', 'book')
+            .only('id', 'due_back', 'imprint', 'book__title',
+                  'borrower__username', 'borrower__first_name', 'borrower__email')
+            .order_by('borrower_id', 'due_back', 'pk'))
+
+
+def build_digest(borrower, loans):
+    """An unsaved QueuedEmail listing the borrower's overdue loans."""
+    body = render_to_string('catalog/overdue_notice.txt', {'borrower': borrower, 'loans': loans})
+    subject = 'You have %d overdue book%s' % (len(loans), '' if len(loans) == 1 else 's')
+    return QueuedEmail(subject=subject, body=body, to=borrower.email)
+
+
+def _queue(batch):
+    """Queue the digests of a batch of (borrower, loans); returns the (digests, loans) queued."""
+    try:
+        with transaction.atomic():
+            QueuedEmail.objects.bulk_create([build_digest(borrower, loans) for borrower, loans in batch])
+            OverdueNotice.objects.bulk_create([
+                OverdueNotice(copy_id=loan.pk, borrower_id=borrower.pk, due_back=loan.due_back)
+                for borrower, loans in batch for loan in loans])
+    except IntegrityError:
+        # A concurrent run has noticed some of these loans. Queue the batch
+        # one borrower at a time, so only the borrowers it reminded are left
+        # out; their other loans are still pending for the next run.
+        if len(batch) == 1:
+            return 0, 0
+        queued = [_queue([item]) for item in batch]
+        return sum(digests for digests, _ in queued), sum(loans for _, loans in queued)
+    return len(batch), sum(len(loans) for _, loans in batch)
+
+
+def queue_overdue_notices(today=None, batch_size=BATCH_SIZE):
+    """Queue a digest for every borrower with overdue loans not yet reminded about.
+
+    Returns (digests, loans) counts.
+    """
+    today = today or datetime.date.today()
+    digests = loans = 0
+    batch = []
+    grouped = itertools.groupby(pending_loans(today).iterator(chunk_size=CHUNK_SIZE),
+                                key=lambda loan: loan.borrower_id)
+    for _, group in grouped:
+        group = list(group)
+        batch.append((group[0].borrower, group))
+        if len(batch) >= batch_size:
+            queued = _queue(batch)
+            digests, loans = digests + queued[0], loans + queued[1]
+            batch = []
+    if batch:
+        queued = _queue(batch)
+        digests, loans = digests + queued[0], loans + queued[1]
+    return digests, loans
@@ -0,0 +1,140 @@
+"""Whole-page caching of the catalog pages for anonymous visitors.
+
+Pages are stored under a key made of the path, the page or cursor and a
+catalog version: the time of the last change to a book, author or copy,
+bumped by the signal handlers in ``catalog.signals``. Bumping the version
+orphans every cached page at once; the old entries simply expire. The
+version also gives each page its ``ETag`` and ``Last-Modified`` headers, so
+a browser revalidating an unchanged page gets a 304 without the cache or
+the database being touched.
+
+Pages to be cached are rendered from the primary database (see
+``catalog.routers``).
+
+Logged-in users always get a freshly rendered page, because the sidebar
+shows their name and permissions; the list and detail templates cache
+their per-object fragments for them instead.
+"""
+import asyncio
+import functools
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .routers import primary_reads
+
+VERSION_KEY = 'catalog:pages:version'
+KEY_PREFIX = 'catalog:page:'
+# Query parameters a cached page may vary on: page numbers and pagination cursors.
+PAGE_PARAMS = ('page', 'after', 'before')
+
+
+def _timeout():
+    return getattr(settings, 'CATALOG_PAGE_CACHE_TIMEOUT', 600)
+
+
+def version():
+    """Timestamp of the last catalog change, starting the clock if it isn't set."""
+    current = cache.get(VERSION_KEY)
+    if current is None:
+        cache.add(VERSION_KEY, int(time.time()), None)
+        current = cache.get(VERSION_KEY)
+    return current
+
+
+def invalidate():
+    """Start a new version so every cached page is rendered again."""
+    # Never go backwards: pages cached within the same second must not come back.
+    cache.set(VERSION_KEY, max(int(time.time()), (cache.get(VERSION_KEY) or 0) + 1), None)
+
+
+def _digest(request, params=PAGE_PARAMS):
+    path = request.path + '?' + '&'.join('%s=%s' % (name, request.GET.get(name, '')) for name in params)
+    return hashlib.md5(path.encode('utf-8')).hexdigest()
+
+
+def _cacheable(request, params=PAGE_PARAMS):
+    return (request.method in ('GET', 'HEAD') and not request.user.is_authenticated
+            and not set(request.GET) - set(params))
+
+
+def _lookup(request, params=PAGE_PARAMS):
+    """Key, ETag and version of a page, with its response if it needn't be rendered."""
+    current = version()
+    digest = _digest(request, params)
+    key = '%s%d:%s' % (KEY_PREFIX, current, digest)
+    etag = '"%s-%d"' % (digest[:16], current)
+    response = get_conditional_response(request, etag=etag, last_modified=current)
+    if response is None:
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+    return key, etag, current, response
+
+
+def _store(key, response):
+    """Cache a freshly rendered page; returns False for responses that aren't cached."""
+    if hasattr(response, 'render'):
+        response.render()
+    if response.status_code != 200:
+        return False
+    cache.set(key, (response.content, response['Content-Type']), _timeout())
+    return True
+
+
+def _validators(response, etag, current):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(current)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def cache_anonymous_page(view=None, params=()):
+    """Serve the view's page from the cache to anonymous GET requests.
+
+    Used as ``@cache_anonymous_page``, or as ``@cache_anonymous_page(params=...)``
+    to also cache the pages of the given query parameters, such as a
+    search's criteria. Works for async views too; the user and the cache are
+    then looked up in a worker thread.
+    """
+    if view is None:
+        return functools.partial(cache_anonymous_page, params=params)
+    params = PAGE_PARAMS + tuple(params)
+    if asyncio.iscoroutinefunction(view):
+        def lookup(request):
+            return _lookup(request, params) if _cacheable(request, params) else None
+
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            found = await sync_to_async(lookup)(request)
+            if found is None:
+                return await view(request, *args, **kwargs)
+            key, etag, current, response = found
+            if response is None:
+                with primary_reads():
+                    response = await view(request, *args, **kwargs)
+                    if not await sync_to_async(_store)(key, response):
+                        return response
+            return _validators(response, etag, current)
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _cacheable(request, params):
+            return view(request, *args, **kwargs)
+        key, etag, current, response = _lookup(request, params)
+        if response is None:
+            # TemplateResponses query as they are rendered, in _store().
+            with primary_reads():
+                response = view(request, *args, **kwargs)
+                if not _store(key, response):
+                    return response
+        return _validators(response, etag, current)
+    return wrapper
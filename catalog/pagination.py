@@ -0,0 +1,208 @@
+"""Keyset (cursor) pagination for the catalog listings.
+
+Instead of ``COUNT(*)`` plus ``OFFSET n`` a page is fetched with a filter on
+the ordering columns of the last row seen, e.g. for books
+``title > 'X' OR (title = 'X' AND id > 42)``, so every page costs the same
+however deep it is. The primary key is always added as the last ordering
+column to make the order total. Links carry an opaque ``after`` or
+``before`` cursor; a ``page`` number is still honoured with Django's
+Paginator so old links keep working.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+
+# Filtered listings are counted up to this many rows when an estimate will do.
+ESTIMATE_CAP = 1000
+
+
+def table_estimate(queryset):
+    """Planner row estimate for an unfiltered queryset on PostgreSQL, else None."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql' or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    # reltuples is -1 (or 0) until the table has been analyzed.
+    return int(row[0]) if row and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that trusts the planner's estimate for big unfiltered tables.
+
+    Counting a large table means reading all of it; the estimate is only
+    used above ESTIMATE_CAP rows, where an approximate page count will do.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = table_estimate(self.object_list)
+        if estimate is not None and estimate > ESTIMATE_CAP:
+            return estimate
+        return super().count
+
+
+def encode_cursor(values):
+    data = json.dumps([value if value is None or isinstance(value, (int, float)) else str(value)
+                       for value in values])
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    """Values encoded by encode_cursor(), or None if the cursor isn't valid."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        return None
+    if not isinstance(values, list) or len(values) != length:
+        return None
+    return values
+
+
+class KeysetPaginator:
+    """Paginate an ordered queryset by cursor."""
+    keyset = True
+
+    def __init__(self, queryset, per_page, estimate_count=False):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.estimate_count = estimate_count
+        model = queryset.model
+        ordering = list(queryset.query.order_by or model._meta.ordering)
+        if not ordering or any(not isinstance(field, str) for field in ordering):
+            raise ValueError('Keyset pagination needs an ordering by field names.')
+        self.fields = []
+        for field in ordering:
+            descending = field.startswith('-')
+            name = field.lstrip('-')
+            name = model._meta.pk.name if name == 'pk' else name
+            self.fields.append((name, descending, model._meta.get_field(name).null))
+        if model._meta.pk.name not in [name for name, _, _ in self.fields]:
+            self.fields.append((model._meta.pk.name, False, False))
+
+    @cached_property
+    def count(self):
+        """Exact count, or a cheap estimate if ``estimate_count`` is set (see count_is_capped)."""
+        if not self.estimate_count:
+            return self.queryset.count()
+        estimate = table_estimate(self.queryset)
+        if estimate is not None:
+            return estimate
+        return self.queryset.order_by()[:ESTIMATE_CAP + 1].count()
+
+    @property
+    def count_is_capped(self):
+        return self.estimate_count and self.count > ESTIMATE_CAP
+
+    def _order_by(self, backwards):
+        order = []
+        for name, descending, nullable in self.fields:
+            # NULLs count as the smallest value whatever the database's default is.
+            if descending != backwards:
+                order.append(F(name).desc(nulls_last=True) if nullable else F(name).desc())
+            else:
+                order.append(F(name).asc(nulls_first=True) if nullable else F(name).asc())
+        return order
+
+    def _beyond(self, values, backwards):
+        """Q for the rows that come after (or before) the row with these ordering values."""
+        condition = None
+        for (name, descending, nullable), value in reversed(list(zip(self.fields, values))):
+            # Whether the rows beyond have larger values; NULL is smaller than any value.
+            later = (not descending) != backwards
+            if value is None:
+                beyond = Q(**{name + '__isnull': False}) if later else Q(pk__in=[])
+                equal = Q(**{name + '__isnull': True})
+            else:
+                beyond = Q(**{'%s__%s' % (name, 'gt' if later else 'lt'): value})
+                if nullable and not later:
+                    beyond |= Q(**{name + '__isnull': True})
+                equal = Q(**{name: value})
+            condition = beyond if condition is None else beyond | (equal & condition)
+        return condition
+
+    def cursor_for(self, obj):
+        return encode_cursor([getattr(obj, name) for name, _, _ in self.fields])
+
+    def get_page(self, after=None, before=None):
+        """The page after the ``after`` cursor, before the ``before`` cursor, or the first page."""
+        backwards = False
+        values = None
+        if before:
+            values = decode_cursor(before, len(self.fields))
+            backwards = values is not None
+        elif after:
+            values = decode_cursor(after, len(self.fields))
+        queryset = self.queryset.order_by(*self._order_by(backwards))
+        if values is not None:
+            try:
+                queryset = queryset.filter(self._beyond(values, backwards))
+            except (ValidationError, ValueError, TypeError):
+                # A tampered cursor: start from the beginning instead.
+                values, backwards = None, False
+                queryset = self.queryset.order_by(*self._order_by(False))
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            return KeysetPage(rows, self, has_previous=more, has_next=True)
+        return KeysetPage(rows, self, has_previous=values is not None, has_next=more)
+
+
+class KeysetPage:
+    """One page of a KeysetPaginator; iterates like a Django Page."""
+
+    def __init__(self, object_list, paginator, has_previous, has_next):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_previous = has_previous and bool(object_list)
+        self._has_next = has_next and bool(object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    def previous_cursor(self):
+        return self.paginator.cursor_for(self.object_list[0]) if self._has_previous else None
+
+    def next_cursor(self):
+        return self.paginator.cursor_for(self.object_list[-1]) if self._has_next else None
+
+
+def paginate(request, queryset, per_page, estimate_count=False):
+    """Return (paginator, page) for the request's ``after``/``before`` cursor or ``page`` number."""
+    if 'page' in request.GET:
+        paginator = Paginator(queryset, per_page)
+        return paginator, paginator.get_page(request.GET.get('page'))
+    paginator = KeysetPaginator(queryset, per_page, estimate_count=estimate_count)
+    return paginator, paginator.get_page(after=request.GET.get('after'), before=request.GET.get('before'))
+
+
+class KeysetPaginationMixin:
+    """ListView mixin that pages with paginate() instead of Django's Paginator."""
+    estimate_count = False
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator, page = paginate(self.request, queryset, page_size, estimate_count=self.estimate_count)
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,134 @@
+"""Read-replica routing: reads from the replicas, writes to the primary.
+
+PrimaryReplicaRouter sends every write to the ``default`` database. Reads go
+to one of the CATALOG_READ_REPLICAS, picked once per request, but only in
+requests that PrimaryReplicaMiddleware has let read from them. Replicas lag
+behind the primary, so reads stay on the primary:
+
+- outside requests (management commands, the mail worker, tests);
+- in requests other than GET, HEAD and OPTIONS, as a form is validated
+  against what it is about to change;
+- inside a transaction;
+- for the rest of a request once it has written anything;
+- for CATALOG_REPLICA_PIN_SECONDS after a request that wrote, through a
+  cookie, so the page a form redirects to (or the next page the user opens)
+  shows the change;
+- while refilling the caches shared by every user (pages, home page
+  counters, facet counts, form choices), see primary_reads(). A lagging
+  replica's data would otherwise be served from the cache to everyone,
+  pinned writers included, until it expired.
+"""
+import asyncio
+import contextlib
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.deprecation import MiddlewareMixin
+
+PIN_COOKIE = 'catalog_primary'
+
+
+class _Reads:
+    def __init__(self, primary):
+        replicas = getattr(settings, 'CATALOG_READ_REPLICAS', ())
+        self.primary = primary or not replicas
+        self.replica = random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+        self.wrote = False
+
+
+_reads = contextvars.ContextVar('catalog_reads', default=None)
+
+
+@contextlib.contextmanager
+def replica_reads(primary=False):
+    """Let the reads of the block go to a replica, unless ``primary`` or until it writes."""
+    reads = _Reads(primary)
+    token = _reads.set(reads)
+    try:
+        yield reads
+    finally:
+        _reads.reset(token)
+
+
+@contextlib.contextmanager
+def primary_reads():
+    """Send the reads of the block to the primary, such as those refilling a cache every user shares."""
+    reads = _reads.get()
+    if reads is None or reads.primary:
+        yield
+        return
+    reads.primary = True
+    try:
+        yield
+    finally:
+        reads.primary = reads.wrote
+
+
+def read_for_shared_cache(load, *args):
+    """Call ``load(*args)`` with its reads on the primary, as what it returns is cached for every user."""
+    with primary_reads():
+        return load(*args)
+
+
+def _pool():
+    return {DEFAULT_DB_ALIAS, *getattr(settings, 'CATALOG_READ_REPLICAS', ())}
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        reads = _reads.get()
+        if reads is None or reads.primary or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return reads.replica
+
+    def db_for_write(self, model, **hints):
+        reads = _reads.get()
+        if reads is not None:
+            reads.primary = reads.wrote = True
+        # A row read from a replica is saved to the primary; one from a database
+        # outside the pool stays where it is.
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db and instance._state.db not in _pool():
+            return instance._state.db
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same rows as the primary.
+        pool = _pool()
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+
+class PrimaryReplicaMiddleware(MiddlewareMixin):
+    """Let safe requests read from a replica; pin the user to the primary after a write.
+
+    Works in both modes: the reads state is a context variable, which
+    sync_to_async carries into the threads an async view queries from.
+    MiddlewareMixin marks the middleware as a coroutine function when
+    get_response is one; __call__ and __acall__ replace its hooks, as the
+    whole response runs inside replica_reads().
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        with replica_reads(self.primary(request)) as reads:
+            response = self.get_response(request)
+        return self.pin(reads, response)
+
+    async def __acall__(self, request):
+        with replica_reads(self.primary(request)) as reads:
+            response = await self.get_response(request)
+        return self.pin(reads, response)
+
+    def primary(self, request):
+        return request.method not in ('GET', 'HEAD', 'OPTIONS') or PIN_COOKIE in request.COOKIES
+
+    def pin(self, reads, response):
+        if reads.wrote:
+            response.set_cookie(PIN_COOKIE, '1', max_age=getattr(settings, 'CATALOG_REPLICA_PIN_SECONDS', 10),
+                                httponly=True, samesite='Lax')
+        return response
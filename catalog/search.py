@@ -0,0 +1,92 @@
+"""Multi-criteria book search, with the matching books counted per genre and language."""
+import re
+
+from django.db.models import CharField, Count, Exists, F, OuterRef, Q, Value
+
+from .models import Book, BookInstance
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """Split a user supplied query into lower case search tokens."""
+    return TOKEN_RE.findall((text or '').lower())
+
+
+class BookSearch:
+    """A multi-criteria book search, narrowed one criterion at a time.
+
+    Each method returns a new BookSearch, so searches compose like querysets.
+    books() is one query: the many-to-many criteria are EXISTS subqueries,
+    so no join multiplies the rows and no distinct() is needed.
+    """
+
+    def __init__(self, queryset=None, conditions=()):
+        self.queryset = Book.objects.all() if queryset is None else queryset
+        self.conditions = tuple(conditions)
+
+    def _narrow(self, condition):
+        return BookSearch(self.queryset, self.conditions + (condition,))
+
+    def title(self, text):
+        """Books with every word of ``text`` anywhere in their title, e.g. "sea" in "Earthsea".
+
+        On Postgres the trigram index on UPPER(title) answers these lookups.
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return self
+        return self._narrow(Q(*[Q(title__icontains=token) for token in tokens]))
+
+    def genre(self, name):
+        return self._narrow(Exists(Book.genre.through.objects.filter(book_id=OuterRef('pk'), genre__name=name)))
+
+    def author(self, name):
+        """Books by the author named "last, first", as str(author) gives it."""
+        last_name, _, first_name = name.partition(',')
+        return self._narrow(Exists(Book.author.through.objects.filter(
+            book_id=OuterRef('pk'), author__last_name=last_name.strip(), author__first_name=first_name.strip())))
+
+    def language(self, name):
+        return self._narrow(Q(language__name=name))
+
+    def available(self):
+        """Books with a copy on the shelf."""
+        return self._narrow(Exists(BookInstance.objects.filter(book_id=OuterRef('pk'), status__exact='a')))
+
+    def where(self, title='', genre='', author='', language='', available=False):
+        """Narrow by every criterion that is given, e.g. a BookSearchForm's cleaned_data."""
+        search = self.title(title)
+        for criterion, value in (('genre', genre), ('author', author), ('language', language)):
+            if value:
+                search = getattr(search, criterion)(value)
+        return search.available() if available else search
+
+    def books(self):
+        return self.queryset.filter(*self.conditions)
+
+    def facets(self):
+        """The number of matching books, in all and per genre and language, from one query.
+
+        Returns ``{'total': n, 'genre': [(name, count), ...], 'language': [...]}``
+        with the biggest counts first.
+        """
+        books = self.books().order_by()
+
+        def counted(queryset, facet, name, count):
+            return (queryset.annotate(facet=Value(facet, output_field=CharField()), name=name)
+                    .values('facet', 'name').annotate(count=count).values_list('facet', 'name', 'count'))
+
+        total = counted(books, 'total', Value('', output_field=CharField()), Count('pk'))
+        genres = counted(Book.genre.through.objects.filter(book__in=books.values('pk')).order_by(),
+                         'genre', F('genre__name'), Count('book_id'))
+        languages = counted(books.filter(language__isnull=False), 'language', F('language__name'), Count('pk'))
+        facets = {'total': 0, 'genre': [], 'language': []}
+        for facet, name, count in total.union(genres, languages, all=True):
+            if facet == 'total':
+                facets['total'] = count
+            else:
+                facets[facet].append((name, count))
+        for facet in ('genre', 'language'):
+            facets[facet].sort(key=lambda item: (-item[1], item[0]))
+        return facets
@@ -0,0 +1,107 @@
+"""Synthetic catalog data for benchmarks and load tests.
+
+Everything is derived from a random.Random(seed), so the same arguments
+always produce the same catalog. Rows are written with bulk_create, then
+the derived and cached data that model signals normally maintain are
+refreshed once at the end.
+"""
+import datetime
+import random
+
+from django.contrib.auth.models import User
+
+from . import changes, choices, facets, pagecache, stats
+from .models import Author, Book, BookInstance, Genre, Language
+
+WORDS = ('river', 'shadow', 'garden', 'winter', 'empire', 'letter', 'island', 'storm', 'glass',
+         'silver', 'night', 'journey', 'house', 'crown', 'secret', 'mountain', 'song', 'fire',
+         'stone', 'city', 'dream', 'harbor', 'forest', 'mirror', 'bridge', 'summer', 'voice')
+FIRST_NAMES = ('Ann', 'Ben', 'Clara', 'David', 'Eve', 'Frank', 'Grace', 'Henry', 'Iris', 'Jack',
+               'Kate', 'Leo', 'Maya', 'Noah', 'Olive', 'Paul', 'Rose', 'Sam', 'Tess', 'Victor')
+LAST_NAMES = ('Adams', 'Baker', 'Carter', 'Dawson', 'Ellis', 'Foster', 'Garcia', 'Hughes', 'Irving',
+              'Jones', 'Keller', 'Lewis', 'Morgan', 'Nolan', 'Owens', 'Parker', 'Reed', 'Stone',
+              'Turner', 'Walsh')
+STATUSES = [status for status, _ in BookInstance.LOAN_STATUS]
+
+
+def _title(rng, number):
+    words = rng.sample(WORDS, rng.randint(2, 4))
+    return ('The ' + ' '.join(words)).title() + ' %d' % number
+
+
+def seed_catalog(books=1000, authors=None, genres=30, languages=8, users=50, copies_per_book=3,
+                 seed=0, batch_size=1000, log=None):
+    """Add a synthetic catalog and return a dict of how many rows of each kind were created.
+
+    ``authors`` defaults to one for every five books and ``copies_per_book``
+    is the average number of BookInstance rows per book.
+    """
+    rng = random.Random(seed)
+    authors = authors if authors is not None else max(books // 5, 1)
+    tag = 'seed%d' % seed
+
+    def note(message):
+        if log:
+            log(message)
+
+    User.objects.bulk_create([User(username='%s-user-%d' % (tag, n), email='%s-user-%d@example.com' % (tag, n))
+                              for n in range(users)], batch_size=batch_size, ignore_conflicts=True)
+    user_ids = list(User.objects.filter(username__startswith=tag + '-user-').values_list('pk', flat=True))
+    Genre.objects.bulk_create([Genre(name='%s %s' % (rng.choice(WORDS).title(), n)) for n in range(genres)],
+                              batch_size=batch_size, ignore_conflicts=True)
+    Language.objects.bulk_create([Language(name='Language %d' % n) for n in range(languages)],
+                                 batch_size=batch_size, ignore_conflicts=True)
+    genre_ids = list(Genre.objects.values_list('pk', flat=True))
+    language_ids = list(Language.objects.values_list('pk', flat=True))
+    note('Created %d users, %d genres and %d languages' % (users, genres, languages))
+
+    first_author = Author.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    Author.objects.bulk_create([
+        Author(first_name=rng.choice(FIRST_NAMES), last_name='%s %d' % (rng.choice(LAST_NAMES), n),
+               date_of_birth=datetime.date(1900, 1, 1) + datetime.timedelta(days=rng.randrange(36500)))
+        for n in range(authors)], batch_size=batch_size)
+    author_ids = list(Author.objects.filter(pk__gt=first_author).values_list('pk', flat=True))
+    note('Created %d authors' % authors)
+
+    isbn_prefix = '9%03d' % (seed % 1000)
+    Book.objects.bulk_create([
+        Book(title=_title(rng, n), summary=' '.join(rng.choices(WORDS, k=30)).capitalize() + '.',
+             isbn='%s%09d' % (isbn_prefix, n), language_id=rng.choice(language_ids))
+        for n in range(books)], batch_size=batch_size, ignore_conflicts=True)
+    book_ids = list(Book.objects.filter(isbn__startswith=isbn_prefix).order_by('pk').values_list('pk', flat=True))
+    note('Created %d books' % books)
+
+    BookAuthor, BookGenre = Book.author.through, Book.genre.through
+    BookAuthor.objects.bulk_create([
+        BookAuthor(book_id=book, author_id=author)
+        for book in book_ids for author in rng.sample(author_ids, min(rng.randint(1, 2), len(author_ids)))],
+        batch_size=batch_size, ignore_conflicts=True)
+    BookGenre.objects.bulk_create([
+        BookGenre(book_id=book, genre_id=genre)
+        for book in book_ids for genre in rng.sample(genre_ids, min(rng.randint(1, 3), len(genre_ids)))],
+        batch_size=batch_size, ignore_conflicts=True)
+
+    today = datetime.date.today()
+    copies = []
+    for book in book_ids:
+        for _ in range(rng.randint(0, copies_per_book * 2)):
+            status = rng.choice(STATUSES)
+            on_loan = status in ('o', 'r')
+            copies.append(BookInstance(
+                book_id=book, imprint='%s Press, %d' % (rng.choice(LAST_NAMES), rng.randint(1950, 2021)),
+                status=status, borrower_id=rng.choice(user_ids) if on_loan and user_ids else None,
+                due_back=today + datetime.timedelta(days=rng.randint(-30, 30)) if on_loan else None))
+    BookInstance.objects.bulk_create(copies, batch_size=batch_size)
+    note('Created %d copies' % len(copies))
+
+    # bulk_create() bypasses the model signals, so refresh derived data here.
+    for model, ids in ((Genre, genre_ids), (Language, language_ids), (Author, author_ids), (Book, book_ids),
+                       (BookInstance, [copy.pk for copy in copies])):
+        changes.record(model, ids, 'c')
+    Book.objects.filter(pk__in=book_ids).refresh_display_columns(batch_size=batch_size)
+    stats.invalidate()
+    choices.invalidate()
+    facets.invalidate()
+    pagecache.invalidate()
+    return {'users': users, 'genres': genres, 'languages': languages, 'authors': authors,
+            'books': len(book_ids), 'copies': len(copies)}
@@ -0,0 +1,270 @@
+"""Model signal handlers that keep derived catalog data in step with its tables."""
+from django.db import connections, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import changes, choices, facets, pagecache, stats
+from .models import Author, Book, BookInstance, Genre, Language
+
+
+@receiver(m2m_changed, sender=Book.author.through)
+@receiver(m2m_changed, sender=Book.genre.through)
+def remember_cleared_books(sender, instance, action, reverse, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # The cleared books are only known before the rows go away.
+        instance._cleared_books = list(instance.book_set.values_list('pk', flat=True))
+
+
+def _linked_books(instance, action, reverse, pk_set):
+    """Ids of the books whose authors or genres changed, or None before the change."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return None
+    if not reverse:
+        return [instance.pk]
+    if action == 'post_clear':
+        return getattr(instance, '_cleared_books', [])
+    return list(pk_set or ())
+
+
+@receiver(pre_delete, sender=Author)
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Language)
+def remember_linked_books(sender, instance, **kwargs):
+    instance._linked_book_ids = list(instance.book_set.values_list('pk', flat=True))
+
+
+COUNTED_MODELS = {
+    Book: 'num_books',
+    BookInstance: 'num_instances',
+    Genre: 'num_genres',
+    Author: 'num_authors',
+}
+
+
+def _adjust_stats(using, *changes):
+    transaction.on_commit(lambda: [stats.adjust(*change) for change in changes], using=using)
+
+
+@receiver(post_save)
+def count_saved_object(sender, instance, created, using, raw=False, **kwargs):
+    if sender not in COUNTED_MODELS:
+        return
+    if raw:
+        transaction.on_commit(stats.invalidate, using=using)
+    elif created:
+        changes = [(COUNTED_MODELS[sender], 1)]
+        if sender is BookInstance and instance.status == 'a':
+            changes.append(('num_instances_available', 1))
+        _adjust_stats(using, *changes)
+    elif sender is BookInstance:
+        # The previous status is unknown, so let the available count be recomputed.
+        transaction.on_commit(lambda: stats.invalidate('num_instances_available'), using=using)
+
+
+@receiver(post_delete)
+def count_deleted_object(sender, instance, using, **kwargs):
+    if sender not in COUNTED_MODELS:
+        return
+    changes = [(COUNTED_MODELS[sender], -1)]
+    if sender is BookInstance and instance.status == 'a':
+        changes.append(('num_instances_available', -1))
+    _adjust_stats(using, *changes)
+
+
+CHOICE_LISTS = {
+    Genre: ('genres',),
+    Author: ('authors',),
+    Language: ('languages',),
+    Book: ('books', 'copies'),
+    BookInstance: ('copies',),
+}
+
+
+@receiver([post_save, post_delete])
+def invalidate_choices(sender, using, **kwargs):
+    if sender in CHOICE_LISTS:
+        transaction.on_commit(lambda: choices.invalidate(*CHOICE_LISTS[sender]), using=using)
+
+
+def _touch_books(using, **filters):
+    """Bump ``Book.updated`` so the cached fragments of these books are rendered again."""
+    Book.objects.using(using).filter(**filters).update(updated=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=BookInstance)
+def touch_book_of_copy(sender, instance, using, raw=False, **kwargs):
+    if not raw and instance.book_id:
+        _touch_books(using, pk=instance.book_id)
+        # The book's updated time is in the change feed too.
+        changes.record(Book, [instance.book_id], 'u', using=using)
+
+
+@receiver(m2m_changed, sender=Book.author.through)
+@receiver(m2m_changed, sender=Book.genre.through)
+def touch_linked_books(sender, instance, action, reverse, pk_set, using, **kwargs):
+    book_ids = _linked_books(instance, action, reverse, pk_set)
+    if book_ids is not None:
+        _touch_books(using, pk__in=book_ids)
+
+
+FACET_LINKS = {
+    Book.genre.through: 'genre',
+    Book.author.through: 'author',
+}
+FACET_MODELS = {model: facet for facet, model in facets.FACETS.items()}
+
+
+@receiver(m2m_changed, sender=Book.author.through)
+@receiver(m2m_changed, sender=Book.genre.through)
+def count_linked_books(sender, instance, action, reverse, pk_set, using, **kwargs):
+    facet = FACET_LINKS[sender]
+    if action in ('post_remove', 'post_clear'):
+        # Removed ids aren't checked to have been linked, so count again.
+        transaction.on_commit(lambda: facets.invalidate(facet), using=using)
+    elif action == 'post_add' and pk_set:
+        book_ids = list(pk_set) if reverse else [instance.pk]
+        available = BookInstance.objects.using(using).filter(book_id__in=book_ids, status__exact='a').count()
+        if reverse:
+            counted = [(instance.pk, len(book_ids), available)]
+        else:
+            counted = [(pk, 1, available) for pk in pk_set]
+
+        def adjust():
+            for pk, books, copies in counted:
+                facets.adjust(facet, pk, 'books', books)
+                facets.adjust(facet, pk, 'available', copies)
+        transaction.on_commit(adjust, using=using)
+
+
+@receiver(post_save)
+def count_saved_facet_object(sender, instance, created, using, raw=False, **kwargs):
+    if sender is Book and created and not raw:
+        # A new book has no copies yet.
+        if instance.language_id:
+            transaction.on_commit(lambda: facets.adjust('language', instance.language_id, 'books', 1), using=using)
+    elif sender is Book:
+        # The previous language is unknown.
+        transaction.on_commit(lambda: facets.invalidate('language'), using=using)
+    elif sender is BookInstance and (raw or not created or instance.status == 'a'):
+        transaction.on_commit(facets.invalidate, using=using)
+    elif sender in FACET_MODELS and (created or raw):
+        transaction.on_commit(lambda: facets.invalidate(FACET_MODELS[sender]), using=using)
+
+
+@receiver(post_delete)
+def count_deleted_facet_object(sender, instance, using, **kwargs):
+    if sender is Book or (sender is BookInstance and instance.status == 'a'):
+        transaction.on_commit(facets.invalidate, using=using)
+    elif sender in FACET_MODELS:
+        transaction.on_commit(lambda: facets.invalidate(FACET_MODELS[sender]), using=using)
+
+
+BOOK_LINKS = {
+    Author: 'author',
+    Genre: 'genre',
+    Language: 'language',
+}
+
+
+@receiver(post_save)
+def touch_books_of_saved_object(sender, instance, created, using, raw=False, **kwargs):
+    if sender in BOOK_LINKS and not created and not raw:
+        _touch_books(using, **{BOOK_LINKS[sender]: instance})
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Genre)
+def touch_books_of_deleted_link(sender, instance, using, **kwargs):
+    # Collected by remember_linked_books before the links were deleted.
+    _touch_books(using, pk__in=getattr(instance, '_linked_book_ids', []))
+
+
+PAGE_MODELS = (Author, Book, BookInstance, Genre, Language)
+
+
+def _invalidate_pages(using):
+    # Now, so this transaction doesn't read its own stale pages, and again after
+    # the commit in case a concurrent request cached the old data meanwhile.
+    pagecache.invalidate()
+    if connections[using].in_atomic_block:
+        transaction.on_commit(pagecache.invalidate, using=using)
+
+
+@receiver([post_save, post_delete])
+def invalidate_pages(sender, using, **kwargs):
+    if sender in PAGE_MODELS:
+        _invalidate_pages(using)
+
+
+@receiver(m2m_changed, sender=Book.author.through)
+@receiver(m2m_changed, sender=Book.genre.through)
+def invalidate_pages_of_links(sender, action, using, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _invalidate_pages(using)
+
+
+@receiver(post_save)
+def log_saved_object(sender, instance, created, using, **kwargs):
+    if sender in changes.TRACKED:
+        changes.record(sender, [instance.pk], 'c' if created else 'u', using=using)
+
+
+@receiver(post_delete)
+def log_deleted_object(sender, instance, using, **kwargs):
+    if sender in changes.TRACKED:
+        changes.record(sender, [instance.pk], 'd', using=using)
+
+
+@receiver(post_save)
+def log_books_of_saved_link(sender, instance, created, using, raw=False, **kwargs):
+    # The books' data changes too: language_name, and the updated time bumped
+    # by touch_books_of_saved_object.
+    if sender in BOOK_LINKS and not created and not raw:
+        book_ids = Book.objects.using(using).filter(**{BOOK_LINKS[sender]: instance}).values_list('pk', flat=True)
+        changes.record(Book, list(book_ids), 'u', using=using)
+
+
+@receiver(post_delete)
+def log_books_of_deleted_link(sender, instance, using, **kwargs):
+    # The links went with the row, by cascade or SET_NULL, without m2m_changed
+    # or post_save for the books.
+    if sender in BOOK_LINKS:
+        changes.record(Book, getattr(instance, '_linked_book_ids', []), 'u', using=using)
+
+
+@receiver(m2m_changed, sender=Book.author.through)
+@receiver(m2m_changed, sender=Book.genre.through)
+def log_linked_books(sender, instance, action, reverse, pk_set, using, **kwargs):
+    book_ids = _linked_books(instance, action, reverse, pk_set)
+    if book_ids:
+        changes.record(Book, book_ids, 'u', using=using)
+
+
+@receiver(m2m_changed, sender=Book.author.through)
+@receiver(m2m_changed, sender=Book.genre.through)
+def refresh_display_of_linked_books(sender, instance, action, reverse, pk_set, using, **kwargs):
+    book_ids = _linked_books(instance, action, reverse, pk_set)
+    if book_ids:
+        Book.objects.using(using).filter(pk__in=book_ids).refresh_display_columns()
+        if not reverse:
+            # Keep a later save() of this instance from writing the old names back.
+            instance.refresh_from_db(using=using, fields=['authors_display', 'genres_display'])
+
+
+DISPLAYED_LINKS = {
+    Author: 'author',
+    Genre: 'genre',
+}
+
+
+@receiver(post_save)
+def refresh_display_of_renamed_link(sender, instance, created, using, raw=False, **kwargs):
+    if sender in DISPLAYED_LINKS and not created and not raw:
+        Book.objects.using(using).filter(**{DISPLAYED_LINKS[sender]: instance}).refresh_display_columns()
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Genre)
+def refresh_display_of_deleted_link(sender, instance, using, **kwargs):
+    Book.objects.using(using).filter(pk__in=getattr(instance, '_linked_book_ids', [])).refresh_display_columns()
@@ -0,0 +1,75 @@
+"""Home page counters, computed in one query and kept in the cache.
+
+Each counter has its own cache key so the signal handlers in
+``catalog.signals`` can adjust it in place with incr/decr. Whenever a key is
+missing every counter is recomputed with a single aggregate query.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router
+from django.db.models import Count, IntegerField, Q, Value
+
+from .models import Author, Book, BookInstance, Genre
+from .routers import read_for_shared_cache
+
+COUNTERS = ('num_books', 'num_instances', 'num_instances_available', 'num_genres', 'num_authors')
+KEY_PREFIX = 'catalog:stats:'
+
+
+def _timeout():
+    return getattr(settings, 'CATALOG_STATS_TIMEOUT', 300)
+
+
+def _key(counter):
+    return KEY_PREFIX + counter
+
+
+def _counts(queryset, **aggregates):
+    """One-row queryset of table-wide aggregates (grouping by a constant avoids GROUP BY)."""
+    return (queryset.order_by().annotate(_all=Value(1, output_field=IntegerField()))
+            .values('_all').annotate(**aggregates).values(*aggregates))
+
+
+def compute_stats(using=None):
+    """Count books, copies, available copies, genres and authors in a single query."""
+    using = using or router.db_for_read(Book)
+    parts = [
+        _counts(Book.objects.using(using), num_books=Count('pk')),
+        _counts(BookInstance.objects.using(using), num_instances=Count('pk'),
+                num_instances_available=Count('pk', filter=Q(status__exact='a'))),
+        _counts(Genre.objects.using(using), num_genres=Count('pk')),
+        _counts(Author.objects.using(using), num_authors=Count('pk')),
+    ]
+    sql, params = [], []
+    for number, part in enumerate(parts):
+        part_sql, part_params = part.query.sql_with_params()
+        sql.append('(%s) counts%d' % (part_sql, number))
+        params.extend(part_params)
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT * FROM %s' % ' CROSS JOIN '.join(sql), params)
+        row = cursor.fetchone()
+    return dict(zip(COUNTERS, row))
+
+
+def get_stats():
+    """Return the counters, from the cache when they are all there."""
+    keys = [_key(counter) for counter in COUNTERS]
+    cached = cache.get_many(keys)
+    if len(cached) == len(keys):
+        return {counter: cached[_key(counter)] for counter in COUNTERS}
+    stats = read_for_shared_cache(compute_stats)
+    cache.set_many({_key(counter): value for counter, value in stats.items()}, _timeout())
+    return stats
+
+
+def adjust(counter, delta):
+    """Add ``delta`` to a cached counter; a missing counter is left to be recomputed."""
+    try:
+        cache.incr(_key(counter), delta)
+    except ValueError:
+        pass
+
+
+def invalidate(*counters):
+    """Forget cached counters (all of them by default)."""
+    cache.delete_many([_key(counter) for counter in counters or COUNTERS])
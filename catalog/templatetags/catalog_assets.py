@@ -0,0 +1,27 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from catalog import assets
+
+register = template.Library()
+
+
+@register.simple_tag
+def stylesheet_bundle(name):
+    """<link> to the built bundle, or to each of its sources until it has been built."""
+    if assets.find_source(name):
+        try:
+            return format_html('<link rel="stylesheet" href="{}">', static(name))
+        except ValueError:
+            # Built, but not collected into the manifest yet.
+            pass
+    links = []
+    for source in assets.BUNDLES[name]:
+        if source in assets.VENDOR and not assets.find_source(source):
+            vendored = assets.VENDOR[source]
+            links.append(('<link rel="stylesheet" href="{}" integrity="{}" crossorigin="anonymous">',
+                          (vendored.url, vendored.integrity)))
+        else:
+            links.append(('<link rel="stylesheet" href="{}">', (static(source),)))
+    return format_html_join('\n  ', '{}', ((format_html(html, *args),) for html, args in links))
@@ -0,0 +1,93 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog.admin import LimitedInlineFormSet
+from catalog.models import Author, Book, BookInstance, Genre, Language
+from catalog.pagination import EstimatedCountPaginator
+
+
+class AdminPerformanceTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'secret')
+        author = Author.objects.create(first_name='Ursula', last_name='Le Guin')
+        cls.book = Book.objects.create(title='The Dispossessed', summary='An ambiguous utopia.', isbn='9780061054884',
+                                       language=Language.objects.create(name='English'))
+        cls.book.author.add(author)
+        cls.book.genre.add(Genre.objects.create(name='Science Fiction'))
+        today = datetime.date.today()
+        for number in range(LimitedInlineFormSet.max_shown + 5):
+            BookInstance.objects.create(book=cls.book, imprint='Imprint %d' % number, status='o',
+                                        due_back=today + datetime.timedelta(days=number), borrower=cls.admin)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_copy_changelist_query_count_does_not_grow_with_rows(self):
+        url = reverse('admin:catalog_bookinstance_changelist')
+        before = self.changelist_queries(url)
+        BookInstance.objects.create(book=Book.objects.create(title='Other', summary='', isbn='1'),
+                                    imprint='Imprint', status='o', borrower=self.admin)
+        self.assertEqual(self.changelist_queries(url), before)
+
+    def test_book_changelist_query_count_does_not_grow_with_rows(self):
+        url = reverse('admin:catalog_book_changelist')
+        before = self.changelist_queries(url)
+        other = Book.objects.create(title='Other', summary='', isbn='1')
+        other.author.add(*Author.objects.all())
+        self.assertEqual(self.changelist_queries(url), before)
+        self.assertContains(self.client.get(url), 'Ursula Le Guin')
+
+    def test_change_form_edits_first_copies_and_links_to_all(self):
+        response = self.client.get(reverse('admin:catalog_book_change', args=[self.book.pk]))
+        self.assertEqual(response.context['inline_admin_formsets'][0].formset.initial_form_count(),
+                         LimitedInlineFormSet.max_shown)
+        self.assertContains(response, '?book__id__exact=%d' % self.book.pk)
+        self.assertContains(response, '%d copies' % (LimitedInlineFormSet.max_shown + 5))
+        # Related objects use autocomplete widgets instead of rendering every option.
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, '<option value="%d">admin</option>' % self.admin.pk)
+
+    def test_change_form_saves_shown_copies(self):
+        response = self.client.get(reverse('admin:catalog_book_change', args=[self.book.pk]))
+        data = {}
+        for key, value in response.context['adminform'].form.initial.items():
+            if value is not None:
+                data[key] = [item.pk for item in value] if isinstance(value, list) else value
+        formset = response.context['inline_admin_formsets'][0].formset
+        prefix = formset.prefix
+        data.update({prefix + '-TOTAL_FORMS': formset.initial_form_count(),
+                     prefix + '-INITIAL_FORMS': formset.initial_form_count(),
+                     prefix + '-MIN_NUM_FORMS': 0, prefix + '-MAX_NUM_FORMS': 1000})
+        for index, form in enumerate(formset.forms):
+            copy = form.instance
+            data.update({'%s-%d-id' % (prefix, index): copy.pk, '%s-%d-book' % (prefix, index): self.book.pk,
+                         '%s-%d-imprint' % (prefix, index): copy.imprint, '%s-%d-status' % (prefix, index): 'a',
+                         '%s-%d-due_back' % (prefix, index): '', '%s-%d-borrower' % (prefix, index): ''})
+        response = self.client.post(reverse('admin:catalog_book_change', args=[self.book.pk]), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(BookInstance.objects.filter(status='a').count(), LimitedInlineFormSet.max_shown)
+
+    def test_copies_filtered_by_book(self):
+        response = self.client.get(reverse('admin:catalog_bookinstance_changelist'),
+                                   {'book__id__exact': self.book.pk})
+        self.assertEqual(response.context['cl'].result_count, LimitedInlineFormSet.max_shown + 5)
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    def test_counts_exactly_without_planner_statistics(self):
+        Book.objects.create(title='Only', summary='', isbn='1')
+        paginator = EstimatedCountPaginator(Book.objects.all(), 10)
+        self.assertEqual(paginator.count, 1)
+        self.assertEqual(paginator.num_pages, 1)
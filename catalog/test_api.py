@@ -0,0 +1,83 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+
+class CatalogApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.english = Language.objects.create(name='English')
+        cls.fantasy = Genre.objects.create(name='Fantasy')
+        cls.author = Author.objects.create(first_name='Terry', last_name='Pratchett')
+        cls.books = []
+        for number in range(5):
+            book = Book.objects.create(title='Discworld %d' % number, summary='', isbn='%013d' % number,
+                                       language=cls.english)
+            book.author.add(cls.author)
+            book.genre.add(cls.fantasy)
+            BookInstance.objects.create(book=book, imprint='Corgi', status='a')
+            cls.books.append(book)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_book_list(self):
+        response = self.client.get(reverse('api-books'))
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([book['title'] for book in results], ['Discworld %d' % n for n in range(5)])
+        self.assertEqual(results[0]['authors'], [self.author.pk])
+        self.assertEqual(results[0]['genres'], [self.fantasy.pk])
+        self.assertEqual(results[0]['language_name'], 'English')
+        self.assertIsNone(response.json()['next'])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        # books and language, authors, genres
+        with self.assertNumQueries(3):
+            self.client.get(reverse('api-books'))
+        with self.assertNumQueries(1):
+            self.client.get(reverse('api-books'), {'fields': 'id,title,language'})
+
+    def test_field_selection(self):
+        response = self.client.get(reverse('api-authors'), {'fields': 'id,last_name'})
+        self.assertEqual(response.json()['results'], [{'id': self.author.pk, 'last_name': 'Pratchett'}])
+        response = self.client.get(reverse('api-authors'), {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_ids_lookup(self):
+        ids = '%d,%d' % (self.books[3].pk, self.books[1].pk)
+        response = self.client.get(reverse('api-books'), {'ids': ids, 'fields': 'id'})
+        self.assertEqual(response.json()['results'], [{'id': self.books[1].pk}, {'id': self.books[3].pk}])
+        self.assertEqual(self.client.get(reverse('api-books'), {'ids': '1,x'}).status_code, 400)
+
+    def test_cursor_pagination(self):
+        titles = []
+        url = reverse('api-books') + '?limit=2&fields=title'
+        while url:
+            data = self.client.get(url).json()
+            titles.extend(book['title'] for book in data['results'])
+            url = data['next']
+        self.assertEqual(titles, ['Discworld %d' % n for n in range(5)])
+
+    def test_detail(self):
+        copy = BookInstance.objects.first()
+        response = self.client.get(reverse('api-instance', kwargs={'pk': copy.pk}))
+        self.assertEqual(response.json()['status'], 'a')
+        self.assertEqual(self.client.get(reverse('api-genre', kwargs={'pk': 0})).status_code, 404)
+        self.assertEqual(self.client.get(reverse('api-languages')).json()['results'],
+                         [{'id': self.english.pk, 'name': 'English', 'book_count': 5, 'available_count': 5}])
+
+    def test_conditional_get(self):
+        response = self.client.get(reverse('api-books'))
+        with self.assertNumQueries(0):
+            revalidated = self.client.get(reverse('api-books'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Genre.objects.create(name='Comedy')
+        revalidated = self.client.get(reverse('api-books'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 200)
+
+    def test_read_only(self):
+        self.assertEqual(self.client.post(reverse('api-books')).status_code, 405)
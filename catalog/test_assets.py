@@ -0,0 +1,94 @@
+import os
+import pathlib
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from catalog import assets
+
+PLAIN_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
+
+class MinifyTest(SimpleTestCase):
+    def test_minify_css(self):
+        css = '/* dropped */\n/*! License */\n.a  >  b ,\n.c :hover {\n  color : red;\n  margin: 0 auto;\n}\n'
+        self.assertEqual(assets.minify_css(css), '/*! License */ .a>b,.c :hover{color : red;margin:0 auto}')
+
+
+class VendorTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.source = os.path.join(self.directory, 'upstream.css')
+        with open(self.source, 'wb') as upstream:
+            upstream.write(b'body{margin:0}')
+
+    def test_fetch_checks_integrity(self):
+        url = pathlib.Path(self.source).as_uri()
+        vendor = {
+            'vendor/good.css': assets.Vendored(url, assets.integrity(b'body{margin:0}')),
+            'vendor/bad.css': assets.Vendored(url, assets.integrity(b'body{margin:1px}')),
+        }
+        path = assets.fetch_vendor('vendor/good.css', vendor, directory=self.directory)
+        with open(path, 'rb') as vendored:
+            self.assertEqual(vendored.read(), b'body{margin:0}')
+        with self.assertRaises(ValueError):
+            assets.fetch_vendor('vendor/bad.css', vendor, directory=self.directory)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'vendor', 'bad.css')))
+
+
+class BundleTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.build_dir = directory.name
+
+    def render(self):
+        return Template("{% load catalog_assets %}{% stylesheet_bundle 'css/catalog.min.css' %}").render(Context())
+
+    def test_build_bundle(self):
+        with override_settings(CATALOG_STATIC_BUILD_DIR=self.build_dir):
+            path = assets.build_bundle('css/site.min.css', {'css/site.min.css': ['css/styles.css']})
+        self.assertEqual(path, os.path.join(self.build_dir, 'css', 'site.min.css'))
+        with open(path) as bundle:
+            self.assertIn('.sidebar-nav{margin-top:20px;', bundle.read())
+        self.assertGreater(assets.sizes(path)['raw'], assets.sizes(path)['gzip'])
+
+    def test_sources_are_looked_up_once(self):
+        self.addCleanup(assets.forget_sources)
+        with mock.patch('django.contrib.staticfiles.finders.find', return_value='/css/styles.css') as find:
+            with override_settings(STATICFILES_DIRS=[self.build_dir]):
+                self.assertEqual(assets.find_source('css/styles.css'), '/css/styles.css')
+                self.assertEqual(assets.find_source('css/styles.css'), '/css/styles.css')
+                self.assertEqual(find.call_count, 1)
+            assets.find_source('css/styles.css')
+        self.assertEqual(find.call_count, 2)
+
+    @override_settings(STATICFILES_STORAGE=PLAIN_STORAGE)
+    @mock.patch.dict(assets.VENDOR, {'vendor/missing.css': assets.Vendored('https://cdn.example.com/a.css', 'sha384-a')})
+    @mock.patch.dict(assets.BUNDLES, {'css/catalog.min.css': ['vendor/missing.css', 'css/styles.css']})
+    def test_sources_linked_until_built(self):
+        with override_settings(STATICFILES_DIRS=[self.build_dir]):
+            html = self.render()
+        self.assertEqual(html, '<link rel="stylesheet" href="https://cdn.example.com/a.css" integrity="sha384-a" '
+                               'crossorigin="anonymous">\n  <link rel="stylesheet" href="/static/css/styles.css">')
+
+    @override_settings(STATICFILES_STORAGE=PLAIN_STORAGE)
+    def test_bundle_linked_once_built(self):
+        os.makedirs(os.path.join(self.build_dir, 'css'))
+        with open(os.path.join(self.build_dir, 'css', 'catalog.min.css'), 'w') as bundle:
+            bundle.write('body{margin:0}')
+        with override_settings(STATICFILES_DIRS=[self.build_dir]):
+            html = self.render()
+        self.assertEqual(html, '<link rel="stylesheet" href="/static/css/catalog.min.css">')
+
+    @mock.patch.dict(assets.VENDOR, {'vendor/missing.css': assets.Vendored('file:///missing.css', 'sha384-')})
+    def test_command_needs_vendored_files(self):
+        with override_settings(STATICFILES_DIRS=[self.build_dir], CATALOG_STATIC_BUILD_DIR=self.build_dir):
+            with self.assertRaisesMessage(CommandError, 'has not been vendored; run with --fetch'):
+                call_command('build_static', no_collect=True)
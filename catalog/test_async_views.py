@@ -0,0 +1,109 @@
+import asyncio
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.http import Http404
+from django.test import AsyncRequestFactory, RequestFactory, TransactionTestCase
+
+from catalog import async_views, seeding, views
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+
+def fetch(view, request, **kwargs):
+    request.user = AnonymousUser()
+    cache.clear()
+    if asyncio.iscoroutinefunction(view):
+        return async_to_sync(view)(request, **kwargs)
+    response = view(request, **kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+# The async views query from worker threads on their own connections, which
+# only see committed data, hence TransactionTestCase.
+class AsyncViewsTest(TransactionTestCase):
+    def setUp(self):
+        language = Language.objects.create(name='English')
+        genre = Genre.objects.create(name='Fantasy')
+        self.author = Author.objects.create(first_name='Ursula', last_name='Le Guin')
+        for number in range(6):
+            book = Book.objects.create(title='Book %d' % number, summary='Summary', isbn='%013d' % number,
+                                       language=language)
+            book.author.add(self.author)
+            book.genre.add(genre)
+        self.book = Book.objects.order_by('pk').first()
+        for status in ('a', 'o'):
+            BookInstance.objects.create(book=self.book, imprint='Imprint', status=status)
+
+    def assertSamePage(self, sync_view, async_view, path, **kwargs):
+        sync_response = fetch(sync_view, RequestFactory().get(path), **kwargs)
+        async_response = fetch(async_view, AsyncRequestFactory().get(path), **kwargs)
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(async_response.content.decode(), sync_response.content.decode())
+        return async_response
+
+    def test_pages_match_sync_views(self):
+        self.assertSamePage(views.BookListView.as_view(), async_views.book_list, '/catalog/books/')
+        self.assertSamePage(views.AuthorListView.as_view(), async_views.author_list, '/catalog/authors/')
+        response = self.assertSamePage(views.BookDetailView.as_view(), async_views.book_detail,
+                                       '/catalog/book/%d' % self.book.pk, pk=self.book.pk)
+        self.assertContains(response, 'Le Guin, Ursula')
+        self.assertContains(response, '<strong>Imprint:</strong> Imprint', count=2)
+        self.assertSamePage(views.AuthorDetailView.as_view(), async_views.author_detail,
+                            '/catalog/author/%d' % self.author.pk, pk=self.author.pk)
+        self.assertSamePage(views.show_books_by_genre, async_views.show_books_by_genre,
+                            '/catalog/book/listbooksbygenreFantasy', genre='Fantasy')
+        self.assertSamePage(views.search_results, async_views.search_results, '/catalog/search/',
+                            choice='Genre', title_search='-', thegenre='Fantasy', author='-')
+        self.assertSamePage(views.book_search, async_views.book_search, '/catalog/book/search/?genre=Fantasy')
+
+    def test_index(self):
+        response = fetch(async_views.index, AsyncRequestFactory().get('/catalog/'))
+        self.assertContains(response, 'You have visited this page 0 times.')
+        self.assertIn('num_visits', response.cookies)
+
+    def test_missing_book(self):
+        with self.assertRaises(Http404):
+            fetch(async_views.book_detail, AsyncRequestFactory().get('/catalog/book/0'), pk=0)
+
+    def test_calls_run_concurrently(self):
+        # Each call waits for the other, so they only finish if they overlap.
+        barrier = threading.Barrier(2, timeout=5)
+
+        async def both():
+            return await asyncio.gather(async_views.in_thread(barrier.wait)(),
+                                        async_views.in_thread(barrier.wait)())
+        self.assertEqual(sorted(async_to_sync(both)()), [0, 1])
+
+
+    def test_query_threads_are_capped(self):
+        used = set()
+
+        def query():
+            Author.objects.count()
+            used.add(id(connections['default']))
+
+        async def burst():
+            await asyncio.gather(*(async_views.in_thread(query)() for _ in range(40)))
+        with mock.patch.object(async_views, '_executor', ThreadPoolExecutor(2)):
+            async_to_sync(burst)()
+        # One connection per thread, whatever the number of calls.
+        self.assertLessEqual(len(used), 2)
+
+
+class BenchmarkAsgiTest(TransactionTestCase):
+    def test_reports_both_modes(self):
+        seeding.seed_catalog(books=5, users=1)
+        out = io.StringIO()
+        call_command('benchmark_asgi', requests=4, concurrency=2, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(any(line.startswith('books') and ' wsgi ' in line for line in lines))
+        self.assertTrue(any(line.startswith('book-detail') and ' asgi ' in line for line in lines))
@@ -0,0 +1,122 @@
+import io
+import json
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import changes, importer
+from catalog.models import Author, Book, BookInstance, ChangeLogEntry, Genre, Language
+
+
+class ChangeFeedTest(TestCase):
+    def setUp(self):
+        self.author = Author.objects.create(first_name='Iain', last_name='Banks')
+        self.book = Book.objects.create(title='Excession', summary='', isbn='9780553575378')
+        self.start = changes.latest_sequence()
+
+    def test_saves_and_deletes_are_logged(self):
+        genre = Genre.objects.create(name='Space Opera')
+        genre.name = 'Science Fiction'
+        genre.save()
+        genre_id = genre.pk
+        genre.delete()
+        self.assertEqual(list(ChangeLogEntry.objects.filter(id__gt=self.start).values_list('model', 'action')),
+                         [('genres', 'c'), ('genres', 'u'), ('genres', 'd')])
+        entries, _, _ = changes.changes_since(self.start)
+        self.assertEqual(entries[0]['id'], str(genre_id))
+        self.assertEqual(entries[0]['action'], 'deleted')
+        self.assertIsNone(entries[0]['object'])
+
+    def test_snapshots_leave_out_facet_counts(self):
+        self.author.save()
+        entries, _, _ = changes.changes_since(self.start)
+        self.assertNotIn('book_count', entries[0]['object'])
+        self.assertNotIn('available_count', entries[0]['object'])
+        self.assertEqual(entries[0]['object']['last_name'], 'Banks')
+
+    def test_changes_are_compacted_per_object(self):
+        for title in ('Consider Phlebas', 'The Player of Games', 'Use of Weapons'):
+            self.book.title = title
+            self.book.save()
+        self.book.author.add(self.author)
+        copy = BookInstance.objects.create(book=self.book, imprint='Orbit', status='a')
+        entries, cursor, more = changes.changes_since(self.start)
+        self.assertEqual([(entry['model'], entry['action']) for entry in entries],
+                         [('books', 'updated'), ('instances', 'created')])
+        self.assertEqual(entries[0]['object']['title'], 'Use of Weapons')
+        self.assertEqual(entries[0]['object']['authors'], [self.author.pk])
+        self.assertEqual(entries[1]['id'], str(copy.pk))
+        self.assertEqual(cursor, changes.latest_sequence())
+        self.assertFalse(more)
+        self.assertEqual(changes.changes_since(cursor), ([], cursor, False))
+
+    def test_books_are_logged_when_their_links_change(self):
+        english = Language.objects.create(name='English')
+        genre = Genre.objects.create(name='Space Opera')
+        self.book.language = english
+        self.book.save()
+        self.book.author.add(self.author)
+        self.book.genre.add(genre)
+        start = changes.latest_sequence()
+        english.name = 'British English'
+        english.save()
+        entries, cursor, _ = changes.changes_since(start)
+        self.assertIn(('books', str(self.book.pk), 'updated'),
+                      [(entry['model'], entry['id'], entry['action']) for entry in entries])
+        self.assertEqual(entries[-1]['object']['language_name'], 'British English')
+        self.author.delete()
+        genre.delete()
+        english.delete()
+        entries, _, _ = changes.changes_since(cursor)
+        book = [entry['object'] for entry in entries if entry['model'] == 'books']
+        self.assertEqual(len(book), 1)
+        self.assertEqual((book[0]['authors'], book[0]['genres'], book[0]['language']), ([], [], None))
+
+    def test_books_are_logged_when_their_copies_change(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='Orbit', status='a')
+        start = changes.latest_sequence()
+        copy.status = 'o'
+        copy.save()
+        entries, _, _ = changes.changes_since(start)
+        self.assertEqual([(entry['model'], entry['action']) for entry in entries],
+                         [('books', 'updated'), ('instances', 'updated')])
+        self.book.refresh_from_db()
+        self.assertEqual(entries[0]['object']['updated'], self.book.updated)
+
+    def test_limit_resumes_without_losing_changes(self):
+        genres = [Genre.objects.create(name='Genre %d' % number) for number in range(5)]
+        genres[0].save()
+        seen, cursor, more = [], self.start, True
+        while more:
+            entries, cursor, more = changes.changes_since(cursor, limit=2)
+            seen.extend(entry['id'] for entry in entries)
+        self.assertEqual(seen, [str(genre.pk) for genre in genres[1:]] + [str(genres[0].pk)])
+
+    def test_query_count_does_not_grow_with_changes(self):
+        for number in range(20):
+            Book.objects.create(title='Book %d' % number, summary='', isbn='%013d' % number)
+        # compacted sequence numbers, entries, books, authors, genres
+        with self.assertNumQueries(5):
+            changes.changes_since(self.start)
+
+    def test_imports_are_logged(self):
+        importer.import_books(io.StringIO('"Look to Windward","Iain,Banks","","Space Opera","9781857230611","English"\n'))
+        entries, _, _ = changes.changes_since(self.start)
+        self.assertEqual(sorted(entry['model'] for entry in entries), ['books', 'genres', 'languages'])
+
+    def test_endpoint(self):
+        self.book.save()
+        response = self.client.get(reverse('api-changes'), {'since': self.start})
+        data = response.json()
+        self.assertEqual([entry['id'] for entry in data['changes']], [str(self.book.pk)])
+        self.assertEqual(data['next'], changes.latest_sequence())
+        self.assertEqual(self.client.get(reverse('api-changes'), {'since': 'x'}).status_code, 400)
+
+    def test_command(self):
+        self.book.save()
+        out = io.StringIO()
+        call_command('catalog_changes', since=self.start, limit=1, stdout=out)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(lines[0]['object']['title'], 'Excession')
+        self.assertEqual(lines[-1], {'next': changes.latest_sequence()})
@@ -0,0 +1,97 @@
+import time
+from unittest import mock
+
+from django.core.signals import request_started
+from django.db import OperationalError, connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from catalog import dbconnections
+from catalog.models import Author
+
+# A statement that runs for far longer than the timeouts below, and a quick one.
+SLOW_SQL = {
+    'sqlite': 'WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n) '
+              'SELECT max(x) FROM (SELECT x FROM n LIMIT 100000000)',
+    'postgresql': 'SELECT pg_sleep(10)',
+}
+QUICK_SQL = {
+    'sqlite': 'WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n) '
+              'SELECT max(x) FROM (SELECT x FROM n LIMIT 1000)',
+    'postgresql': 'SELECT pg_sleep(0.01)',
+}
+
+
+class StatementTimeoutTest(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def test_slow_statement_is_cancelled(self):
+        with self.assertRaises(OperationalError):
+            with dbconnections.statement_timeout(50):
+                with connection.cursor() as cursor:
+                    cursor.execute(SLOW_SQL[connection.vendor])
+        # The timeout is gone after the block.
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+    def test_timeout_applies_to_each_statement(self):
+        with dbconnections.statement_timeout(200):
+            for _ in range(3):
+                with connection.cursor() as cursor:
+                    cursor.execute(QUICK_SQL[connection.vendor])
+                time.sleep(0.15)
+
+    def test_timeout_applies_on_every_database(self):
+        replica = connections['replica']
+        with self.assertRaises(OperationalError):
+            with dbconnections.statement_timeout(50):
+                with replica.cursor() as cursor:
+                    cursor.execute(SLOW_SQL[replica.vendor])
+
+    def test_decorated_view_runs_normally(self):
+        Author.objects.create(first_name='Ursula', last_name='Le Guin')
+
+        @dbconnections.statement_timeout(5000)
+        def count():
+            return Author.objects.count()
+        self.assertEqual(count(), 1)
+
+
+class HealthCheckTest(TransactionTestCase):
+    def setUp(self):
+        dbconnections.metrics.clear()
+        connection.ensure_connection()
+
+    def test_unusable_connection_is_dropped_before_use(self):
+        request_started.send(sender=self.__class__)
+        with mock.patch.object(connection, 'is_usable', return_value=False), \
+                mock.patch.object(connection, 'close', wraps=connection.close) as close:
+            Author.objects.count()
+            Author.objects.count()
+        close.assert_called_once_with()
+        self.assertEqual(dbconnections.metrics.summary()[0]['unusable'], 1)
+
+    def test_open_connection_is_checked_once_per_request(self):
+        request_started.send(sender=self.__class__)
+        with mock.patch.object(connection, 'is_usable', return_value=True) as is_usable:
+            Author.objects.count()
+            Author.objects.count()
+        is_usable.assert_called_once_with()
+        self.assertEqual(dbconnections.metrics.summary()[0]['checks'], 1)
+
+    @override_settings(CATALOG_CONN_HEALTH_CHECKS=False)
+    def test_checks_can_be_turned_off(self):
+        request_started.send(sender=self.__class__)
+        with mock.patch.object(connection, 'is_usable') as is_usable:
+            Author.objects.count()
+        is_usable.assert_not_called()
+
+
+class ConnectionMetricsTest(TestCase):
+    def test_new_connection_is_timed(self):
+        dbconnections.metrics.clear()
+        extra = connections.create_connection('default')
+        extra.ensure_connection()
+        extra.close()
+        row = dbconnections.metrics.summary()[0]
+        self.assertEqual((row['alias'], row['connects']), ('default', 1))
+        self.assertGreaterEqual(row['max_ms'], row['p50_ms'])
@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import facets
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+
+class FacetCountsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.english = Language.objects.create(name='English')
+        cls.fantasy = Genre.objects.create(name='Fantasy')
+        cls.poetry = Genre.objects.create(name='Poetry')
+        cls.tolkien = Author.objects.create(first_name='John', last_name='Tolkien')
+        cls.hobbit = Book.objects.create(title='The Hobbit', summary='', isbn='1', language=cls.english)
+        cls.hobbit.genre.add(cls.fantasy)
+        cls.hobbit.author.add(cls.tolkien)
+        cls.lays = Book.objects.create(title='The Lays of Beleriand', summary='', isbn='2', language=cls.english)
+        cls.lays.genre.add(cls.fantasy, cls.poetry)
+        cls.lays.author.add(cls.tolkien)
+        for status in ('a', 'a', 'o'):
+            BookInstance.objects.create(book=cls.hobbit, imprint='Imprint', status=status)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_one_query_per_facet(self):
+        with self.assertNumQueries(1):
+            counts = facets.counts('genre')
+        self.assertEqual(counts, {
+            self.fantasy.pk: {'books': 2, 'available': 2},
+            self.poetry.pk: {'books': 1, 'available': 0},
+        })
+        self.assertEqual(facets.counts('language')[self.english.pk], {'books': 2, 'available': 2})
+        self.assertEqual(facets.counts('author')[self.tolkien.pk], {'books': 2, 'available': 2})
+        with self.assertNumQueries(0):
+            facets.counts('genre')
+
+    def test_linking_books_adjusts_cached_counts(self):
+        facets.counts('genre')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hobbit.genre.add(self.poetry)
+        with self.assertNumQueries(0):
+            self.assertEqual(facets.counts('genre')[self.poetry.pk], {'books': 2, 'available': 2})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fantasy.book_set.add(Book.objects.create(title='New', summary='', isbn='3'))
+        with self.assertNumQueries(0):
+            self.assertEqual(facets.counts('genre')[self.fantasy.pk], {'books': 3, 'available': 2})
+
+    def test_unlinking_and_loans_recount(self):
+        facets.counts('genre')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hobbit.genre.remove(self.fantasy)
+        self.assertEqual(facets.counts('genre')[self.fantasy.pk], {'books': 1, 'available': 0})
+        copy = self.hobbit.bookinstance_set.filter(status='o').get()
+        copy.status = 'a'
+        with self.captureOnCommitCallbacks(execute=True):
+            copy.save()
+        self.assertEqual(facets.counts('author')[self.tolkien.pk], {'books': 2, 'available': 3})
+
+    def test_pages_show_counts(self):
+        response = self.client.get(reverse('books-genre'))
+        self.assertContains(response, '(2 books, 2 available)')
+        self.assertContains(response, '(1 book, 0 available)')
+        response = self.client.get(reverse('search-books'))
+        self.assertContains(response, '>Tolkien, John</a>')
+        self.assertEqual(response.context['languages'], [(self.english, {'books': 2, 'available': 2})])
+        response = self.client.get(reverse('api-genres'), {'fields': 'name,book_count,available_count'})
+        self.assertEqual(response.json()['results'], [
+            {'name': 'Fantasy', 'book_count': 2, 'available_count': 2},
+            {'name': 'Poetry', 'book_count': 1, 'available_count': 0},
+        ])
@@ -33,3 +33,41 @@ class RenewBookFormTest(TestCase):
         date = timezone.localtime() + datetime.timedelta(weeks=4)
         form = RenewBookForm(data={'renewal_date': date})
         self.assertTrue(form.is_valid())
+
+import importlib
+
+from django.core.cache import cache
+
+from catalog import forms
+from catalog.forms import BookInstanceForm, BookSearchForm, GenreForm
+from catalog.models import Author, Book, BookInstance, Genre
+
+
+class ChoiceFormsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_import_does_not_query(self):
+        with self.assertNumQueries(0):
+            importlib.reload(forms)
+
+    def test_choices_are_loaded_lazily_and_cached(self):
+        Genre.objects.create(name='Fantasy')
+        with self.assertNumQueries(1):
+            self.assertEqual(list(GenreForm().fields['choice'].choices), [('Fantasy', 'Fantasy')])
+        with self.assertNumQueries(0):
+            GenreForm().fields['choice'].choices
+
+    def test_choices_follow_model_changes(self):
+        list(BookSearchForm().fields['author'].choices)
+        with self.captureOnCommitCallbacks(execute=True):
+            Author.objects.create(first_name='John', last_name='Smith')
+        self.assertEqual(list(BookSearchForm().fields['author'].choices), [('', 'Any'), ('Smith, John', 'Smith, John')])
+
+    def test_copy_choices_use_one_query(self):
+        book = Book.objects.create(title='Book Title', summary='', isbn='1')
+        for _ in range(3):
+            BookInstance.objects.create(book=book, imprint='Imprint')
+        with self.assertNumQueries(1):
+            self.assertEqual(list(BookInstanceForm().fields['choice'].choices), [('Book Title', 'Book Title')])
+        self.assertTrue(BookInstanceForm(data={'choice': 'Book Title'}).is_valid())
@@ -0,0 +1,53 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from catalog import importer
+from catalog.models import Author, Book, Genre, Language
+
+CSV = '''"The Hobbit","John,Tolkien","There and back again","Fantasy, Classic","1111111111111","English"
+"Silmarillion","John,Tolkien;Christopher,Tolkien","Elves","Fantasy","2222222222222","English"
+"Mere Christianity","Clive,Lewis","Broadcast talks","Theology","3333333333333","English"
+"Short row","x"
+'''
+
+
+class BookImporterTest(TestCase):
+    def test_imports_books_and_lookups(self):
+        result = importer.import_books(io.StringIO(CSV), chunk_size=2)
+        self.assertEqual(result.rows, 4)
+        self.assertEqual(result.created, 3)
+        self.assertEqual(result.skipped, 1)
+        self.assertEqual(Author.objects.count(), 3)
+        self.assertEqual(Genre.objects.count(), 3)
+        self.assertEqual(Language.objects.count(), 1)
+        silmarillion = Book.objects.get(isbn='2222222222222')
+        self.assertEqual(silmarillion.language.name, 'English')
+        self.assertEqual(sorted(a.first_name for a in silmarillion.author.all()), ['Christopher', 'John'])
+        self.assertEqual(sorted(g.name for g in Book.objects.get(title='The Hobbit').genre.all()),
+                         ['Classic', 'Fantasy'])
+
+    def test_reuses_existing_rows_and_skips_known_books(self):
+        tolkien = Author.objects.create(first_name='John', last_name='Tolkien')
+        fantasy = Genre.objects.create(name='Fantasy')
+        Book.objects.create(title='Mere Christianity', summary='', isbn='3333333333333')
+        result = importer.import_books(io.StringIO(CSV))
+        self.assertEqual(result.created, 2)
+        self.assertEqual(Author.objects.filter(last_name='Tolkien', first_name='John').get(), tolkien)
+        self.assertEqual(Genre.objects.filter(name='Fantasy').get(), fantasy)
+        self.assertEqual(tolkien.book_set.count(), 2)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        for size in (10, 100):
+            rows = [['Book %d' % n, 'First,Last %d' % n, '', 'Genre %d' % n, '%013d' % n, 'Language %d' % size]
+                    for n in range(size * 10, size * 11)]
+            with self.assertNumQueries(20):
+                importer.BookImporter(chunk_size=size).run(rows)
+        self.assertEqual(Book.objects.count(), 110)
+
+    def test_management_command(self):
+        out = io.StringIO()
+        call_command('import_books', 'exported_books.csv', stdout=out)
+        self.assertIn('rows/sec', out.getvalue())
+        self.assertTrue(Book.objects.exists())
@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from catalog import instrumentation
+from catalog.models import Author
+
+
+class FingerprintTest(TestCase):
+    def test_literals_and_in_lists_collapse(self):
+        self.assertEqual(
+            instrumentation.fingerprint("SELECT * FROM a WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            instrumentation.fingerprint("SELECT * FROM a WHERE id IN (%s) AND name = 'y''s' LIMIT 5"))
+
+    def test_recorder_counts_repeated_shapes(self):
+        recorder = instrumentation.QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for author in range(3):
+                Author.objects.filter(pk=author).exists()
+            Author.objects.count()
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(len(recorder.duplicates()), 1)
+        self.assertEqual(recorder.duplicates()[0][1], 3)
+
+
+class RequestMetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        instrumentation.histogram.clear()
+
+    def test_sampled_request_gets_server_timing(self):
+        response = self.client.get(reverse('authors'))
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+        views = {row['view']: row for row in instrumentation.histogram.summary()}
+        self.assertEqual(views['authors']['requests'], 1)
+        self.assertGreater(views['authors']['queries'], 0)
+
+    @override_settings(CATALOG_METRICS_SAMPLE_RATE=0)
+    def test_unsampled_request_is_left_alone(self):
+        response = self.client.get(reverse('authors'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(instrumentation.histogram.summary(), [])
+
+    @override_settings(CATALOG_SLOW_REQUEST_MS=0)
+    def test_slow_request_is_logged_as_json(self):
+        with self.assertLogs('catalog.instrumentation', 'WARNING') as logs:
+            self.client.get(reverse('authors'))
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['event'], 'slow_request')
+        self.assertEqual(entry['view'], 'authors')
+        self.assertEqual(entry['status'], 200)
+        self.assertIn('duplicates', entry)
+
+    def test_async_chain_stays_async(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        middleware = instrumentation.RequestMetricsMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = async_to_sync(middleware)(RequestFactory().get('/'))
+        self.assertIn('Server-Timing', response)
+
+    def test_metrics_page_is_staff_only(self):
+        User.objects.create_user('reader', password='secret')
+        self.client.login(username='reader', password='secret')
+        self.assertEqual(self.client.get(reverse('request-metrics')).status_code, 302)
+
+        User.objects.create_user('staff', password='secret', is_staff=True)
+        self.client.login(username='staff', password='secret')
+        self.client.get(reverse('authors'))
+        response = self.client.get(reverse('request-metrics'), {'format': 'json'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('authors', [row['view'] for row in response.json()['views']])
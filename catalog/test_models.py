@@ -46,3 +46,81 @@ class AuthorModelTest(TestCase):
         author = Author.objects.get(id=1)
         # This will also fail if the urlconf is not defined.
         self.assertEqual(author.get_absolute_url(), '/catalog/author/1')
+
+import io
+
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+
+from catalog.models import Book, Genre, Language
+
+
+class QueryIndexTest(TestCase):
+    def test_genre_and_language_names_are_unique(self):
+        Genre.objects.create(name='Fantasy')
+        Language.objects.create(name='English')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Genre.objects.create(name='Fantasy')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Language.objects.create(name='English')
+
+    def test_explain_command_rolls_back(self):
+        out = io.StringIO()
+        call_command('explain_catalog_queries', seed=30, repeat=1, stdout=out)
+        self.assertIn('Without indexes', out.getvalue())
+        self.assertIn('catalog_copy_status_due_idx', out.getvalue())
+        self.assertFalse(Book.objects.exists())
+
+
+from catalog import importer
+
+
+class BookDisplayColumnsTest(TestCase):
+    def setUp(self):
+        self.pratchett = Author.objects.create(first_name='Terry', last_name='Pratchett')
+        self.gaiman = Author.objects.create(first_name='Neil', last_name='Gaiman')
+        self.fantasy = Genre.objects.create(name='Fantasy')
+        self.comedy = Genre.objects.create(name='Comedy')
+        self.book = Book.objects.create(title='Good Omens', summary='', isbn='9780060853983')
+
+    def columns(self):
+        return Book.objects.values_list('authors_display', 'genres_display').get(pk=self.book.pk)
+
+    def test_follow_m2m_changes(self):
+        self.book.author.add(self.pratchett, self.gaiman)
+        self.book.genre.set([self.fantasy, self.comedy])
+        self.assertEqual(self.columns(), ('Neil Gaiman, Terry Pratchett', 'Comedy, Fantasy'))
+        self.assertEqual(self.book.display_authors(), 'Neil Gaiman, Terry Pratchett')
+        self.assertEqual(self.book.display_genre(), 'Comedy, Fantasy')
+        self.gaiman.book_set.remove(self.book)
+        self.comedy.book_set.clear()
+        self.assertEqual(self.columns(), ('Terry Pratchett', 'Fantasy'))
+
+    def test_save_after_m2m_change_keeps_names(self):
+        self.book.author.add(self.pratchett)
+        self.book.title = 'Good Omens: The Nice and Accurate Prophecies'
+        self.book.save()
+        self.assertEqual(self.columns()[0], 'Terry Pratchett')
+
+    def test_follow_renames_and_deletes(self):
+        self.book.author.add(self.pratchett, self.gaiman)
+        self.book.genre.add(self.fantasy)
+        self.gaiman.first_name = 'Neil R.'
+        self.gaiman.save()
+        self.assertEqual(self.columns()[0], 'Neil R. Gaiman, Terry Pratchett')
+        self.pratchett.delete()
+        self.fantasy.delete()
+        self.assertEqual(self.columns(), ('Neil R. Gaiman', ''))
+
+    def test_rebuild_command(self):
+        self.book.author.add(self.pratchett)
+        Book.objects.update(authors_display='', genres_display='stale')
+        out = io.StringIO()
+        call_command('rebuild_display_columns', stdout=out)
+        self.assertEqual(self.columns(), ('Terry Pratchett', ''))
+        self.assertIn('Refreshed 1 books', out.getvalue())
+
+    def test_imported_books_have_columns(self):
+        importer.import_books(io.StringIO('"Mort","Terry,Pratchett","","Fantasy, Comedy","9780552131063","English"\n'))
+        self.assertEqual(Book.objects.values_list('authors_display', 'genres_display').get(title='Mort'),
+                         ('Terry Pratchett', 'Comedy, Fantasy'))
@@ -0,0 +1,101 @@
+import datetime
+import io
+import smtplib
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from catalog import outbox
+from catalog.models import QueuedEmail
+
+
+class CountingBackend(LocmemBackend):
+    """locmem backend that records how often a connection is opened."""
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+
+
+class UnreachableBackend(BaseEmailBackend):
+    def open(self):
+        raise smtplib.SMTPConnectError(421, 'Cannot connect')
+
+    def send_messages(self, email_messages):
+        raise AssertionError('send_messages() called without a connection')
+
+
+class OutboxTest(TestCase):
+    def test_enqueue_does_not_send(self):
+        outbox.enqueue('Subject', 'Body', 'from@example.com', ['to@example.com'])
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(outbox.queue_depth(), 1)
+
+    @override_settings(EMAIL_BACKEND='catalog.test_outbox.CountingBackend')
+    def test_batch_reuses_one_connection(self):
+        CountingBackend.opened = 0
+        for number in range(3):
+            outbox.enqueue('Subject %d' % number, 'Body', 'from@example.com', ['a@example.com', 'b@example.com'])
+        self.assertEqual(outbox.send_queued(batch_size=2), (2, 0))
+        self.assertEqual(outbox.send_queued(batch_size=2), (1, 0))
+        self.assertEqual(CountingBackend.opened, 2)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].to, ['a@example.com', 'b@example.com'])
+        self.assertEqual(outbox.queue_depth(), 0)
+        self.assertEqual(QueuedEmail.objects.filter(status='s').count(), 3)
+
+    @override_settings(EMAIL_BACKEND='catalog.test_outbox.FailingBackend')
+    def test_failures_back_off_then_give_up(self):
+        queued = outbox.enqueue('Subject', 'Body', 'from@example.com', ['to@example.com'])
+        self.assertEqual(outbox.send_queued(max_attempts=2), (0, 1))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'q')
+        self.assertIn('SMTPServerDisconnected', queued.last_error)
+        self.assertGreater(queued.next_attempt, timezone.now() + datetime.timedelta(seconds=50))
+        # Not due yet
+        self.assertEqual(outbox.send_queued(max_attempts=2), (0, 0))
+        QueuedEmail.objects.update(next_attempt=timezone.now())
+        self.assertEqual(outbox.send_queued(max_attempts=2), (0, 1))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'f')
+        self.assertEqual(outbox.queue_depth(), 0)
+
+    @override_settings(EMAIL_BACKEND='catalog.test_outbox.UnreachableBackend')
+    def test_unreachable_server_backs_off_the_batch(self):
+        for number in range(2):
+            outbox.enqueue('Subject %d' % number, 'Body', 'from@example.com', ['to@example.com'])
+        self.assertEqual(outbox.send_queued(), (0, 2))
+        for queued in QueuedEmail.objects.all():
+            self.assertEqual((queued.status, queued.attempts), ('q', 1))
+            self.assertIn('SMTPConnectError', queued.last_error)
+            self.assertGreater(queued.next_attempt, timezone.now() + datetime.timedelta(seconds=50))
+        self.assertEqual(outbox.send_queued(), (0, 0))
+
+    def test_claimed_messages_are_leased(self):
+        outbox.enqueue('Subject', 'Body', 'from@example.com', ['to@example.com'])
+        self.assertEqual(len(outbox.claim()), 1)
+        # Another worker finds nothing due until the lease runs out.
+        self.assertEqual(outbox.claim(), [])
+        QueuedEmail.objects.update(next_attempt=timezone.now())
+        self.assertEqual(len(outbox.claim()), 1)
+
+    def test_backoff_grows(self):
+        self.assertEqual(outbox.backoff(1), datetime.timedelta(seconds=60))
+        self.assertEqual(outbox.backoff(3), datetime.timedelta(seconds=240))
+
+    def test_command_drains_queue(self):
+        outbox.enqueue('Subject', 'Body', 'from@example.com', ['to@example.com'])
+        out = io.StringIO()
+        call_command('send_queued_mail', stdout=out)
+        self.assertIn('Sent 1, failed 0, 0 queued', out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
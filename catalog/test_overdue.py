@@ -0,0 +1,92 @@
+import datetime
+import io
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from catalog import overdue
+from catalog.models import Book, BookInstance, OverdueNotice, QueuedEmail
+from catalog.test_outbox import CountingBackend
+
+
+class OverdueTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = datetime.date.today()
+        cls.book = Book.objects.create(title='The Left Hand of Darkness', summary='', isbn='9780441478125')
+        cls.anna = User.objects.create_user('anna', 'anna@example.com', 'secret', first_name='Anna')
+        cls.ben = User.objects.create_user('ben', 'ben@example.com', 'secret')
+
+    def lend(self, borrower, days_ago, status='o'):
+        return BookInstance.objects.create(book=self.book, imprint='Imprint', status=status, borrower=borrower,
+                                           due_back=self.today - datetime.timedelta(days=days_ago))
+
+    def test_overdue_queryset(self):
+        late = self.lend(self.anna, 3)
+        self.lend(self.anna, 0)
+        self.lend(self.anna, -2)
+        self.lend(self.anna, 5, status='a')
+        copies = list(BookInstance.objects.overdue(self.today))
+        self.assertEqual(copies, [late])
+        self.assertEqual(copies[0].overdue_by, datetime.timedelta(days=3))
+
+    def test_one_digest_per_borrower(self):
+        for days_ago in (1, 2, 3):
+            self.lend(self.anna, days_ago)
+        self.lend(self.ben, 10)
+        self.lend(User.objects.create_user('no-email', '', 'secret'), 4)
+        self.assertEqual(overdue.queue_overdue_notices(self.today), (2, 4))
+        digest = QueuedEmail.objects.get(to='anna@example.com')
+        self.assertEqual(digest.subject, 'You have 3 overdue books')
+        self.assertIn('Dear Anna', digest.body)
+        self.assertIn('3 days overdue', digest.body)
+        self.assertIn('1 day overdue', digest.body)
+        self.assertEqual(QueuedEmail.objects.get(to='ben@example.com').subject, 'You have 1 overdue book')
+
+    def test_rerun_only_queues_new_overdue_loans(self):
+        copy = self.lend(self.anna, 3)
+        overdue.queue_overdue_notices(self.today)
+        self.assertEqual(overdue.queue_overdue_notices(self.today), (0, 0))
+        # Renewed, then overdue again.
+        copy.due_back = self.today - datetime.timedelta(days=1)
+        copy.save()
+        self.assertEqual(overdue.queue_overdue_notices(self.today), (1, 1))
+        self.assertEqual(OverdueNotice.objects.filter(copy=copy).count(), 2)
+
+    def test_loans_noticed_meanwhile_only_skip_their_borrower(self):
+        anna_loan = self.lend(self.anna, 3)
+        self.lend(self.ben, 3)
+        loans = list(overdue.pending_loans(self.today))
+        # A concurrent run reminds Anna after this one read the loans.
+        OverdueNotice.objects.create(copy=anna_loan, borrower=self.anna, due_back=anna_loan.due_back)
+        with mock.patch('catalog.overdue.pending_loans') as pending_loans:
+            pending_loans.return_value.iterator.return_value = iter(loans)
+            self.assertEqual(overdue.queue_overdue_notices(self.today), (1, 1))
+        self.assertEqual(list(QueuedEmail.objects.values_list('to', flat=True)), ['ben@example.com'])
+
+    def test_loans_are_read_in_one_query(self):
+        for number in range(6):
+            self.lend(User.objects.create_user('user %d' % number, 'user%d@example.com' % number, 'secret'), 2)
+            self.lend(self.anna, number + 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(overdue.queue_overdue_notices(self.today, batch_size=5), (7, 12))
+        selects = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 1)
+
+    @override_settings(EMAIL_BACKEND='catalog.test_outbox.CountingBackend')
+    def test_command_sends_over_one_connection(self):
+        CountingBackend.opened = 0
+        self.lend(self.anna, 3)
+        self.lend(self.ben, 3)
+        out = io.StringIO()
+        call_command('send_overdue_notices', stdout=out)
+        self.assertIn('Queued 2 digests for 2 overdue loans', out.getvalue())
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['anna@example.com', 'ben@example.com'])
+        self.assertEqual(CountingBackend.opened, 1)
+        call_command('send_overdue_notices', stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 2)
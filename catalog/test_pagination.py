@@ -0,0 +1,116 @@
+import datetime
+
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from catalog.models import Author, Book, BookInstance, Genre
+from catalog.pagination import KeysetPaginator, paginate
+
+
+def walk(paginator):
+    """Every page from the first going forwards, then from the last going backwards."""
+    forwards, page = [], paginator.get_page()
+    while True:
+        forwards.append(list(page))
+        if not page.has_next():
+            break
+        page = paginator.get_page(after=page.next_cursor())
+    backwards = [list(page)]
+    while page.has_previous():
+        page = paginator.get_page(before=page.previous_cursor())
+        backwards.insert(0, list(page))
+    return forwards, backwards
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Repeated titles make the primary key decide the order.
+        for number in range(11):
+            Book.objects.create(title='Title %d' % (number % 4), summary='', isbn='%013d' % number)
+        for number in range(9):
+            Author.objects.create(first_name='First %d' % (number % 2), last_name='Last %d' % (number % 3))
+        book = Book.objects.first()
+        today = datetime.date.today()
+        for number in range(7):
+            due_back = today + datetime.timedelta(days=number % 3) if number % 2 else None
+            BookInstance.objects.create(book=book, imprint='Imprint', status='o', due_back=due_back)
+
+    def assertPagesCover(self, queryset, per_page):
+        expected = list(queryset)
+        forwards, backwards = walk(KeysetPaginator(queryset, per_page))
+        self.assertEqual([obj for page in forwards for obj in page], expected)
+        self.assertEqual(backwards, forwards)
+        self.assertTrue(all(len(page) == per_page for page in forwards[:-1]))
+
+    def test_books_by_title(self):
+        self.assertPagesCover(Book.objects.order_by('title', 'pk'), 3)
+
+    def test_authors_by_name(self):
+        self.assertPagesCover(Author.objects.order_by('last_name', 'first_name', 'pk'), 4)
+
+    def test_copies_by_due_date_with_nulls(self):
+        queryset = BookInstance.objects.filter(status__exact='o').order_by('due_back')
+        paginator = KeysetPaginator(queryset, 2)
+        forwards, backwards = walk(paginator)
+        copies = [copy for page in forwards for copy in page]
+        self.assertEqual(len(copies), 7)
+        self.assertEqual(len(set(copies)), 7)
+        self.assertEqual([copy.due_back for copy in copies][:3], [None, None, None])
+        self.assertEqual(backwards, forwards)
+
+    def test_descending_ordering(self):
+        self.assertPagesCover(Book.objects.order_by('-title', 'pk'), 4)
+
+    def test_deep_pages_cost_one_query(self):
+        paginator = KeysetPaginator(Book.objects.all(), 2)
+        page = paginator.get_page()
+        for _ in range(4):
+            with self.assertNumQueries(1):
+                page = paginator.get_page(after=page.next_cursor())
+                list(page)
+
+    def test_tampered_cursor_gives_first_page(self):
+        paginator = KeysetPaginator(BookInstance.objects.order_by('due_back'), 2)
+        first = list(paginator.get_page())
+        self.assertEqual(list(paginator.get_page(after='not a cursor')), first)
+        self.assertEqual(list(paginator.get_page(after='WyJ4IiwgIngiXQ')), first)
+
+    def test_estimated_count_is_capped(self):
+        paginator = KeysetPaginator(Book.objects.filter(title='Title 1'), 2, estimate_count=True)
+        self.assertEqual(paginator.count, 3)
+        self.assertFalse(paginator.count_is_capped)
+
+    def test_page_number_falls_back_to_offset(self):
+        request = RequestFactory().get('/', {'page': 2})
+        paginator, page = paginate(request, Book.objects.all(), 3)
+        self.assertEqual(page.number, 2)
+        self.assertFalse(getattr(paginator, 'keyset', False))
+
+
+class KeysetPaginationViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        genre = Genre.objects.create(name='Fantasy')
+        for number in range(6):
+            book = Book.objects.create(title='Book %d' % number, summary='', isbn='%013d' % number)
+            book.genre.add(genre)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_book_list_links_to_next_cursor(self):
+        response = self.client.get(reverse('books'))
+        page = response.context['page_obj']
+        self.assertContains(response, '?after=%s' % page.next_cursor())
+        response = self.client.get(reverse('books'), {'after': page.next_cursor()})
+        self.assertEqual([book.title for book in response.context['book_list']], ['Book 4', 'Book 5'])
+        self.assertContains(response, '?before=')
+
+    def test_books_by_genre(self):
+        response = self.client.get(reverse('list-books-by-genre', kwargs={'genre': 'Fantasy'}))
+        page = response.context['page_obj']
+        response = self.client.get(reverse('list-books-by-genre', kwargs={'genre': 'Fantasy'}),
+                                   {'after': page.next_cursor()})
+        self.assertEqual([book.title for book in response.context['page_obj']], ['Book 4', 'Book 5'])
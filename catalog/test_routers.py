@@ -0,0 +1,96 @@
+import asyncio
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from catalog import routers
+from catalog.models import Author, Book
+
+router = routers.PrimaryReplicaRouter()
+
+
+@override_settings(CATALOG_READ_REPLICAS=['replica'])
+class PrimaryReplicaRouterTest(SimpleTestCase):
+    databases = {'default', 'replica'}
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(router.db_for_read(Book), 'default')
+
+    def test_reads_use_replica_until_a_write(self):
+        with routers.replica_reads() as reads:
+            self.assertEqual(router.db_for_read(Book), 'replica')
+            self.assertEqual(router.db_for_write(Book), 'default')
+            self.assertEqual(router.db_for_read(Book), 'default')
+        self.assertTrue(reads.wrote)
+
+    def test_pinned_reads_and_transactions_use_primary(self):
+        with routers.replica_reads(primary=True):
+            self.assertEqual(router.db_for_read(Book), 'default')
+        with routers.replica_reads(), transaction.atomic():
+            self.assertEqual(router.db_for_read(Book), 'default')
+
+    def test_middleware_runs_async_views_with_replica_reads(self):
+        async def get_response(request):
+            self.assertEqual(router.db_for_read(Book), 'replica')
+            router.db_for_write(Book)
+            return HttpResponse()
+
+        middleware = routers.PrimaryReplicaMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = async_to_sync(middleware)(RequestFactory().get('/'))
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+
+    @override_settings(CATALOG_READ_REPLICAS=[])
+    def test_without_replicas_everything_uses_primary(self):
+        with routers.replica_reads():
+            self.assertEqual(router.db_for_read(Book), 'default')
+
+
+# Each database gets its own author, so a page shows which one it was read from.
+@override_settings(CATALOG_READ_REPLICAS=['replica'])
+class PrimaryReplicaMiddlewareTest(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        Author.objects.create(first_name='Primary', last_name='Author')
+        Author.objects.using('replica').create(first_name='Replica', last_name='Author')
+
+    def test_get_reads_from_replica(self):
+        # A parameter the page cache doesn't vary on keeps the page out of it.
+        response = self.client.get(reverse('authors'), {'uncached': 1})
+        self.assertContains(response, 'Replica')
+        self.assertNotContains(response, 'Primary')
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_shared_caches_are_filled_from_primary(self):
+        response = self.client.get(reverse('authors'))
+        self.assertContains(response, 'Primary')
+        self.assertNotContains(response, 'Replica')
+        self.assertEqual(self.client.get(reverse('index')).context['num_authors'], 1)
+        # The search form's choices.
+        self.assertContains(self.client.get(reverse('search-books'), {'uncached': 1}),
+                            '<option value="Author, Primary">')
+
+    def test_api_reads_from_primary(self):
+        # Its ETag is the catalog version the primary is at.
+        response = self.client.get(reverse('api-authors'), {'fields': 'last_name,first_name'})
+        self.assertEqual(response.json()['results'], [{'last_name': 'Author', 'first_name': 'Primary'}])
+
+    def test_search_with_statement_timeout_reads_from_replica(self):
+        Book.objects.using('replica').create(title='Replica Book', summary='', isbn='1')
+        response = self.client.get(reverse('book-search'), {'uncached': 1})
+        self.assertContains(response, 'Replica Book')
+
+    def test_write_pins_later_requests_to_primary(self):
+        User.objects.create_user('reader', password='secret')
+        response = self.client.post(reverse('login'), {'username': 'reader', 'password': 'secret'})
+        self.assertEqual(response.cookies[routers.PIN_COOKIE]['max-age'], 10)
+        response = self.client.get(reverse('authors'))
+        self.assertContains(response, 'Primary')
+        self.assertEqual(response.context['user'].username, 'reader')
@@ -0,0 +1,98 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import search
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+
+class SearchResultsViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='John', last_name='Tolkien')
+        Genre.objects.create(name='Fantasy')
+        for number in range(6):
+            book = Book.objects.create(title='Hobbit %d' % number, summary='', isbn='%013d' % number)
+            book.author.add(author)
+
+    def test_title_search_paginates(self):
+        response = self.client.get(reverse('search-results', args=['Title', 'hobbit', 'Fantasy', 'Tolkien, John']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['size'], 6)
+        self.assertEqual(len(response.context['page_obj']), 4)
+
+    def test_author_search(self):
+        response = self.client.get(reverse('search-results', args=['Author', ' ', 'Fantasy', 'Tolkien, John']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['size'], 6)
+        self.assertEqual(response.context['theauthor'], 'John Tolkien')
+
+
+class MultiCriteriaSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        english, french = Language.objects.create(name='English'), Language.objects.create(name='French')
+        fantasy, classic = Genre.objects.create(name='Fantasy'), Genre.objects.create(name='Classic')
+        tolkien = Author.objects.create(first_name='John', last_name='Tolkien')
+        verne = Author.objects.create(first_name='Jules', last_name='Verne')
+        cls.hobbit = Book.objects.create(title='The Hobbit', summary='', isbn='1', language=english)
+        cls.hobbit.author.add(tolkien)
+        cls.hobbit.genre.add(fantasy, classic)
+        cls.silmarillion = Book.objects.create(title='The Silmarillion', summary='', isbn='2', language=english)
+        cls.silmarillion.author.add(tolkien)
+        cls.silmarillion.genre.add(fantasy)
+        cls.journey = Book.objects.create(title='Journey to the Centre of the Earth', summary='', isbn='3',
+                                          language=french)
+        cls.journey.author.add(verne)
+        cls.journey.genre.add(classic)
+        BookInstance.objects.create(book=cls.hobbit, imprint='Imprint', status='a')
+        BookInstance.objects.create(book=cls.silmarillion, imprint='Imprint', status='o')
+
+    def test_criteria_combine(self):
+        query = search.BookSearch()
+        self.assertEqual(list(query.where(genre='Fantasy').books()), [self.hobbit, self.silmarillion])
+        self.assertEqual(list(query.where(genre='Fantasy', available=True).books()), [self.hobbit])
+        self.assertEqual(list(query.where(title='the', genre='Classic', language='French').books()), [self.journey])
+        self.assertEqual(list(query.where(author='Tolkien, John', title='silm').books()), [self.silmarillion])
+        self.assertEqual(list(query.where(author='Verne, Jules', genre='Fantasy').books()), [])
+
+    def test_title_matches_inside_words(self):
+        earthsea = Book.objects.create(title='A Wizard of Earthsea', summary='', isbn='4')
+        sea = Book.objects.create(title='The Sea of Monsters', summary='', isbn='5')
+        self.assertEqual(list(search.BookSearch().where(title='sea').books()), [earthsea, sea])
+        self.assertEqual(list(search.BookSearch().where(title='ilmar').books()), [self.silmarillion])
+
+    def test_author_name_spacing_is_ignored(self):
+        for name in ('Tolkien,John', ' Tolkien ,  John '):
+            self.assertEqual(list(search.BookSearch().where(author=name).books()), [self.hobbit, self.silmarillion])
+
+    def test_one_query_per_page_and_facets(self):
+        query = search.BookSearch().where(title='the')
+        with self.assertNumQueries(1):
+            self.assertEqual(len(query.books()), 3)
+        with self.assertNumQueries(1):
+            facets = query.facets()
+        self.assertEqual(facets, {
+            'total': 3,
+            'genre': [('Classic', 2), ('Fantasy', 2)],
+            'language': [('English', 2), ('French', 1)],
+        })
+        self.assertEqual(search.BookSearch().where(genre='Fantasy', available=True).facets()['genre'],
+                         [('Classic', 1), ('Fantasy', 1)])
+
+    def test_search_page(self):
+        cache.clear()
+        response = self.client.get(reverse('book-search'), {'genre': 'Fantasy', 'page': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['size'], 2)
+        self.assertContains(response, 'The Silmarillion')
+        self.assertNotContains(response, 'Journey')
+        self.assertContains(response, '<a href="?genre=Fantasy&amp;language=English">English</a>')
+        self.assertContains(response, '<strong>Fantasy</strong>')
+        self.assertIn('ETag', response)
+
+    def test_unknown_choice_shows_the_form_error(self):
+        response = self.client.get(reverse('book-search'), {'genre': 'Nope'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
+        self.assertContains(response, 'No books match the search.')
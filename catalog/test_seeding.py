@@ -0,0 +1,57 @@
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from catalog import seeding
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+
+class SeedCatalogTest(TestCase):
+    def test_creates_requested_rows(self):
+        created = seeding.seed_catalog(books=50, genres=5, languages=3, users=4, copies_per_book=2)
+        self.assertEqual(created['books'], 50)
+        self.assertEqual(Book.objects.count(), 50)
+        self.assertEqual(Author.objects.count(), 10)
+        self.assertEqual(Genre.objects.count(), 5)
+        self.assertEqual(Language.objects.count(), 3)
+        self.assertEqual(User.objects.count(), 4)
+        self.assertEqual(BookInstance.objects.count(), created['copies'])
+        for book in Book.objects.prefetch_related('author', 'genre'):
+            self.assertTrue(book.author.all())
+            self.assertTrue(book.genre.all())
+
+    def test_same_seed_gives_same_catalog(self):
+        seeding.seed_catalog(books=20, users=2, seed=3)
+        first = list(Book.objects.order_by('isbn').values_list('title', 'isbn', 'summary'))
+        BookInstance.objects.all().delete()
+        Book.objects.all().delete()
+        seeding.seed_catalog(books=20, users=2, seed=3)
+        self.assertEqual(list(Book.objects.order_by('isbn').values_list('title', 'isbn', 'summary')), first)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('seed_catalog', books=15, users=2, stdout=out)
+        self.assertEqual(Book.objects.count(), 15)
+        self.assertIn('15 books', out.getvalue())
+
+
+class BenchmarkCatalogTest(TestCase):
+    def test_writes_report_for_every_endpoint(self):
+        seeding.seed_catalog(books=10, users=2)
+        User.objects.create_superuser('admin', 'admin@example.com', 'secret')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.json')
+            call_command('benchmark_catalog', repeat=2, output=path, stdout=io.StringIO())
+            with open(path) as report_file:
+                report = json.load(report_file)
+        self.assertEqual(report['rows']['Book'], 10)
+        books = report['endpoints']['books']
+        self.assertEqual(books['status'], 200)
+        self.assertGreater(books['queries'], 0)
+        self.assertLessEqual(books['p50_ms'], books['max_ms'])
+        self.assertEqual(report['endpoints']['import-books'], {'skipped': 'changes data'})
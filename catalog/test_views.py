@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 
@@ -15,6 +16,10 @@ class AuthorListViewTest(TestCase):
                 last_name=f'Surname {author_id}',
             )
 
+    def setUp(self):
+        # Don't get the page cached for anonymous users by an earlier test.
+        cache.clear()
+
     def test_view_url_exists_at_desired_location(self):
         response = self.client.get('/catalog/authors/')
         self.assertEqual(response.status_code, 200)
@@ -281,3 +286,302 @@ class RenewBookInstancesViewTest(TestCase):
         response = self.client.post(reverse('renew-book-librarian', kwargs={'pk': self.test_bookinstance1.pk}), {'renewal_date': invalid_date_in_future})
         self.assertEqual(response.status_code, 200)
         self.assertFormError(response, 'form', 'renewal_date', 'Invalid date - renewal more than 4 weeks ahead')
+
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.core import mail
+from django.test import override_settings
+
+from catalog import export, outbox
+
+
+class ExportBooksViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        language = Language.objects.create(name='English')
+        fantasy = Genre.objects.create(name='Fantasy')
+        epic = Genre.objects.create(name='Epic')
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        for number in range(5):
+            book = Book.objects.create(title='Book "%d"' % number, summary='Summary, %d' % number,
+                                       isbn='%013d' % number, language=language)
+            book.author.add(author)
+            book.genre.add(fantasy, epic)
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+    def test_streams_csv(self):
+        response = self.client.get(reverse('export-books'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[0], '"Book ""0""","John,Smith","Summary, 0","Epic, Fantasy","0000000000000","English"')
+
+    def test_streams_gzip(self):
+        response = self.client.get(reverse('export-books') + '?gzip=1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        content = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertEqual(len(content.splitlines()), 5)
+
+    def test_query_count_does_not_grow_with_catalog(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(len(list(export.export_rows(chunk_size=2))), 5)
+
+    def test_stores_file(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            response = self.client.get(reverse('export-books') + '?mode=file')
+        self.assertEqual(response.context['count'], 5)
+        with open(os.path.join(self.media_root, response.context['path'])) as exported:
+            self.assertEqual(len(exported.read().splitlines()), 5)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_emails_stored_file(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            response = self.client.get(reverse('export-books') + '?mode=email&gzip=1')
+            self.assertEqual(response.context['path'], 'exported_books.csv.gz')
+            self.assertEqual(len(mail.outbox), 0)
+            self.assertEqual(outbox.send_queued(), (1, 0))
+        self.assertEqual(mail.outbox[0].attachments[0][0], 'exported_books.csv.gz')
+
+from django.conf import settings
+
+from catalog import stats
+
+
+class IndexViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        Genre.objects.create(name='Fantasy')
+        book = Book.objects.create(title='Book Title', summary='My book summary', isbn='ABCDEFG')
+        book.author.add(author)
+        for status in ('a', 'a', 'o'):
+            BookInstance.objects.create(book=book, imprint='Unlikely Imprint, 2016', status=status)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_counts(self):
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['num_books'], 1)
+        self.assertEqual(response.context['num_instances'], 3)
+        self.assertEqual(response.context['num_instances_available'], 2)
+        self.assertEqual(response.context['num_genres'], 1)
+        self.assertEqual(response.context['num_authors'], 1)
+
+    def test_counts_use_one_query_then_cache(self):
+        with self.assertNumQueries(1):
+            stats.get_stats()
+        with self.assertNumQueries(0):
+            stats.get_stats()
+
+    def test_counts_follow_changes(self):
+        stats.get_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            Author.objects.create(first_name='Jane', last_name='Doe')
+            BookInstance.objects.create(book=Book.objects.get(), imprint='Imprint', status='a')
+        with self.assertNumQueries(0):
+            counts = stats.get_stats()
+        self.assertEqual(counts['num_authors'], 2)
+        self.assertEqual(counts['num_instances_available'], 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            BookInstance.objects.filter(status='o').get().delete()
+        self.assertEqual(stats.get_stats()['num_instances'], 3)
+
+    def test_status_change_recomputes_available(self):
+        stats.get_stats()
+        copy = BookInstance.objects.filter(status='o').get()
+        copy.status = 'a'
+        with self.captureOnCommitCallbacks(execute=True):
+            copy.save()
+        self.assertEqual(stats.get_stats()['num_instances_available'], 3)
+
+    def test_visits_are_counted_without_database_access(self):
+        stats.get_stats()
+        for expected in range(3):
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse('index'))
+            self.assertEqual(response.context['num_visits'], expected)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    def test_tampered_visit_cookie_starts_over(self):
+        self.client.cookies['num_visits'] = '41'
+        self.assertEqual(self.client.get(reverse('index')).context['num_visits'], 0)
+
+    def test_visits_carry_over_from_session(self):
+        session = self.client.session
+        session['num_visits'] = 7
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        self.assertEqual(self.client.get(reverse('index')).context['num_visits'], 7)
+        self.assertEqual(self.client.get(reverse('index')).context['num_visits'], 8)
+
+    @override_settings(CATALOG_VISIT_COUNTER='session')
+    def test_session_counter(self):
+        self.client.get(reverse('index'))
+        self.assertEqual(self.client.get(reverse('index')).context['num_visits'], 1)
+        self.assertEqual(self.client.session['num_visits'], 2)
+
+
+class CatalogPageQueryBudgetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        language = Language.objects.create(name='English')
+        genres = [Genre.objects.create(name='Genre %d' % n) for n in range(3)]
+        authors = [Author.objects.create(first_name='First %d' % n, last_name='Last %d' % n) for n in range(3)]
+        for number in range(8):
+            book = Book.objects.create(title='Book %d' % number, summary='', isbn='%013d' % number, language=language)
+            book.author.set(authors)
+            book.genre.set(genres)
+            for copy in range(number):
+                BookInstance.objects.create(book=book, imprint='Imprint %d' % copy, status='a')
+        cls.book = book
+
+    def setUp(self):
+        cache.clear()
+
+    def test_book_list_query_budget(self):
+        # books, count; authors come from authors_display
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('books'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'First 0 Last 0, First 1 Last 1, First 2 Last 2')
+
+    def test_book_detail_query_budget(self):
+        # book and language, authors, copies; genres come from genres_display
+        with self.assertNumQueries(3):
+            response = self.client.get(self.book.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Imprint 6')
+        self.assertContains(response, 'Genre 0, Genre 1, Genre 2')
+
+    def test_author_list_query_budget(self):
+        # authors; one page needs no count
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('authors'))
+        self.assertEqual(response.status_code, 200)
+
+
+class BorrowAndRenewLookupTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='borrower', password='1X<ISRUkw+tuK', email='b@example.com')
+        self.book = Book.objects.create(title='Book Title', summary='', isbn='1')
+        self.other = Book.objects.create(title='Other Title', summary='', isbn='2')
+        today = datetime.date.today()
+        self.maintenance = BookInstance.objects.create(book=self.book, imprint='Imprint', status='m')
+        self.late = BookInstance.objects.create(book=self.book, imprint='Imprint', status='o',
+                                                due_back=today + datetime.timedelta(days=9))
+        self.early = BookInstance.objects.create(book=self.book, imprint='Imprint', status='o',
+                                                 due_back=today + datetime.timedelta(days=2))
+        self.available = BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        cache.clear()
+
+    def test_renew_picks_earliest_due_copy_on_loan(self):
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('borrow-renew'), {'choice': 'Book Title'})
+        self.assertRedirects(response, reverse('renew-book-librarian', kwargs={'pk': self.early.pk}),
+                             fetch_redirect_response=False)
+
+    def test_borrow_reserves_available_copy(self):
+        self.client.login(username='borrower', password='1X<ISRUkw+tuK')
+        response = self.client.post(reverse('my-borrow'), {'choice': 'Book Title'})
+        self.assertEqual(response.context['copy'], self.available)
+        self.available.refresh_from_db()
+        self.assertEqual(self.available.status, 'r')
+        self.assertEqual(self.available.borrower, self.user)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_borrow_without_available_copy_sends_request(self):
+        self.client.login(username='borrower', password='1X<ISRUkw+tuK')
+        response = self.client.post(reverse('my-borrow'), {'choice': 'Other Title'})
+        self.assertIsNone(response.context['copy'])
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(outbox.queue_depth(), 1)
+        outbox.send_queued()
+        self.assertEqual(mail.outbox[0].subject, 'Borrow "Other Title"')
+        self.assertEqual(mail.outbox[0].from_email, 'b@example.com')
+
+    def test_anonymous_borrow_redirects_to_login(self):
+        self.available.status = 'o'
+        self.available.save()
+        response = self.client.post(reverse('my-borrow'), {'choice': 'Book Title'})
+        self.assertRedirects(response, '/accounts/login/?next=' + reverse('my-borrow'), fetch_redirect_response=False)
+        self.assertEqual(outbox.queue_depth(), 0)
+
+
+from django.contrib.auth.models import User
+
+
+class PageCacheTest(TestCase):
+    def setUp(self):
+        self.author = Author.objects.create(first_name='Ursula', last_name='Le Guin')
+        self.book = Book.objects.create(title='The Dispossessed', summary='', isbn='9780060512750')
+        self.book.author.add(self.author)
+        cache.clear()
+
+    def test_anonymous_page_served_from_cache(self):
+        self.client.get(reverse('books'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('books'))
+        self.assertContains(response, 'The Dispossessed')
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_pages_cached_per_page_number(self):
+        for number in range(4):
+            Author.objects.create(first_name='Author', last_name='Zed %d' % number)
+        first = self.client.get(reverse('authors'))
+        second = self.client.get(reverse('authors') + '?page=2')
+        self.assertNotContains(first, 'Zed 3')
+        self.assertContains(second, 'Zed 3')
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(reverse('authors') + '?page=2'), 'Zed 3')
+
+    def test_revalidation_gets_not_modified(self):
+        response = self.client.get(self.book.get_absolute_url())
+        with self.assertNumQueries(0):
+            revalidated = self.client.get(self.book.get_absolute_url(), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        revalidated = self.client.get(self.book.get_absolute_url(), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_saves_invalidate_pages(self):
+        response = self.client.get(self.book.get_absolute_url())
+        with self.captureOnCommitCallbacks(execute=True):
+            BookInstance.objects.create(book=self.book, imprint='Harper 1974', status='a')
+        refreshed = self.client.get(self.book.get_absolute_url(), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertContains(refreshed, 'Harper 1974')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.first_name = 'U. K.'
+            self.author.save()
+        self.assertContains(self.client.get(reverse('books')), 'U. K. Le Guin')
+
+    def test_logged_in_users_get_their_own_sidebar(self):
+        User.objects.create_user('reader', password='secret')
+        self.client.get(reverse('books'))
+        self.client.login(username='reader', password='secret')
+        response = self.client.get(reverse('books'))
+        self.assertContains(response, 'User: reader')
+        self.assertNotIn('ETag', response)
+
+    def test_fragments_follow_updated_stamp(self):
+        User.objects.create_user('reader', password='secret')
+        self.client.login(username='reader', password='secret')
+        self.client.get(self.book.get_absolute_url())
+        # A change that skips the signals leaves the cached fragment in place.
+        Book.objects.filter(pk=self.book.pk).update(summary='Anarres and Urras')
+        self.assertNotContains(self.client.get(self.book.get_absolute_url()), 'Anarres')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.genre.add(Genre.objects.create(name='Science Fiction'))
+        response = self.client.get(self.book.get_absolute_url())
+        self.assertContains(response, 'Anarres')
+        self.assertContains(response, 'Science Fiction')
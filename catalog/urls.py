@@ -1,12 +1,25 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
+
+if settings.CATALOG_ASYNC_VIEWS:
+    # Served over ASGI: the read views run their queries concurrently.
+    index, book_list, book_detail = async_views.index, async_views.book_list, async_views.book_detail
+    author_list, author_detail = async_views.author_list, async_views.author_detail
+    show_books_by_genre, search_results = async_views.show_books_by_genre, async_views.search_results
+    book_search = async_views.book_search
+else:
+    index, book_list, book_detail = views.index, views.BookListView.as_view(), views.BookDetailView.as_view()
+    author_list, author_detail = views.AuthorListView.as_view(), views.AuthorDetailView.as_view()
+    show_books_by_genre, search_results = views.show_books_by_genre, views.search_results
+    book_search = views.book_search
 
 urlpatterns = [
-    path('', views.index, name='index'),
-    path('books/', views.BookListView.as_view(), name='books'),
-    path('book/<int:pk>', views.BookDetailView.as_view(), name='book-detail'),
-    path('authors/', views.AuthorListView.as_view(), name='authors'),
-    path('author/<int:pk>', views.AuthorDetailView.as_view(), name='author-detail'),
+    path('', index, name='index'),
+    path('books/', book_list, name='books'),
+    path('book/<int:pk>', book_detail, name='book-detail'),
+    path('authors/', author_list, name='authors'),
+    path('author/<int:pk>', author_detail, name='author-detail'),
 ]
 urlpatterns += [
     path('mybooks/', views.LoanedBooksByUserListView.as_view(), name='my-borrowed'),
@@ -37,7 +50,7 @@ urlpatterns += [
 #    path('book/listbooksbygenre/<str:genre>',views.BookByGenreListView.as_view(),name='list-books-by-genre'),
 #]
 urlpatterns += [
-    path('book/listbooksbygenre<str:genre>',views.show_books_by_genre,name='list-books-by-genre'),
+    path('book/listbooksbygenre<str:genre>',show_books_by_genre,name='list-books-by-genre'),
 ]
 urlpatterns += [
     path('book/books',views.get_book_borrow_id,name='borrow-renew'),
@@ -53,7 +66,24 @@ urlpatterns += [
 ]
 urlpatterns += [
     path('book/searchbooks',views.search_books,name='search-books'),
+    path('book/search/',book_search,name='book-search'),
+]
+urlpatterns += [
+    path('book/<str:choice>/<str:title_search>/<str:thegenre>/<str:author>/searchresults',search_results,name='search-results'),
+]
+urlpatterns += [
+    path('metrics/', views.request_metrics, name='request-metrics'),
 ]
 urlpatterns += [
-    path('book/<str:choice>/<str:title_search>/<str:thegenre>/<str:author>/searchresults',views.search_results,name='search-results'),
+    path('api/books/', api.object_list, {'resource': 'books'}, name='api-books'),
+    path('api/books/<int:pk>/', api.object_detail, {'resource': 'books'}, name='api-book'),
+    path('api/authors/', api.object_list, {'resource': 'authors'}, name='api-authors'),
+    path('api/authors/<int:pk>/', api.object_detail, {'resource': 'authors'}, name='api-author'),
+    path('api/genres/', api.object_list, {'resource': 'genres'}, name='api-genres'),
+    path('api/genres/<int:pk>/', api.object_detail, {'resource': 'genres'}, name='api-genre'),
+    path('api/languages/', api.object_list, {'resource': 'languages'}, name='api-languages'),
+    path('api/languages/<int:pk>/', api.object_detail, {'resource': 'languages'}, name='api-language'),
+    path('api/instances/', api.object_list, {'resource': 'instances'}, name='api-instances'),
+    path('api/instances/<uuid:pk>/', api.object_detail, {'resource': 'instances'}, name='api-instance'),
+    path('api/changes/', api.change_feed, name='api-changes'),
 ]
@@ -2,45 +2,44 @@ from django.shortcuts import render
 
 # Create your views here.
 from .models import Book, Author, BookInstance, Genre
+from . import facets, stats, visits
 
 def index(request):
     """View function for home page of site."""
 
-    # Generate counts of some of the main objects
-    num_books = Book.objects.all().count()
-    num_instances = BookInstance.objects.all().count()
-    num_genres = Genre.objects.all().count()
+    # Counts of the main objects, cached between requests
+    context = stats.get_stats()
 
-    # Available books (status = 'a')
-    num_instances_available = BookInstance.objects.filter(status__exact='a').count()
+    # Number of visits to this view, counted without a session write (see catalog.visits).
+    num_visits = visits.visits(request)
 
-    # The 'all()' is implied by default.
-    num_authors = Author.objects.count()
-    # Number of visits to this view, as counted in the session variable.
-    num_visits = request.session.get('num_visits', 0)
-    request.session['num_visits'] = num_visits + 1
-
-    context = {
-        'num_books': num_books,
-        'num_instances': num_instances,
-        'num_instances_available': num_instances_available,
-        'num_authors': num_authors,
-        'num_visits': num_visits,
-        'num_genres':num_genres,
-    }
+    context['num_visits'] = num_visits
 
     # Render the HTML template index.html with the data in the context variable
-    return render(request, 'index.html', context=context)
+    response = render(request, 'index.html', context=context)
+    visits.count_visit(request, response, num_visits)
+    return response
 from django.views import generic
+from django.utils.decorators import method_decorator
+from .pagecache import cache_anonymous_page
+from .pagination import KeysetPaginationMixin, paginate
 
-class BookListView(generic.ListView):
+@method_decorator(cache_anonymous_page, name='dispatch')
+class BookListView(KeysetPaginationMixin, generic.ListView):
     model = Book
+    queryset = Book.objects.with_listing_data()
     paginate_by = 4
+    estimate_count = True
+@method_decorator(cache_anonymous_page, name='dispatch')
 class BookDetailView(generic.DetailView):
     model = Book    
-class AuthorListView(generic.ListView):
+    queryset = Book.objects.with_detail_data()
+@method_decorator(cache_anonymous_page, name='dispatch')
+class AuthorListView(KeysetPaginationMixin, generic.ListView):
     model = Author
     paginate_by = 4
+    estimate_count = True
+@method_decorator(cache_anonymous_page, name='dispatch')
 class AuthorDetailView(generic.DetailView):
     model = Author    
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -55,7 +54,7 @@ class LoanedBooksByUserListView(LoginRequiredMixin,generic.ListView):
         return BookInstance.objects.filter(borrower=self.request.user).filter(status__exact='o').order_by('due_back')
 # Added as part of challenge!
 from django.contrib.auth.mixins import PermissionRequiredMixin
-class LoanedBooksListView(PermissionRequiredMixin,generic.ListView):
+class LoanedBooksListView(KeysetPaginationMixin,PermissionRequiredMixin,generic.ListView):
     """Generic class-based view listing books on loan to current user."""
     model = BookInstance
     template_name ='catalog/bookinstance_list_borrowed.html'
@@ -146,15 +145,20 @@ class BookGenreListView(generic.ListView):
     model = Genre
     #template_name ='catalog/genre_list.html'
     paginate_by = 4
+
+    def get_context_data(self, **kwargs):
+        """Give each genre its book and available-copy counts, from catalog.facets."""
+        context = super().get_context_data(**kwargs)
+        counts = facets.counts('genre')
+        for genre in context['genre_list']:
+            genre.counts = counts.get(genre.pk, {'books': 0, 'available': 0})
+        return context
 from .forms import GenreForm,BookSearchForm
+from catalog import search
 
-from django.core.paginator import Paginator
 def show_books_by_genre(request,genre):
-    book_list = Book.objects.filter(genre__name = genre)
-    paginator = Paginator(book_list, 4) # Show 4 bookss per page.
-
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    book_list = Book.objects.filter(genre__name = genre).with_listing_data()
+    paginator, page_obj = paginate(request, book_list, 4) # Show 4 bookss per page.
     context={
         'page_obj': page_obj,
         'genre': genre,
@@ -194,6 +198,8 @@ def get_genre(request):
 
     return render(request, 'catalog/books_by_genre.html', context)
 from catalog.forms import BookForm,BookInstanceForm
+from catalog import borrowing
+from django.http import Http404
 from django.contrib.auth.models import User
 def get_book_borrow_id(request):
     """View function for renewing a specific BookInstance by librarian."""
@@ -207,16 +213,11 @@ def get_book_borrow_id(request):
         # Check if the form is valid:
         if form.is_valid():
             # process the data in form.cleaned_data as required (here we just write it to the model due_back field)
-            title = request.POST['choice']
-            print("Book title is ",title)
-            bookinstances = BookInstance.objects.all()
-            for bookinstance in bookinstances:
-                if bookinstance.book.title == title:
-                    pk = bookinstance.id
-            context ={
-                'pk':pk,
-                'book_list':Book.objects.all(),
-                }
+            title = form.cleaned_data['choice']
+            book_instance = borrowing.copy_to_renew(title)
+            if book_instance is None:
+                raise Http404('No copy of "%s"' % title)
+            pk = book_instance.id
 
             # redirect to a new URL:
             return HttpResponseRedirect(reverse('renew-book-librarian',kwargs={'pk':pk}) )
@@ -230,7 +231,8 @@ def get_book_borrow_id(request):
     }
 
     return render(request, 'catalog/books_by_title.html', context)
-from django.core.mail import send_mail
+from catalog import outbox
+@login_required
 def set_book_borrow(request):
     """View function for renewing a specific BookInstance by librarian."""
 
@@ -243,31 +245,16 @@ def set_book_borrow(request):
         # Check if the form is valid:
         if form.is_valid():
             # process the data in form.cleaned_data as required (here we just write it to the model due_back field)
-            title = request.POST['choice']
-            print("Book title is ",title)
-            bookinstances = BookInstance.objects.all()
-            found = False
-            for bookinstance in bookinstances:
-                if bookinstance.book != None and bookinstance.book.title == title:
-                    found = True
-                    break
-            for book in Book.objects.all():
-                if book.title == title:
-                    break
-            if not found:
-                send_mail('Borrow "'+title+'"','I would like to borrow: \n"'+title+'"\n'+request.user.username,request.user.email,['richardkellam@cox.net',],fail_silently = False)
-#                n_bookinstance = BookInstance.objects.create()
-#                n_bookinstance.book = book
-#                print(n_bookinstance.borrower)
-#                n_bookinstance.borrower = request.user
-#                n_bookinstance.status ='o'
-#                n_bookinstance.due_back = datetime.date.today() + datetime.timedelta(weeks=3)
-#
-#                n_bookinstance.save()
-            
+            title = form.cleaned_data['choice']
+            book = borrowing.find_book(title)
+            copy = None
+            if book is not None:
+                copy = borrowing.reserve_copy(book, request.user)
+            if copy is None:
+                outbox.enqueue('Borrow "'+title+'"','I would like to borrow: \n"'+title+'"\n'+request.user.username,request.user.email,['richardkellam@cox.net',])
 
             # redirect to a new URL:
-            return render(request,'catalog/book_borrowed.html',{'title':title})
+            return render(request,'catalog/book_borrowed.html',{'title':title,'copy':copy})
 
     # If this is a GET (or any other method) create the default form.
     else:
@@ -278,143 +265,120 @@ def set_book_borrow(request):
     }
 
     return render(request, 'catalog/books_by_title.html', context)
+from django.http import StreamingHttpResponse
+from catalog import export
 def do_export_books(request):
-    exported_books=""
-    count=0;
-    for book in Book.objects.all():
-        exported_books +="\"%s\",\"%s\",\"%s\",\"%s\",\"%s\",\"%s\"\n"%(book.title,book.list_authors(),book.summary,book.display_genre(),book.isbn,book.language)
-        count +=1
-    send_mail("Exported %d books"%count,exported_books,'richardkellam@cox.net',['richardkellam@cox.net',],fail_silently=True)    
-    return render(request,'catalog/books_exported.html',{'count':count})
-from catalog.models import Language
+    """Export the catalog as CSV.
+
+    By default the file is streamed back as a download (``?gzip=1`` compresses
+    it). ``?mode=file`` stores it with the default storage instead and
+    ``?mode=email`` also queues a mail with the stored file attached.
+    """
+    mode = request.GET.get('mode', 'download')
+    compress = request.GET.get('gzip') == '1'
+    if mode == 'download':
+        lines = export.csv_lines(export.export_rows())
+        if compress:
+            response = StreamingHttpResponse(export.gzipped(lines), content_type='application/gzip')
+            filename = export.EXPORT_FILENAME + '.gz'
+        else:
+            response = StreamingHttpResponse(lines, content_type='text/csv')
+            filename = export.EXPORT_FILENAME
+        response['Content-Disposition'] = 'attachment; filename="%s"' % filename
+        return response
+    path, count = export.store_export(compress=compress)
+    if mode == 'email':
+        outbox.enqueue("Exported %d books"%count,"The exported books are attached.",'richardkellam@cox.net',['richardkellam@cox.net',],attachment=path)
+    return render(request,'catalog/books_exported.html',{'count':count,'path':path,'emailed':mode == 'email'})
+from catalog import importer
 def import_books(request):
-    import csv
-    csvfile=open("exported_books.csv",newline='')
-    csvreader = csv.reader(csvfile,delimiter=',',quotechar='"')
-    count=0
-    for row in csvreader:
-        print("row length: ",len(row),"\nrow: ",row)
-        if len(row) < 6:
-            break
-        book=Book.objects.filter(title=row[0])
-        if len(book) == 0: #no book with that title
-            book= Book()
-            book.title = row[0]
-            book.isbn = row[4]
-            book.save()
-            s_authors=row[1].split(';')
-            print(s_authors)
-            found=False
-            for author in Author.objects.all():
-                for s_author in s_authors:
-                    a_author = s_author.split(',')
-                    if author.first_name == s_author[0] and author.last_name == s_author[1]:
-                        found=True;
-                        book.author.add(author)
-            if not found:
-                for s_author in s_authors:
-                    a_author = s_author.split(',')
-                    author=Author(first_name=a_author[0],last_name=a_author[1])
-                    author.save()
-                    print(author," saved")
-                    book.author.add(author)
-            book.summary = row[2]
-            book.save()
-            genres=row[3].split(',')
-            for agenre in genres:
-                found = False
-                for genre in Genre.objects.all():
-                    if genre.name == agenre:
-                        book.genre.add(genre)
-                        found = True
-                        break
-                if not found:
-                    genre = Genre(name=agenre)
-                    genre.save()
-                    book.genre.add(genre)
-            print('isbn: ',row[4],"length: ",len(row[4]),"book.isbn: ",book.isbn)
-            found = False
-            for lang in Language.objects.all():
-                if lang.name == row[5]:
-                    book.language = lang
-                    found = True
-            if not found:
-                lang = Language(name=row[5])
-                lang.save()
-                book.language =lang
-            book.save()
-            count +=1
-    return render(request,'catalog/books_imported.html',{'count':count})
+    with open("exported_books.csv",newline='') as csvfile:
+        result = importer.import_books(csvfile)
+    return render(request,'catalog/books_imported.html',{'count':result.created,'result':result})
 def search_books(request):
-    """View function for renewing a specific BookInstance by librarian."""
-
-    # If this is a POST request then process the Form data
-    if request.method == 'POST':
-
-        # Create a form instance and populate it with data from the request (binding):
-        form = BookSearchForm(request.POST)
-
-        # Check if the form is valid:
-        if form.is_valid():
-            # process the data in form.cleaned_data as required (here we just write it to the model due_back field)
-            choice = request.POST['choice']
-            title_search = request.POST['title_search']
-            thegenre= request.POST['genre']
-            author = request.POST['author']
-            print("choice: ",choice," title_search: ",title_search," thegenre: ",thegenre," author: ",author)
-                
-            # redirect to a new URL:
-            return HttpResponseRedirect(reverse('search-results',args=[choice,title_search,thegenre,author] ) )
-            #return HttpResponseRedirect(reverse('search-results',kwargs={'choice':choice,'search':search,'thegenre':thegenre,'author':author} ) )
-
-    # If this is a GET (or any other method) create the default form.
-    else:
-        form = BookSearchForm()
-
-    context = {
-        'form': form,
-    }
-    return render(request,'catalog/search_books.html',context)
-
-    return render(request, 'catalog/search_books.html', context)
-def search_results(request,choice,title_search,thegenre,author):
+    """The search form; it is sent by GET to the book-search page, so results can be bookmarked."""
+    return render(request,'catalog/search_books.html',{
+        'form': BookSearchForm(),
+        'genres': facets.ranked('genre'),
+        'languages': facets.ranked('language'),
+        'authors': facets.ranked('author', limit=10),
+    })
+from django.conf import settings
+from catalog.dbconnections import statement_timeout
+from .pagecache import PAGE_PARAMS
+SEARCH_PARAMS = ('title', 'genre', 'author', 'language', 'available')
+def book_search_context(request):
+    """Context of the book-search page: a page of the books matching every criterion, and facets."""
+    form = BookSearchForm(request.GET)
+    context = {'form': form, 'page_obj': None, 'size': 0, 'facets': []}
+    if not form.is_valid():
+        return context
+    query = search.BookSearch(Book.objects.with_listing_data()).where(**form.cleaned_data)
+    paginator, context['page_obj'] = paginate(request, query.books(), 4)
+    facets = query.facets()
+    # Links that add a facet's value to the search, starting again from the first page.
+    criteria = request.GET.copy()
+    for name in PAGE_PARAMS:
+        criteria.pop(name, None)
+    context['page_query'] = criteria.urlencode()
+    for facet in ('genre', 'language'):
+        values = []
+        for value, count in facets[facet]:
+            refined = criteria.copy()
+            refined[facet] = value
+            values.append({'name': value, 'count': count, 'query': refined.urlencode(),
+                           'selected': form.cleaned_data[facet] == value})
+        context['facets'].append({'name': facet, 'values': values})
+    context['size'] = facets['total']
+    return context
+@cache_anonymous_page(params=SEARCH_PARAMS)
+@statement_timeout(getattr(settings, 'CATALOG_SEARCH_STATEMENT_TIMEOUT_MS', 0))
+def book_search(request):
+    return render(request,'catalog/book_search.html',book_search_context(request))
+def find_books(choice,title_search,thegenre,author):
+    """Books matching an old search-results URL's choice, with the author name searched for."""
     theauthor=""
-    print ("choice: '",choice,"' title_search: '",title_search,'\' thegenre: \'',thegenre,"' author: '",author,"'")
+    criteria = {}
     if choice.find('Genre') >= 0:
-        book_list = Book.objects.filter(genre__name=thegenre)
+        criteria['genre'] = thegenre
     elif choice.find('Title') >= 0:
-        book_list =[]
-        title_search=title_search.strip()
-        for book in Book.objects.all():
-            if book.title.find(title_search) >= 0:
-                book_list.append(book)
+        criteria['title'] = title_search
     elif choice.find('Author') >= 0:
-        fields = author.split(',')
-        fields[1] = fields[1].strip()
-        book_list=[]
-        for book in Book.objects.all():
-            for author in book.author.all():
-                if author.first_name.find(fields[1]) >=0 and author.last_name.find(fields[0]) >= 0:
-                    theauthor = author.first_name.strip()+" "+author.last_name
-                    book_list.append(book)
-                    
-        #book_list = Book.objects.filter(author__last_name=fields[0]).filter(author__first_name=fields[1])
-    paginator = Paginator(book_list, 4) # Show 4 bookss per page.
-    print ('total ',paginator.count)
-
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        # Authors are offered as "last, first"
+        criteria['author'] = author
+        theauthor = ' '.join(reversed([field.strip() for field in author.split(',', 1)]))
+    return search.BookSearch(Book.objects.with_listing_data()).where(**criteria).books(), theauthor
+@statement_timeout(getattr(settings, 'CATALOG_SEARCH_STATEMENT_TIMEOUT_MS', 0))
+def search_results(request,choice,title_search,thegenre,author):
+    book_list, theauthor = find_books(choice,title_search,thegenre,author)
+    if choice.find('Title') >= 0:
+        title_search=title_search.strip()
+    paginator, page_obj = paginate(request, book_list, 4)
     context ={
         'book_list':book_list,
         'choice':choice,
         'title_search':title_search,
         'thegenre':thegenre,
         'theauthor':theauthor,
-        'size': len(book_list),
+        'size': paginator.count,
         'page_obj':page_obj
         }
-    for book in book_list:
-        print(book.title)
     # redirect to a new URL:
     return render(request,'catalog/found_books.html',context)
-    
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from catalog import dbconnections, instrumentation
+@staff_member_required
+def request_metrics(request):
+    """Timings of the requests this process has sampled, per view (``?format=json`` for JSON)."""
+    views = instrumentation.histogram.summary()
+    connections = dbconnections.metrics.summary()
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'buckets': instrumentation.bucket_labels(), 'views': views, 'connections': connections})
+    return render(request, 'catalog/request_metrics.html', {
+        'views': views,
+        'connections': connections,
+        'buckets': instrumentation.bucket_labels(),
+        'sample_rate': settings.CATALOG_METRICS_SAMPLE_RATE,
+    })
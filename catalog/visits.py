@@ -0,0 +1,48 @@
+"""Home page visit counting that does not write to the session store.
+
+With database sessions, counting visits in ``request.session`` turns every
+home page view into an ``UPDATE django_session``. The counter is set by
+``CATALOG_VISIT_COUNTER``:
+
+``'cookie'`` (the default)
+    keeps the count in a signed cookie, so counting needs no database at
+    all. A visitor's first count is taken from their session if they have
+    one, so counts carry over from the session counter.
+``'session'``
+    keeps the count in the session, for deployments whose SESSION_ENGINE
+    already avoids the database (``cache`` or ``signed_cookies``).
+"""
+import datetime
+
+from django.conf import settings
+
+COOKIE_NAME = 'num_visits'
+COOKIE_SALT = 'catalog.visits'
+COOKIE_MAX_AGE = int(datetime.timedelta(days=365).total_seconds())
+SESSION_KEY = 'num_visits'
+
+
+def counter():
+    return getattr(settings, 'CATALOG_VISIT_COUNTER', 'cookie')
+
+
+def visits(request):
+    """Number of earlier visits of this visitor."""
+    if counter() == 'session':
+        return request.session.get(SESSION_KEY, 0)
+    value = request.get_signed_cookie(COOKIE_NAME, default=None, salt=COOKIE_SALT)
+    if value is not None and value.isdigit():
+        return int(value)
+    # No valid cookie; a session only exists (and is read) if its cookie was sent.
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return request.session.get(SESSION_KEY, 0)
+    return 0
+
+
+def count_visit(request, response, num_visits):
+    """Record one more visit on top of ``num_visits``."""
+    if counter() == 'session':
+        request.session[SESSION_KEY] = num_visits + 1
+    else:
+        response.set_signed_cookie(COOKIE_NAME, num_visits + 1, salt=COOKIE_SALT, max_age=COOKIE_MAX_AGE,
+                                   secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Lax')
@@ -0,0 +1,13 @@
+"""gunicorn settings, read from the working directory by the Procfile's web process.
+
+Set DJANGO_ASGI=True to serve the ASGI application with uvicorn workers, so
+the catalog's async views are used; otherwise the WSGI application is
+served by gunicorn's sync workers.
+"""
+import os
+
+if os.environ.get('DJANGO_ASGI', '') == 'True':
+    wsgi_app = 'locallibrary.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'locallibrary.wsgi:application'
@@ -9,8 +9,26 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
+from asgiref.sync import ThreadSensitiveContext
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'locallibrary.settings')
+# Use the async versions of the catalog's read views (see catalog.async_views).
+os.environ.setdefault('DJANGO_ASGI', 'True')
 
-application = get_asgi_application()
+
+def thread_per_request(app):
+    """Give each request its own thread for its sync middleware and thread-sensitive calls.
+
+    Django 3.2's ASGIHandler runs them all in one thread shared by the whole
+    process, so a sync middleware waiting on a slow async view (such as
+    WhiteNoiseMiddleware, which has no async mode) holds up every other
+    request.
+    """
+    async def application(scope, receive, send):
+        async with ThreadSensitiveContext():
+            await app(scope, receive, send)
+    return application
+
+
+application = thread_per_request(get_asgi_application())
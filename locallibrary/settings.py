@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'catalog.instrumentation.RequestMetricsMiddleware',
+    'catalog.routers.PrimaryReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -89,6 +91,68 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Use a shared backend (e.g. memcached) when running several workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'locallibrary'),
+    }
+}
+
+# Seconds the home page record counts are kept in the cache.
+CATALOG_STATS_TIMEOUT = int(os.environ.get('CATALOG_STATS_TIMEOUT', 300))
+
+# Seconds the genre/author/title choice lists of the catalog forms are cached for.
+CATALOG_CHOICES_TIMEOUT = int(os.environ.get('CATALOG_CHOICES_TIMEOUT', 300))
+
+# Seconds the book counts per genre, language and author are cached for.
+CATALOG_FACETS_TIMEOUT = int(os.environ.get('CATALOG_FACETS_TIMEOUT', 300))
+
+# Seconds rendered book/author pages are cached for anonymous visitors.
+CATALOG_PAGE_CACHE_TIMEOUT = int(os.environ.get('CATALOG_PAGE_CACHE_TIMEOUT', 600))
+
+# Where home page visits are counted: 'cookie' (a signed cookie, no database
+# writes) or 'session'. Sessions are stored by DJANGO_SESSION_ENGINE, e.g.
+# django.contrib.sessions.backends.cache or .signed_cookies to keep them
+# out of the database too.
+CATALOG_VISIT_COUNTER = os.environ.get('CATALOG_VISIT_COUNTER', 'cookie')
+SESSION_ENGINE = os.environ.get('DJANGO_SESSION_ENGINE', 'django.contrib.sessions.backends.db')
+
+# Serve the catalog's read pages with the async views of catalog.async_views.
+# Set by locallibrary/asgi.py, so it is on whenever the site runs over ASGI.
+CATALOG_ASYNC_VIEWS = os.environ.get('DJANGO_ASGI', '') == 'True'
+# Threads the async views run their queries in, per worker process. Each keeps
+# a connection to every database it uses open for up to DJANGO_CONN_MAX_AGE.
+CATALOG_ASYNC_DB_THREADS = int(os.environ.get('CATALOG_ASYNC_DB_THREADS', 8))
+
+# Fraction of requests timed by catalog.instrumentation (0 turns it off) and the
+# wall time in ms from which a request is logged as slow.
+CATALOG_METRICS_SAMPLE_RATE = float(os.environ.get('CATALOG_METRICS_SAMPLE_RATE', 1.0))
+CATALOG_SLOW_REQUEST_MS = float(os.environ.get('CATALOG_SLOW_REQUEST_MS', 500))
+
+# Logging
+# https://docs.djangoproject.com/en/3.2/topics/logging/
+# Set CATALOG_METRICS_LOG_LEVEL=INFO to log every sampled request, not just slow ones.
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'catalog.instrumentation': {
+            'handlers': ['console'],
+            'level': os.environ.get('CATALOG_METRICS_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -143,8 +207,51 @@ EMAIL_HOST_USER = 'richardkellam'
 EMAIL_HOST_PASSWORD = 'Ilv@1119lhnrcx'
 # Heroku: Update database configuration from $DATABASE_URL.
 import dj_database_url
-db_from_env = dj_database_url.config(conn_max_age=500)
+# Connections are kept open for reuse by later requests for DJANGO_CONN_MAX_AGE seconds.
+conn_max_age = int(os.environ.get('DJANGO_CONN_MAX_AGE', 500))
+db_from_env = dj_database_url.config(conn_max_age=conn_max_age)
 DATABASES['default'].update(db_from_env)
+
+# Read replicas of the default database, as space separated database URLs.
+# catalog.routers sends the reads of requests that haven't written to one of
+# them; after a write the user reads from the primary for CATALOG_REPLICA_PIN_SECONDS.
+CATALOG_READ_REPLICAS = []
+for number, url in enumerate(os.environ.get('DATABASE_REPLICA_URLS', '').split(), 1):
+    DATABASES['replica%d' % number] = dj_database_url.parse(url, conn_max_age=conn_max_age)
+    CATALOG_READ_REPLICAS.append('replica%d' % number)
+CATALOG_REPLICA_PIN_SECONDS = int(os.environ.get('CATALOG_REPLICA_PIN_SECONDS', 10))
+DATABASE_ROUTERS = ['catalog.routers.PrimaryReplicaRouter']
+# A second connection to the default database, never read from unless it is
+# listed in CATALOG_READ_REPLICAS. The tests give it a database of its own to
+# stand in for a replica (see catalog.test_routers).
+DATABASES['replica'] = dict(DATABASES['default'], TEST={
+    # SQLite test databases are kept in memory, one per alias.
+    'NAME': None if 'sqlite3' in DATABASES['default']['ENGINE'] else 'test_%s_replica' % DATABASES['default']['NAME'],
+})
+
+# Connections go through the backends of catalog.backends (see catalog.dbconnections),
+# which check a reused connection before its first query of a request.
+CATALOG_DB_BACKENDS = {
+    'django.db.backends.sqlite3': 'catalog.backends.sqlite3',
+    'django.db.backends.postgresql': 'catalog.backends.postgresql',
+    'django.db.backends.postgresql_psycopg2': 'catalog.backends.postgresql',
+}
+for database in DATABASES.values():
+    database['ENGINE'] = CATALOG_DB_BACKENDS.get(database['ENGINE'], database['ENGINE'])
+CATALOG_CONN_HEALTH_CHECKS = os.environ.get('CATALOG_CONN_HEALTH_CHECKS', 'True') == 'True'
+
+# Set DJANGO_PGBOUNCER=True when the database URLs point at pgbouncer in transaction
+# pooling mode: server-side cursors don't survive from one transaction to the next.
+# It applies to every alias declared above, the replicas included.
+CATALOG_PGBOUNCER = os.environ.get('DJANGO_PGBOUNCER', '') == 'True'
+if CATALOG_PGBOUNCER:
+    for database in DATABASES.values():
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# Statement timeouts in ms (0 for none): the PostgreSQL default (set it on the
+# database role instead behind pgbouncer) and the one of the search results page.
+CATALOG_STATEMENT_TIMEOUT_MS = int(os.environ.get('CATALOG_STATEMENT_TIMEOUT_MS', 30000))
+CATALOG_SEARCH_STATEMENT_TIMEOUT_MS = int(os.environ.get('CATALOG_SEARCH_STATEMENT_TIMEOUT_MS', 5000))
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/3.1/howto/static-files/
 
@@ -155,4 +262,10 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATIC_URL = '/static/'
 # Simplified static file serving.
 # https://warehouse.python.org/project/whitenoise/
+# Collected files get hashed names, gzip and (with the Brotli package) .br
+# variants, and are served with an immutable Cache-Control header.
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# Where build_static writes the stylesheet bundles for collectstatic (see catalog.assets).
+CATALOG_STATIC_BUILD_DIR = BASE_DIR / 'build' / 'static'
+STATICFILES_DIRS = [CATALOG_STATIC_BUILD_DIR]